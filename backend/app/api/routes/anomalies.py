@@ -1,13 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict
 from pydantic import BaseModel
 from datetime import datetime
 
 from app.core.database import get_db
 from app.api import dependencies
 from app.models.anomaly import Anomaly, AnomalyType, AnomalySeverity
+from app.models.user import UserRole
 from app.services.anomaly_detection import AnomalyDetectionService
+from app.services.anomaly_rules import AnomalyRuleService
 
 router = APIRouter()
 
@@ -24,6 +26,19 @@ class AnomalyResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class AnomalyRuleResponse(BaseModel):
+    key: str
+    type: AnomalyType
+    severity: AnomalySeverity
+    title: str
+    is_enabled: bool
+    defaults: Dict[str, Any]
+    thresholds: Dict[str, Any]
+
+class AnomalyRuleUpdate(BaseModel):
+    is_enabled: Optional[bool] = None
+    thresholds: Optional[Dict[str, Any]] = None
+
 @router.get("/", response_model=List[AnomalyResponse])
 def get_anomalies(
     resolved: Optional[bool] = None,
@@ -33,6 +48,28 @@ def get_anomalies(
     """Fetch all anomalies for the user's company"""
     return AnomalyDetectionService.get_company_anomalies(db, current_user.company_id, resolved)
 
+@router.get("/rules", response_model=List[AnomalyRuleResponse])
+def get_anomaly_rules(
+    db: Session = Depends(get_db),
+    current_user = Depends(dependencies.get_current_user)
+):
+    """Registered anomaly rules with this company's effective thresholds"""
+    return AnomalyRuleService.list_rules(db, current_user.company_id)
+
+@router.put("/rules/{rule_key}", response_model=AnomalyRuleResponse)
+def update_anomaly_rule(
+    rule_key: str,
+    update: AnomalyRuleUpdate,
+    db: Session = Depends(get_db),
+    current_user = Depends(dependencies.require_role(UserRole.HR_MANAGER))
+):
+    """Enable/disable a rule or override its thresholds for the user's company"""
+    try:
+        AnomalyRuleService.update_rule(db, current_user.company_id, rule_key, update.is_enabled, update.thresholds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return next(r for r in AnomalyRuleService.list_rules(db, current_user.company_id) if r["key"] == rule_key)
+
 @router.put("/{anomaly_id}/resolve")
 def resolve_anomaly(
     anomaly_id: int,
@@ -1,33 +1,76 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import date
-from app.core.database import get_db
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from datetime import date, datetime
+from app.core.config import settings
+from app.core.database import get_db, stream_with_session
 from app.models.attendance import Attendance
-from app.schemas.attendance import AttendanceCreate, AttendanceUpdate, Attendance as AttendanceSchema, AttendanceBulkItem
+from app.models.employee import Employee
+from app.schemas.attendance import AttendanceCreate, AttendanceUpdate, Attendance as AttendanceSchema, AttendanceBulkItem, AttendanceCheckIn
 from app.api import dependencies
 from app.models.user import UserRole
-from app.models.employee import Employee
+from app.services.attendance_ingest import AttendanceIngestService
+from app.services.attendance_query import AttendanceQueryService
+from app.services.attendance_summary import AttendanceSummaryService
+from app.services.checkin_buffer import checkin_buffer
 
 router = APIRouter()
 
+MAX_NDJSON_LINE_BYTES = 64 * 1024  # Longer NDJSON lines are rejected without being buffered
+ATTENDANCE_PAGE_SIZE = 500  # Page size when a cursor is passed without a limit
+
 @router.get("/", response_model=List[AttendanceSchema])
 def read_attendance(
+    response: Response,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     employee_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=5000),
+    cursor: Optional[str] = None,
+    format: str = Query("rows", pattern="^(rows|columns|csv)$"),
     db: Session = Depends(get_db),
     current_user = Depends(dependencies.get_current_user)
 ):
-    query = db.query(Attendance)
-    if start_date:
-        query = query.filter(Attendance.date >= start_date)
-    if end_date:
-        query = query.filter(Attendance.date <= end_date)
-    if employee_id:
-        query = query.filter(Attendance.employee_id == employee_id)
-    
-    return query.all()
+    """
+    Your company's attendance ordered by (date, id). Without `limit` or
+    `cursor` every matching row is returned, as before pagination existed.
+    Passing either switches to keyset pages of at most `limit` rows (default
+    ATTENDANCE_PAGE_SIZE): pass the returned cursor (X-Next-Cursor header, or
+    "next_cursor" in columnar mode) to get the next page; it is absent on the
+    last page. format=columns returns parallel arrays per field and format=csv
+    streams every matching row from the cursor on as a CSV download.
+    """
+    filters = {"start_date": start_date, "end_date": end_date, "employee_id": employee_id}
+    try:
+        if cursor:
+            AttendanceQueryService.decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if cursor and limit is None:
+        limit = ATTENDANCE_PAGE_SIZE
+
+    if format == "csv":
+        return StreamingResponse(
+            stream_with_session(AttendanceQueryService.iter_csv, current_user.company_id, cursor, **filters),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=attendance.csv"}
+        )
+
+    rows, next_cursor = AttendanceQueryService.page(db, current_user.company_id, limit, cursor, **filters)
+    if format == "columns":
+        return JSONResponse(jsonable_encoder({
+            "count": len(rows),
+            "columns": AttendanceQueryService.to_columns(rows),
+            "next_cursor": next_cursor,
+        }))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
 
 @router.post("/", response_model=AttendanceSchema)
 def mark_attendance(
@@ -46,45 +89,208 @@ def mark_attendance(
         update_data = attendance.model_dump(exclude_unset=True)
         for key, value in update_data.items():
             setattr(db_entry, key, value)
+        AttendanceSummaryService.refresh(db, [(db_entry.employee_id, db_entry.date)])
         db.commit()
         db.refresh(db_entry)
         return db_entry
     
     db_attendance = Attendance(**attendance.model_dump())
     db.add(db_attendance)
+    AttendanceSummaryService.refresh(db, [(db_attendance.employee_id, db_attendance.date)])
     db.commit()
     db.refresh(db_attendance)
     return db_attendance
 
+@router.post("/check-in", status_code=status.HTTP_202_ACCEPTED)
+def check_in(
+    payload: AttendanceCheckIn,
+    db: Session = Depends(get_db),
+    current_user = Depends(dependencies.require_role(UserRole.HR_MANAGER))
+):
+    """
+    Marks an employee present for today unless they already have attendance.
+    With CHECKIN_BUFFER_ENABLED the check-in is acknowledged immediately and
+    written by the next buffer flush; otherwise it is written before returning.
+    """
+    employee_id = db.query(Employee.id).filter(
+        Employee.id == payload.employee_id,
+        Employee.company_id == current_user.company_id
+    ).scalar()
+    if not employee_id:
+        raise HTTPException(status_code=404, detail="Employee not found")
+
+    today = date.today()
+    at = payload.check_in or datetime.now().time().replace(microsecond=0)
+    if settings.CHECKIN_BUFFER_ENABLED:
+        existing_status = checkin_buffer.check_in(db, employee_id, today, at, payload.work_location)
+    else:
+        existing_status = db.query(Attendance.status).filter(
+            Attendance.employee_id == employee_id,
+            Attendance.date == today
+        ).scalar()
+        if not existing_status:
+            db.add(Attendance(
+                employee_id=employee_id, date=today, status="present",
+                check_in=at, work_location=payload.work_location
+            ))
+            AttendanceSummaryService.refresh(db, [(employee_id, today)])
+            db.commit()
+
+    if existing_status:
+        return {"accepted": False, "employee_id": employee_id, "date": today, "status": existing_status}
+    return {"accepted": True, "employee_id": employee_id, "date": today, "status": "present", "check_in": at}
+
 @router.post("/bulk", status_code=status.HTTP_201_CREATED)
 def bulk_mark_attendance(
     items: List[AttendanceBulkItem],
     db: Session = Depends(get_db),
     current_user = Depends(dependencies.require_role(UserRole.HR_MANAGER))
 ):
-    for item in items:
-        employee = db.query(Employee).filter(Employee.employee_id == item.employee_code).first() # Assuming employee_code maps to employee_id for now or fix logic
-        if not employee:
-            continue
-        
-        db_entry = db.query(Attendance).filter(
-            Attendance.employee_id == employee.id,
-            Attendance.date == item.date
-        ).first()
-        
-        if db_entry:
-            db_entry.check_in = item.check_in
-            db_entry.check_out = item.check_out
-            db_entry.status = item.status
-        else:
-            db_entry = Attendance(
-                employee_id=employee.id,
-                date=item.date,
-                check_in=item.check_in,
-                check_out=item.check_out,
-                status=item.status
-            )
-            db.add(db_entry)
-            
+    """
+    Upserts attendance by employee code (e.g. biometric exports) in batched
+    INSERT ... ON CONFLICT statements. Unknown codes and invalid punches are
+    rejected per item; everything else is written.
+    """
+    result = AttendanceIngestService.upsert(db, current_user.company_id, items)
+    db.commit()
+    return {"message": "Bulk attendance updated successfully", **result}
+
+async def _ndjson_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Splits a streamed body into (line number, line) as chunks arrive, skipping
+    blank lines. A line longer than MAX_NDJSON_LINE_BYTES is discarded while it
+    streams and yielded as None.
+    """
+    pending = b""
+    number = 0
+    oversized = False
+    async for chunk in chunks:
+        pending += chunk
+        lines = []
+        if b"\n" in chunk:
+            *lines, pending = pending.split(b"\n")
+        for line in lines:
+            number += 1
+            if oversized or len(line) > MAX_NDJSON_LINE_BYTES:
+                oversized = False
+                yield number, None
+            elif line.strip():
+                yield number, line
+        if len(pending) > MAX_NDJSON_LINE_BYTES:
+            oversized = True
+            pending = b""
+    if oversized or len(pending) > MAX_NDJSON_LINE_BYTES:
+        yield number + 1, None
+    elif pending.strip():
+        yield number + 1, pending
+
+def _commit_stream_batch(
+    db: Session,
+    company_id: int,
+    codes: Dict[str, int],
+    items: List[AttendanceBulkItem],
+    item_lines: List[int],
+    errors: List[Dict[str, Any]],
+    through_line: int
+) -> Dict[str, Any]:
+    """Upserts and commits one batch of a stream; returns its acknowledgement."""
+    result = AttendanceIngestService.upsert(db, company_id, items, codes)
     db.commit()
-    return {"message": "Bulk attendance updated successfully"}
+    errors = errors + [
+        {"line": item_lines[e["index"]], "employee_code": e["employee_code"], "error": e["error"]}
+        for e in result["errors"]
+    ]
+    return {
+        "through_line": through_line,
+        "inserted": result["inserted"],
+        "updated": result["updated"],
+        "rejected": len(errors),
+        "errors": sorted(errors, key=lambda e: e["line"]),
+    }
+
+@router.post("/stream")
+async def stream_attendance(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user = Depends(dependencies.require_role(UserRole.HR_MANAGER))
+):
+    """
+    Ingests an NDJSON body (one AttendanceBulkItem per line) while it is being
+    received: lines are parsed and validated one by one and every
+    ATTENDANCE_BATCH_SIZE valid items are upserted and committed, so memory stays
+    bounded by the batch size rather than the body size.
+
+    The response is NDJSON with one acknowledgement per committed batch
+    ("through_line" is the last line it covers, with counts and per-line errors)
+    and a final summary. It is only sent once the whole body has been read, so
+    a client whose upload breaks receives no acknowledgement: it resends the
+    whole stream, which is safe because the upsert is idempotent. When a write
+    fails after the body was read, the 500 response still carries the acks and
+    "committed_through_line", and the client can resume after that line.
+    """
+    company_id = current_user.company_id
+    codes = await run_in_threadpool(AttendanceIngestService.employee_ids_by_code, db, company_id)
+
+    acks: List[Dict[str, Any]] = []
+    items: List[AttendanceBulkItem] = []
+    item_lines: List[int] = []
+    errors: List[Dict[str, Any]] = []
+    last_line = 0
+    failure = None
+    try:
+        async for number, line in _ndjson_lines(request.stream()):
+            last_line = number
+            if line is None:
+                errors.append({"line": number, "error": f"Line exceeds {MAX_NDJSON_LINE_BYTES} bytes"})
+                continue
+            try:
+                item = AttendanceBulkItem.model_validate_json(line)
+            except ValidationError as e:
+                first = e.errors(include_url=False)[0]
+                field = ".".join(str(part) for part in first["loc"])
+                errors.append({"line": number, "error": f"{field}: {first['msg']}" if field else first["msg"]})
+                continue
+            items.append(item)
+            item_lines.append(number)
+
+            if len(items) >= settings.ATTENDANCE_BATCH_SIZE:
+                # Writes are blocking; keep them off the event loop
+                acks.append(await run_in_threadpool(
+                    _commit_stream_batch, db, company_id, codes, items, item_lines, errors, number
+                ))
+                items, item_lines, errors = [], [], []
+
+        if items or errors:
+            acks.append(await run_in_threadpool(
+                _commit_stream_batch, db, company_id, codes, items, item_lines, errors, last_line
+            ))
+    except Exception as e:
+        # Earlier batches stay committed; the client resumes after the last ack
+        db.rollback()
+        failure = str(e)
+
+    summary = {
+        "lines": last_line,
+        "committed_through_line": acks[-1]["through_line"] if acks else 0,
+        "inserted": sum(ack["inserted"] for ack in acks),
+        "updated": sum(ack["updated"] for ack in acks),
+        "rejected": sum(ack["rejected"] for ack in acks),
+    }
+    if failure:
+        summary["error"] = failure
+    body = "".join(json.dumps({"ack": ack}, default=str) + "\n" for ack in acks)
+    body += json.dumps({"summary": summary}) + "\n"
+    return Response(
+        content=body,
+        media_type="application/x-ndjson",
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR if failure else status.HTTP_200_OK
+    )
+
+@router.post("/summary/rebuild")
+def rebuild_attendance_summary(
+    db: Session = Depends(get_db),
+    current_user = Depends(dependencies.require_role(UserRole.ADMIN))
+):
+    """Recomputes the monthly attendance rollup for the company from raw attendance."""
+    rows = AttendanceSummaryService.rebuild(db, current_user.company_id)
+    return {"message": "Attendance summary rebuilt", "rows": rows}
@@ -1,25 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import date, datetime
+from typing import List, Optional, Union
+from datetime import datetime
 from decimal import Decimal
-import calendar
+import json
 
-from app.core.database import get_db
-from app.models.autopay_os import SalaryStructure, AutoPayOSRecord, AutoPayOSStatus
-from app.models.employee import Employee
-from app.models.attendance import Attendance
+from app.core.config import settings
+from app.core.database import get_db, SessionLocal, chunked
+from app.models.autopay_os import SalaryStructure, AutoPayOSRecord, AutoPayOSStatus, PayrollRunJob, PayrollJobStatus
 from app.schemas.autopay_os import (
     SalaryStructure as SalaryStructureSchema,
     SalaryStructureCreate,
     SalaryStructureUpdate,
     AutoPayOSRecord as AutoPayOSRecordSchema,
     AutoPayOSProcessRequest,
-    AutoPayOSSummary
+    AutoPayOSSummary,
+    PayrollJob as PayrollJobSchema,
+    AutoPayOSIncrementalResult
 )
 from app.api import dependencies
 from app.models.user import UserRole
+from app.models.employee import Employee
 from app.services.anomaly_detection import AnomalyDetectionService
+from app.services.payroll_engine import PayrollEngine
+from app.tasks.payroll import run_payroll_job
 
 router = APIRouter()
 
@@ -69,148 +74,153 @@ def update_salary_structure(
     db.refresh(db_structure)
     return db_structure
 
-@router.post("/process", response_model=List[AutoPayOSRecordSchema])
+def _job_status(job: PayrollRunJob) -> PayrollJobSchema:
+    """Adds progress percentage and a linear ETA to a job row."""
+    progress = (job.processed / job.total * 100) if job.total else (100.0 if job.status == PayrollJobStatus.COMPLETED else 0.0)
+    eta = None
+    if job.status == PayrollJobStatus.RUNNING and job.started_at and job.processed:
+        now = datetime.now(job.started_at.tzinfo) if job.started_at.tzinfo else datetime.now()
+        elapsed = (now - job.started_at).total_seconds()
+        eta = elapsed / job.processed * (job.total - job.processed)
+    return PayrollJobSchema(
+        id=job.id,
+        status=job.status,
+        month=job.month,
+        year=job.year,
+        total=job.total or 0,
+        processed=job.processed or 0,
+        records_written=job.records_written or 0,
+        failed=job.failed or 0,
+        errors=job.errors or [],
+        progress_percent=round(progress, 2),
+        eta_seconds=eta,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        created_at=job.created_at
+    )
+
+def _resolve_employee_ids(db: Session, request: AutoPayOSProcessRequest, company_id: int) -> List[int]:
+    """
+    Employee ids of a run in request order, or every active employee of the
+    company. Explicit ids must all belong to the company (404 otherwise).
+    """
+    if request.employee_ids is not None:
+        requested = list(dict.fromkeys(request.employee_ids))
+        owned = set()
+        for chunk in chunked(requested, settings.PAYROLL_BATCH_SIZE):
+            owned.update(r[0] for r in db.query(Employee.id).filter(
+                Employee.id.in_(chunk),
+                Employee.company_id == company_id
+            ))
+        missing = [emp_id for emp_id in requested if emp_id not in owned]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Employees not found: {missing}")
+        return requested
+    rows = db.query(Employee.id).filter(
+        Employee.company_id == company_id,
+        Employee.is_active == True
+    ).order_by(Employee.id).all()
+    return [r[0] for r in rows]
+
+@router.post("/process", response_model=Union[List[AutoPayOSRecordSchema], PayrollJobSchema, AutoPayOSIncrementalResult])
 def process_autopay_os(
     request: AutoPayOSProcessRequest,
+    response: Response,
     db: Session = Depends(get_db),
     current_user = Depends(dependencies.require_role(UserRole.HR_MANAGER))
 ):
-    results = []
-    
-    # Days in month
-    _, num_days = calendar.monthrange(request.year, request.month)
-    
-    for emp_id in request.employee_ids:
-        # 1. Get employee and salary structure
-        employee = db.query(Employee).filter(Employee.id == emp_id).first()
-        if not employee or not employee.salary_structure:
-            continue
-            
-        structure = employee.salary_structure
-        
-        # 2. Get attendance for the month
-        start_date = date(request.year, request.month, 1)
-        end_date = date(request.year, request.month, num_days)
-        
-        attendance = db.query(Attendance).filter(
-            Attendance.employee_id == emp_id,
-            Attendance.date >= start_date,
-            Attendance.date <= end_date
-        ).all()
-        
-        # Calculate paid days
-        present_days = sum(1 for a in attendance if a.status == 'present')
-        half_days = sum(Decimal("0.5") for a in attendance if a.status == 'half-day')
-        leave_days = sum(1 for a in attendance if a.status == 'leave')
-        
-        paid_days = Decimal(present_days) + half_days + Decimal(leave_days)
-        absent_days = Decimal(num_days) - paid_days
-        
-        # 3. Calculate Earnings (Pro-rated)
-        pro_rate_factor = Decimal(paid_days) / Decimal(num_days)
-        basic_earned = structure.basic * pro_rate_factor
-        hra_earned = structure.hra * pro_rate_factor
-        conv_earned = structure.conveyance * pro_rate_factor
-        med_earned = structure.medical_allowance * pro_rate_factor
-        special_earned = structure.special_allowance * pro_rate_factor
-        
-        gross_earnings = basic_earned + hra_earned + conv_earned + med_earned + special_earned
-        
-        # 4. Calculate Deductions (Simplified Indian Rules)
-        pf_deduction = Decimal("0.0")
-        if structure.pf_enabled:
-            # Standard 12% of Basic
-            pf_deduction = basic_earned * Decimal("0.12")
-            
-        esi_deduction = Decimal("0.0")
-        if structure.esi_enabled and gross_earnings <= Decimal("21000"):
-            # Employee contribution 0.75%
-            esi_deduction = gross_earnings * Decimal("0.0075")
-            
-        pt_deduction = Decimal("0.0")
-        if structure.pt_enabled:
-            # TN Professional Tax (Simplified Slab)
-            if gross_earnings > Decimal("12500"): pt_deduction = Decimal("250.0")
-            elif gross_earnings > Decimal("10000"): pt_deduction = Decimal("150.0")
-            elif gross_earnings > Decimal("7500"): pt_deduction = Decimal("100.0")
-        
-        total_deductions = pf_deduction + esi_deduction + pt_deduction
-        net_pay = gross_earnings - total_deductions
-        
-        # 4.5. Employer Contributions (Advanced Compliance)
-        employer_pf = Decimal("0.0")
-        if structure.employer_pf_enabled:
-            # Employer contribution is also 12% of Basic
-            employer_pf = basic_earned * Decimal("0.12")
-            
-        employer_esi = Decimal("0.0")
-        if structure.employer_esi_enabled and gross_earnings <= Decimal("21000"):
-            # Employer contribution is 3.25%
-            employer_esi = gross_earnings * Decimal("0.0325")
-
-        # 5. Create or Update AutoPayOS Record
-        db_record = db.query(AutoPayOSRecord).filter(
-            AutoPayOSRecord.employee_id == emp_id,
-            AutoPayOSRecord.month == request.month,
-            AutoPayOSRecord.year == request.year
-        ).first()
-        
-        if db_record:
-            db_record.paid_days = paid_days
-            db_record.absent_days = absent_days
-            db_record.gross_earnings = gross_earnings
-            db_record.total_deductions = total_deductions
-            db_record.net_pay = net_pay
-            db_record.basic_earned = basic_earned
-            db_record.hra_earned = hra_earned
-            db_record.conveyance_earned = conv_earned
-            db_record.medical_earned = med_earned
-            db_record.special_earned = special_earned
-            db_record.pf_deduction = pf_deduction
-            db_record.esi_deduction = esi_deduction
-            db_record.pt_deduction = pt_deduction
-            db_record.employer_pf_contribution = employer_pf
-            db_record.employer_esi_contribution = employer_esi
-            db_record.status = AutoPayOSStatus.PROCESSED
-            db_record.processed_at = datetime.now()
-        else:
-            db_record = AutoPayOSRecord(
-                employee_id=emp_id,
-                company_id=employee.company_id,
-                month=request.month,
-                year=request.year,
-                paid_days=paid_days,
-                absent_days=absent_days,
-                gross_earnings=gross_earnings,
-                total_deductions=total_deductions,
-                net_pay=net_pay,
-                basic_earned=basic_earned,
-                hra_earned=hra_earned,
-                conveyance_earned=conv_earned,
-                medical_earned=med_earned,
-                special_earned=special_earned,
-                pf_deduction=pf_deduction,
-                esi_deduction=esi_deduction,
-                pt_deduction=pt_deduction,
-                employer_pf_contribution=employer_pf,
-                employer_esi_contribution=employer_esi,
-                status=AutoPayOSStatus.PROCESSED,
-                processed_at=datetime.now()
-            )
-            db.add(db_record)
-            
-        results.append(db_record)
-        
-    db.commit()
-    for r in results:
-        db.refresh(r)
-        # 6. Run AI Anomaly Detection
+    employee_ids = _resolve_employee_ids(db, request, current_user.company_id)
+    skipped = []
+    if request.incremental:
+        employee_ids, skipped = PayrollEngine.split_dirty(db, employee_ids, request.month, request.year)
+    response.headers["X-Payroll-Recomputed"] = str(len(employee_ids))
+    response.headers["X-Payroll-Skipped"] = str(len(skipped))
+
+    if request.run_in_background:
+        job = PayrollRunJob(
+            company_id=current_user.company_id,
+            created_by_id=current_user.id,
+            month=request.month,
+            year=request.year,
+            employee_ids=employee_ids,
+            total=len(employee_ids),
+            status=PayrollJobStatus.QUEUED
+        )
+        db.add(job)
+        db.commit()
+
+        # Runs inline when CELERY_TASK_ALWAYS_EAGER is set
+        task = run_payroll_job.delay(job.id)
+        job.task_id = task.id
+        db.commit()
+        db.refresh(job)
+
+        response.status_code = status.HTTP_202_ACCEPTED
+        if request.incremental:
+            return AutoPayOSIncrementalResult(recomputed=len(employee_ids), skipped=len(skipped), job=_job_status(job))
+        return _job_status(job)
+
+    # 1-5. Load inputs in bulk, compute payslips in memory and upsert them
+    run = PayrollEngine.run(db, employee_ids, request.month, request.year, sharded=request.sharded)
+
+    response.headers["X-Payroll-Rows"] = str(run["rows"])
+    response.headers["X-Payroll-Workers"] = str(run["workers"])
+    response.headers["X-Payroll-Rows-Per-Second"] = f"{run['rows_per_second']:.1f}"
+
+    # 6. Run AI Anomaly Detection
+    AnomalyDetectionService.safe_analyze_payroll_run(db, current_user.company_id, request.month, request.year, employee_ids)
+
+    # The anomaly commit expires the records; refresh them in bulk rather than one by one
+    records = PayrollEngine.load_records(db, employee_ids, request.month, request.year)
+    if request.incremental:
+        return AutoPayOSIncrementalResult(recomputed=len(employee_ids), skipped=len(skipped), records=records)
+    return records
+
+@router.post("/preview")
+def preview_autopay_os(
+    request: AutoPayOSProcessRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(dependencies.require_role(UserRole.HR_MANAGER))
+):
+    """
+    Dry run: streams computed payslips as NDJSON without writing records or anomalies.
+    Each line carries the payslip and its delta against the last PAID record; the
+    final line is {"summary": {...}}. Explicit employee_ids outside the caller's
+    company return 404.
+    """
+    company_id = current_user.company_id
+    employee_ids = _resolve_employee_ids(db, request, company_id)
+
+    def stream():
+        # Own session: the request-scoped one is closed before streaming starts
+        session = SessionLocal()
+        totals = {"employees": 0, "gross_earnings": Decimal("0"), "total_deductions": Decimal("0"), "net_pay": Decimal("0")}
         try:
-            AnomalyDetectionService.analyze_autopay_os_record(db, r)
-        except Exception as e:
-            print(f"Warning: Anomaly detection failed for record {r.id}: {e}")
-            
-    return results
+            for row in PayrollEngine.preview(session, company_id, employee_ids, request.month, request.year):
+                totals["employees"] += 1
+                for col in ("gross_earnings", "total_deductions", "net_pay"):
+                    totals[col] += row["payslip"][col]
+                yield json.dumps(row, default=str) + "\n"
+            yield json.dumps({"summary": totals}, default=str) + "\n"
+        finally:
+            session.close()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@router.get("/jobs/{job_id}", response_model=PayrollJobSchema)
+def get_payroll_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(dependencies.require_role(UserRole.HR_MANAGER))
+):
+    """Progress of a background payroll run (done/total, errors, ETA)."""
+    job = db.query(PayrollRunJob).filter(
+        PayrollRunJob.id == job_id,
+        PayrollRunJob.company_id == current_user.company_id
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Payroll job not found")
+    return _job_status(job)
 
 @router.get("/history/{employee_id}", response_model=List[AutoPayOSRecordSchema])
 def get_autopay_os_history(
@@ -1,23 +1,115 @@
-from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
-from typing import List
-from datetime import date
+from typing import List, Optional
+from datetime import date, datetime
+import json
+import os
 from decimal import Decimal
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_db, stream_with_session
 from app.api import dependencies
-from app.models.user import User
+from app.models.user import User, UserRole
 from app.models.employee import Employee
-from app.models.autopay_os import AutoPayOSRecord
+from app.models.autopay_os import AutoPayOSRecord, Form16Job, PayrollJobStatus
 from app.models.company import Company
 from app.services.pdf_service import PDFService
 from app.services.compliance_service import ComplianceService
+from app.services.filing_cache import FilingCache
+from app.services.form16_service import Form16Service
+from app.schemas.compliance import Form16JobCreate, Form16Job as Form16JobSchema
+from app.tasks.form16 import run_form16_job
 
 router = APIRouter()
 
+def _form16_job_status(job: Form16Job) -> Form16JobSchema:
+    """Adds progress, throughput and a linear ETA to a Form 16 job row."""
+    progress = (job.processed / job.total * 100) if job.total else (100.0 if job.status == PayrollJobStatus.COMPLETED else 0.0)
+    rate = eta = None
+    if job.started_at and job.processed:
+        end = job.finished_at or (datetime.now(job.started_at.tzinfo) if job.started_at.tzinfo else datetime.now())
+        elapsed = (end - job.started_at).total_seconds()
+        if elapsed > 0:
+            rate = job.processed / elapsed
+            if job.status == PayrollJobStatus.RUNNING:
+                eta = (job.total - job.processed) / rate
+    return Form16JobSchema(
+        id=job.id,
+        status=job.status,
+        financial_year=job.financial_year,
+        total=job.total or 0,
+        processed=job.processed or 0,
+        failed=job.failed or 0,
+        errors=job.errors or [],
+        progress_percent=round(progress, 2),
+        pdfs_per_second=round(rate, 2) if rate else None,
+        eta_seconds=eta,
+        download_ready=bool(job.archive_path),
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        created_at=job.created_at
+    )
+
+def _get_form16_job(db: Session, job_id: int, company_id: int) -> Form16Job:
+    job = db.query(Form16Job).filter(Form16Job.id == job_id, Form16Job.company_id == company_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Form 16 job not found")
+    return job
+
+@router.post("/form16/jobs", response_model=Form16JobSchema, status_code=status.HTTP_202_ACCEPTED)
+def start_form16_job(
+    request: Form16JobCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(dependencies.require_role(UserRole.HR_MANAGER))
+):
+    """Queues Form 16 generation for every employee paid in the financial year."""
+    job = Form16Job(
+        company_id=current_user.company_id,
+        created_by_id=current_user.id,
+        financial_year=request.financial_year or settings.CURRENT_FY,
+        status=PayrollJobStatus.QUEUED,
+        errors=[]
+    )
+    db.add(job)
+    db.commit()
+
+    task = run_form16_job.delay(job.id)
+    db.refresh(job)
+    job.task_id = task.id
+    db.commit()
+    db.refresh(job)
+    return _form16_job_status(job)
+
+@router.get("/form16/jobs/{job_id}", response_model=Form16JobSchema)
+def get_form16_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(dependencies.require_role(UserRole.HR_MANAGER))
+):
+    """Progress of a company-wide Form 16 job."""
+    return _form16_job_status(_get_form16_job(db, job_id, current_user.company_id))
+
+@router.get("/form16/jobs/{job_id}/download")
+def download_form16_archive(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(dependencies.require_role(UserRole.HR_MANAGER))
+):
+    """Downloads the ZIP of a finished Form 16 job."""
+    job = _get_form16_job(db, job_id, current_user.company_id)
+    if not job.archive_path or not os.path.exists(job.archive_path):
+        raise HTTPException(status_code=409, detail="Form 16 archive is not ready")
+    return FileResponse(
+        job.archive_path,
+        media_type="application/zip",
+        filename=f"Form16_{job.financial_year}.zip"
+    )
+
 @router.get("/form16/{employee_id}")
 async def download_form_16(
     employee_id: int,
+    financial_year: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(dependencies.get_current_user)
 ):
@@ -27,101 +119,107 @@ async def download_form_16(
         raise HTTPException(status_code=404, detail="Employee not found")
         
     company = db.query(Company).filter(Company.id == current_user.company_id).first()
-    
-    # Calculate mock data from autopay_os records
-    records = db.query(AutoPayOSRecord).filter(AutoPayOSRecord.employee_id == employee_id).all()
-    gross = sum(Decimal(r.gross_earnings) for r in records)
-    tax = sum(Decimal(r.income_tax_deduction or 0) for r in records)
-    
-    data = {
-        "gross": f"{float(gross):,.2f}",
-        "taxable": f"{float(gross - 75000):,.2f}",
-        "tax": f"{float(tax):,.2f}"
+    financial_year = financial_year or settings.CURRENT_FY
+
+    # Annual totals for the financial year (same aggregation as the bulk job)
+    rows = Form16Service.aggregate(db, current_user.company_id, financial_year, [employee_id])
+    row = rows[0] if rows else {
+        "employee_id": employee.id,
+        "employee_code": employee.employee_code,
+        "employee_name": employee.full_name,
+        "pan": employee.pan_number,
+        "gross": Decimal("0"),
+        "tax": Decimal("0"),
     }
-    
-    pdf_buffer = PDFService.generate_form_16(
-        employee_name=employee.full_name,
-        pan=employee.pan_number or "NOT PROVIDED",
-        company_name=company.name,
-        tan=company.tan or "NOT PROVIDED",
-        year="2025-26",
-        data=data
-    )
+    _, content = Form16Service.render(row, company.name, company.tan, financial_year)
     
     return Response(
-        content=pdf_buffer.getvalue(),
+        content=content,
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename=Form16_{employee.employee_code}.pdf"}
     )
 
 @router.get("/form24q")
 async def download_form_24q(
+    request: Request,
+    quarter: Optional[int] = Query(None, ge=1, le=4),
+    financial_year: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"),
     db: Session = Depends(get_db),
     current_user: User = Depends(dependencies.get_current_user)
 ):
-    """Generates and returns Quarterly Form 24Q PDF for the company."""
+    """
+    Generates and returns the Form 24Q PDF for one quarter of a financial year
+    (default CURRENT_FY). Without a quarter, the quarter in progress today is used.
+    """
     company = db.query(Company).filter(Company.id == current_user.company_id).first()
-    
-    # Fetch all employees with TDS deduction
-    records = db.query(
-        Employee.full_name,
-        Employee.pan_number,
-        AutoPayOSRecord.income_tax_deduction
-    ).join(AutoPayOSRecord, AutoPayOSRecord.employee_id == Employee.id)\
-     .filter(Employee.company_id == current_user.company_id)\
-     .all()
-     
-    formatted_records = [
-        {"name": r[0], "pan": r[1] or "NA", "tds": f"{float(r[2] or 0):,.2f}"}
-        for r in records
-    ]
-    
-    pdf_buffer = PDFService.generate_form_24q(company.name, formatted_records)
-    
-    return Response(
-        content=pdf_buffer.getvalue(),
+    financial_year = financial_year or settings.CURRENT_FY
+    quarter = quarter or ComplianceService.form_24q_default_quarter(financial_year)
+    periods = ComplianceService.form_24q_periods(financial_year, quarter)
+
+    def render():
+        formatted_records = [
+            {"name": r["name"], "pan": r["pan"], "tds": f"{float(r['tds']):,.2f}"}
+            for r in ComplianceService.aggregate_form_24q(db, current_user.company_id, financial_year, quarter)
+        ]
+        return [PDFService.generate_form_24q(company.name, formatted_records, financial_year, quarter).getvalue()]
+
+    return FilingCache.respond(
+        request, db, current_user.company_id, "form24q", f"{financial_year}-Q{quarter}", periods, render,
         media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=Form24Q_{company.name}.pdf"}
+        filename=f"Form24Q_{company.name}_{financial_year}_Q{quarter}.pdf"
     )
 
 @router.get("/pf-ecr")
 async def download_pf_ecr(
+    request: Request,
     month: int,
     year: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(dependencies.get_current_user)
 ):
-    """Generates and returns PF ECR text file for the company."""
-    ecr_text = ComplianceService.generate_pf_ecr(db, current_user.company_id, month, year)
-    
-    return Response(
-        content=ecr_text,
+    """Streams the PF ECR text file for the company (cached per data version, supports If-None-Match)."""
+    return FilingCache.respond(
+        request, db, current_user.company_id, "pf-ecr", f"{year}-{month:02d}", [(year, month)],
+        lambda: stream_with_session(ComplianceService.iter_pf_ecr, current_user.company_id, month, year),
         media_type="text/plain",
-        headers={"Content-Disposition": f"attachment; filename=PF_ECR_{month}_{year}.txt"}
+        filename=f"PF_ECR_{month}_{year}.txt"
     )
 
 @router.get("/esi-json")
 async def download_esi_json(
+    request: Request,
     month: int,
     year: int,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    pretty: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(dependencies.get_current_user)
 ):
-    """Generates and returns ESI Monthly JSON for the company."""
-    esi_json = ComplianceService.generate_esi_json(db, current_user.company_id, month, year)
-    
-    return Response(
-        content=esi_json,
-        media_type="application/json",
-        headers={"Content-Disposition": f"attachment; filename=ESI_Monthly_{month}_{year}.json"}
+    """Streams ESI Monthly JSON for the company (format=ndjson for one IP per line)."""
+    if format == "ndjson":
+        produce = lambda: stream_with_session(ComplianceService.iter_esi_ndjson, current_user.company_id, month, year)
+        media_type, extension, filing_type = "application/x-ndjson", "ndjson", "esi-ndjson"
+    else:
+        produce = lambda: stream_with_session(ComplianceService.iter_esi_json, current_user.company_id, month, year, pretty=pretty)
+        media_type, extension, filing_type = "application/json", "json", "esi-json-pretty" if pretty else "esi-json"
+
+    return FilingCache.respond(
+        request, db, current_user.company_id, filing_type, f"{year}-{month:02d}", [(year, month)], produce,
+        media_type=media_type,
+        filename=f"ESI_Monthly_{month}_{year}.{extension}"
     )
 
 @router.get("/pt-summary")
 async def get_pt_summary(
+    request: Request,
     month: int,
     year: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(dependencies.get_current_user)
 ):
     """Returns PT state-wise summary data."""
-    return ComplianceService.generate_pt_summary(db, current_user.company_id, month, year)
+    return FilingCache.respond(
+        request, db, current_user.company_id, "pt-summary", f"{year}-{month:02d}", [(year, month)],
+        lambda: [json.dumps(ComplianceService.generate_pt_summary(db, current_user.company_id, month, year))],
+        media_type="application/json"
+    )
@@ -1,34 +1,110 @@
+import os
+from datetime import datetime
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.api.dependencies import get_current_user, require_role
 from app.models.user import User, UserRole
 from app.models.employee import Employee
-from app.schemas.employee import EmployeeCreate, EmployeeUpdate, Employee as EmployeeSchema
+from app.models.autopay_os import EmployeeImportJob, PayrollJobStatus
+from app.schemas.employee import (
+    EmployeeCreate, EmployeeUpdate, Employee as EmployeeSchema, EmployeeImportJob as EmployeeImportJobSchema
+)
 from app.services.bulk_import_service import BulkImportService
+from app.tasks.employee_import import run_employee_import_job
 
 router = APIRouter()
 
+UPLOAD_BLOCK_SIZE = 1024 * 1024  # Uploads are copied to disk in 1 MiB blocks
+
+def _check_import_file(file: UploadFile) -> None:
+    if not file.filename.lower().endswith(('.xlsx', '.xls', '.csv')):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid file format. Please upload an Excel or CSV file."
+        )
+
+async def _spool_upload(file: UploadFile) -> str:
+    """Copies the upload to disk so neither it nor the parsed sheet is held in memory whole."""
+    path = BulkImportService.spool_path(file.filename)
+    with open(path, "wb") as spool:
+        while block := await file.read(UPLOAD_BLOCK_SIZE):
+            spool.write(block)
+    return path
+
+def _import_job_status(job: EmployeeImportJob) -> EmployeeImportJobSchema:
+    """Adds progress, throughput and a linear ETA to an import job row."""
+    done = job.checkpoint_row or 0
+    total = job.total_rows or 0
+    progress = (min(done, total) / total * 100) if total else (100.0 if job.status == PayrollJobStatus.COMPLETED else 0.0)
+    rate = eta = None
+    if job.started_at and done:
+        end = job.finished_at or (datetime.now(job.started_at.tzinfo) if job.started_at.tzinfo else datetime.now())
+        elapsed = (end - job.started_at).total_seconds()
+        if elapsed > 0:
+            rate = done / elapsed
+            if job.status == PayrollJobStatus.RUNNING:
+                eta = max(total - done, 0) / rate
+    return EmployeeImportJobSchema(
+        id=job.id,
+        status=job.status,
+        filename=job.filename,
+        total_rows=total,
+        checkpoint_row=done,
+        imported=job.imported or 0,
+        rejected=job.rejected or 0,
+        errors=job.errors or [],
+        error=job.error,
+        progress_percent=round(progress, 2),
+        rows_per_second=round(rate, 2) if rate else None,
+        eta_seconds=eta,
+        can_resume=job.status == PayrollJobStatus.FAILED and bool(job.file_path) and os.path.exists(job.file_path),
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        created_at=job.created_at
+    )
+
+def _get_import_job(db: Session, job_id: int, company_id: int) -> EmployeeImportJob:
+    job = db.query(EmployeeImportJob).filter(
+        EmployeeImportJob.id == job_id,
+        EmployeeImportJob.company_id == company_id
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+def _enqueue_import_job(db: Session, job: EmployeeImportJob) -> EmployeeImportJobSchema:
+    # Runs inline when CELERY_TASK_ALWAYS_EAGER is set
+    task = run_employee_import_job.delay(job.id)
+    db.refresh(job)
+    job.task_id = task.id
+    db.commit()
+    db.refresh(job)
+    return _import_job_status(job)
+
 @router.post("/bulk-import", status_code=status.HTTP_200_OK)
 async def bulk_import_employees(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(UserRole.HR_MANAGER))
 ):
-    """Bulk import employees from Excel"""
-    if not file.filename.endswith(('.xlsx', '.xls')):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid file format. Please upload an Excel file."
+    """
+    Bulk import employees from Excel or CSV in one transaction. Valid rows are
+    imported; invalid rows are skipped and listed per row in "errors".
+    Use /bulk-import/jobs for large files.
+    """
+    _check_import_file(file)
+    path = await _spool_upload(file)
+    try:
+        # Parsing and inserts are blocking work; keep them off the event loop
+        result = await run_in_threadpool(
+            BulkImportService.process_employee_file, path, file.filename, current_user.company_id, db
         )
-    
-    content = await file.read()
-    # In a real app, we'd get company_id from current_user or a path param
-    # For now, we'll assume the user's primary company or first one for demo
-    company_id = 1 
-    
-    result = BulkImportService.process_employee_excel(content, company_id, db)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
     if not result["success"]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -37,6 +113,54 @@ async def bulk_import_employees(
     
     return result
 
+@router.post("/bulk-import/jobs", response_model=EmployeeImportJobSchema, status_code=status.HTTP_202_ACCEPTED)
+async def start_employee_import_job(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(UserRole.HR_MANAGER))
+):
+    """
+    Queues a background import that commits every IMPORT_BATCH_SIZE rows and
+    records a checkpoint, so a failed job can be resumed where it stopped.
+    """
+    _check_import_file(file)
+    job = EmployeeImportJob(
+        company_id=current_user.company_id,
+        created_by_id=current_user.id,
+        filename=file.filename,
+        file_path=await _spool_upload(file),
+        status=PayrollJobStatus.QUEUED,
+        errors=[]
+    )
+    db.add(job)
+    db.commit()
+    return await run_in_threadpool(_enqueue_import_job, db, job)
+
+@router.get("/bulk-import/jobs/{job_id}", response_model=EmployeeImportJobSchema)
+def get_employee_import_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(UserRole.HR_MANAGER))
+):
+    """Progress of an import job, with the per-row error report."""
+    return _import_job_status(_get_import_job(db, job_id, current_user.company_id))
+
+@router.post("/bulk-import/jobs/{job_id}/resume", response_model=EmployeeImportJobSchema, status_code=status.HTTP_202_ACCEPTED)
+def resume_employee_import_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(UserRole.HR_MANAGER))
+):
+    """Re-queues a failed import job from its checkpoint."""
+    job = _get_import_job(db, job_id, current_user.company_id)
+    if job.status != PayrollJobStatus.FAILED:
+        raise HTTPException(status_code=409, detail=f"Only failed jobs can be resumed (job is {job.status.value})")
+    if not job.file_path or not os.path.exists(job.file_path):
+        raise HTTPException(status_code=409, detail="The uploaded file is no longer available; start a new import")
+    job.status = PayrollJobStatus.QUEUED
+    db.commit()
+    return _enqueue_import_job(db, job)
+
 @router.get("/", response_model=List[EmployeeSchema])
 async def list_employees(
     skip: int = 0,
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from typing import List, Any
 from datetime import datetime
@@ -11,6 +12,8 @@ from app.models.autopay_os import AutoPayOSRecord, AutoPayOSStatus
 from app.models.attendance import Attendance
 from app.models.leave import LeaveApplication, LeaveStatus
 from app.schemas.autopay_os import AutoPayOSRecord as AutoPayOSRecordSchema
+from app.services.filing_cache import FilingCache
+from app.services.payslip_service import PayslipService
 
 router = APIRouter()
 
@@ -75,6 +78,55 @@ def get_my_payslips(
         AutoPayOSRecord.employee_id == employee.id
     ).order_by(AutoPayOSRecord.year.desc(), AutoPayOSRecord.month.desc()).all()
 
+def _payslip_response(request: Request, db: Session, record: AutoPayOSRecord) -> Response:
+    """Serves a payslip PDF from the blob store; the blob key doubles as the ETag."""
+    etag = f'"{PayslipService.blob_key(record)}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if FilingCache.is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(
+        PayslipService.get_pdf(db, record),
+        media_type="application/pdf",
+        filename=f"Payslip_{record.year}_{record.month:02d}.pdf",
+        headers=headers
+    )
+
+@router.get("/payslips/download")
+def download_payslip_by_link(
+    token: str,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Downloads a payslip through a signed, expiring link (e.g. sent over WhatsApp).
+    """
+    record = PayslipService.resolve_download_token(db, token)
+    if not record:
+        raise HTTPException(status_code=404, detail="Payslip link is invalid or has expired")
+    return _payslip_response(request, db, record)
+
+@router.get("/payslips/{record_id}/pdf")
+def download_my_payslip(
+    record_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(dependencies.get_current_user)
+):
+    """
+    Returns the payslip PDF for one of the logged-in employee's payroll records.
+    """
+    employee = db.query(Employee).filter(Employee.user_id == current_user.id).first()
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee profile not found")
+
+    record = db.query(AutoPayOSRecord).filter(
+        AutoPayOSRecord.id == record_id,
+        AutoPayOSRecord.employee_id == employee.id
+    ).first()
+    if not record:
+        raise HTTPException(status_code=404, detail="Payslip not found")
+    return _payslip_response(request, db, record)
+
 @router.post("/apply-leave")
 def apply_leave(
     leave_data: Any, # Using Any for quick implementation, should ideally use a schema
@@ -0,0 +1,21 @@
+from celery import Celery
+from app.core.config import settings
+
+# Worker: celery -A app.core.celery_app worker --loglevel=info
+celery_app = Celery(
+    "autopay_os",
+    broker=settings.CELERY_BROKER_URL,
+    backend=settings.CELERY_RESULT_BACKEND,
+    include=["app.tasks.payroll", "app.tasks.form16", "app.tasks.employee_import"]
+)
+
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    task_track_started=True,
+    # Eager mode executes tasks inline in the calling process, so jobs can be
+    # exercised without a running broker (set CELERY_TASK_ALWAYS_EAGER=true)
+    task_always_eager=settings.CELERY_TASK_ALWAYS_EAGER,
+    task_store_eager_result=False,
+)
@@ -55,6 +55,27 @@ class Settings(BaseSettings):
     # Celery & Redis
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
+    CELERY_TASK_ALWAYS_EAGER: bool = False  # Run tasks in-process (tests / no Redis)
+    
+    # Payroll Engine
+    PAYROLL_BATCH_SIZE: int = 500
+    PAYROLL_JOB_CHUNK_SIZE: int = 1000  # Employees committed per chunk in background runs
+    PAYROLL_WORKERS: int = 1  # Process pool size for sharded runs (<= 1: sequential in-process)
+    PAYROLL_SHARD_SIZE: int = 2000  # Employees per shard in sharded runs
+    ATTENDANCE_BATCH_SIZE: int = 1000  # Rows per INSERT ... ON CONFLICT in bulk attendance upserts
+    CHECKIN_BUFFER_ENABLED: bool = False  # Acknowledge WhatsApp/kiosk check-ins before they are written
+    CHECKIN_FLUSH_INTERVAL_MS: int = 250  # Buffered check-ins are inserted in one batch this often
+    CHECKIN_SPOOL_DIR: str = "storage/checkins"  # Buffered check-ins are spooled here until flushed
+    IMPORT_BATCH_SIZE: int = 1000  # Rows validated and inserted per chunk in employee imports
+    IMPORT_UPLOAD_DIR: str = "storage/imports"  # Import uploads are spooled here while being processed
+
+    # Generated filings (PF ECR, ESI, PT, Form 24Q) cached per data version
+    FILING_CACHE_DIR: str = "storage/filings"
+    FORM16_ARCHIVE_DIR: str = "storage/form16"  # ZIP archives of company-wide Form 16 jobs
+    FORM16_RENDER_BATCH: int = 50  # Certificates rendered per pool task
+    FORM16_WORKERS: int = 1  # Process pool size for Form 16 rendering (<= 1: sequential in-process)
+    PAYSLIP_CACHE_DIR: str = "storage/payslips"  # Content-addressed payslip PDFs
+    PAYSLIP_LINK_EXPIRE_MINUTES: int = 60 * 24  # Signed download links sent over WhatsApp
     
     # Application
     APP_NAME: str = "AutoPayOS AutoPayOS System"
@@ -63,6 +84,7 @@ class Settings(BaseSettings):
     
     # Global SaaS
     FRONTEND_URL: str = "http://localhost:3000"
+    API_BASE_URL: str = "http://localhost:8000"  # Public URL of this API, used in shared links
     STRIPE_API_KEY: Optional[str] = None
     STRIPE_PRICE_ID_INDIA: str = "price_india_4999"  # ₹4,999
     STRIPE_PRICE_ID_GLOBAL: str = "price_global_99"   # $99
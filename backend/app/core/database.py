@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import Enum, create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
@@ -36,3 +36,52 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def chunked(items, size: int):
+    """Yields fixed-size slices so IN (...) lists stay below driver parameter limits."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def stream_with_session(produce, *args, **kwargs):
+    """
+    Runs a generator function with its own session, for StreamingResponse bodies:
+    the request-scoped session from get_db is closed before streaming starts.
+    """
+    db = SessionLocal()
+    try:
+        yield from produce(db, *args, **kwargs)
+    finally:
+        db.close()
+
+
+def sync_enum_types(bind) -> list:
+    """
+    Adds values declared on model enums but missing from existing PostgreSQL
+    enum types, which create_all never alters (e.g. a new AnomalyType). Returns
+    the "type.VALUE" labels added; a no-op on other databases.
+    """
+    if bind.dialect.name != "postgresql":
+        return []
+    added = []
+    seen = set()
+    # ALTER TYPE ... ADD VALUE cannot run inside a transaction block before PostgreSQL 12
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in Base.metadata.tables.values():
+            for column in table.columns:
+                enum = column.type
+                if not isinstance(enum, Enum) or not enum.native_enum or not enum.name or enum.name in seen:
+                    continue
+                seen.add(enum.name)
+                existing = set(conn.execute(text(
+                    "SELECT e.enumlabel FROM pg_enum e JOIN pg_type t ON t.oid = e.enumtypid WHERE t.typname = :name"
+                ), {"name": enum.name}).scalars())
+                if not existing:
+                    continue  # Type not created yet: create_all creates it complete
+                for value in enum.enums:
+                    if value not in existing:
+                        label = value.replace("'", "''")
+                        conn.execute(text(f"ALTER TYPE {enum.name} ADD VALUE IF NOT EXISTS '{label}'"))
+                        added.append(f"{enum.name}.{value}")
+    return added
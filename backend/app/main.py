@@ -2,13 +2,15 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.routes import auth, employees, departments, attendance, leaves, autopay_os, companies, anomalies, ewa, tax_optimizer, whatsapp, copilot, analytics, compliance, billing, admin, invitations, me, investments, talent, lifecycle, assets, performance, engagement, pulse, learning, headcount
-from app.core.database import engine, Base
+from app.core.database import engine, Base, sync_enum_types
 from app.core.security_middleware import SecurityHardeningMiddleware
 
 # Create database tables
 try:
     print(f"📡 Initializing database connection: {settings.ENVIRONMENT}")
     Base.metadata.create_all(bind=engine)
+    for label in sync_enum_types(engine):
+        print(f"✅ Added enum value {label}")
     print("✅ Database tables verified/created.")
 except Exception as e:
     print(f"❌ DATABASE INITIALIZATION ERROR: {str(e)}")
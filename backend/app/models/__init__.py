@@ -5,6 +5,7 @@ from app.models.employee import Employee, Gender, MaritalStatus
 from app.models.attendance import Attendance
 from app.models.leave import LeaveType, LeaveApplication, LeaveStatus
 from app.models.autopay_os import SalaryStructure, AutoPayOSRecord, AutoPayOSStatus
+from app.models.payroll_tracking import PayrollDirtyMark, PayrollPeriodVersion
 from app.models.engagement import EngagementPost, PostReaction, PostComment, PostType, ReactionType
 from app.models.pulse import PulseSurvey, PulseResponse, PulseStatus
 from app.models.performance import OKRGoal, FeedbackReview, GoalStatus, ReviewCycle, ReviewType, OKRLevel, ReviewCycleStatus
@@ -28,6 +29,8 @@ __all__ = [
     "SalaryStructure",
     "AutoPayOSRecord",
     "AutoPayOSStatus",
+    "PayrollDirtyMark",
+    "PayrollPeriodVersion",
     "EngagementPost",
     "PostReaction",
     "PostComment",
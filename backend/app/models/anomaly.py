@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Numeric, Enum as SQLEnum, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, Numeric, Enum as SQLEnum, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -16,9 +16,14 @@ class AnomalyType(str, enum.Enum):
     GHOST_EMPLOYEE = "ghost_employee"
     TAX_ANOMALY = "tax_anomaly"
     DEDUCTION_ERROR = "deduction_error"
+    PAY_OUTLIER = "pay_outlier"
 
 class Anomaly(Base):
     __tablename__ = "anomalies"
+    __table_args__ = (
+        # Open anomalies of a company, newest first
+        Index("ix_anomalies_company_resolved_created", "company_id", "is_resolved", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
@@ -42,3 +47,20 @@ class Anomaly(Base):
     company = relationship("Company")
     employee = relationship("Employee")
     autopay_os_record = relationship("AutoPayOSRecord")
+
+
+class AnomalyRuleSetting(Base):
+    """Per-company override of a registered anomaly rule (see app.services.anomaly_rules)."""
+    __tablename__ = "anomaly_rule_settings"
+    __table_args__ = (
+        UniqueConstraint("company_id", "rule_key", name="uq_anomaly_rule_setting_company_rule"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False, index=True)
+    rule_key = Column(String, nullable=False)
+    is_enabled = Column(Boolean, default=True)
+    thresholds = Column(JSON) # Overrides merged over the rule's defaults
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
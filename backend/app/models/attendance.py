@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Time, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Time, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
 
 class Attendance(Base):
     __tablename__ = "attendance"
+    __table_args__ = (
+        # One row per employee per day; also the conflict target of bulk upserts
+        UniqueConstraint("employee_id", "date", name="uq_attendance_employee_date"),
+        # Date-range reads ordered by (date, id), e.g. keyset pages of the attendance API
+        Index("ix_attendance_date_id", "date", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False)
@@ -19,3 +25,21 @@ class Attendance(Base):
     
     # Relationships
     employee = relationship("Employee", back_populates="attendance_records")
+
+
+class AttendanceMonthlySummary(Base):
+    """Per-employee monthly status counts, maintained on every attendance write."""
+    __tablename__ = "attendance_monthly_summary"
+    __table_args__ = (
+        UniqueConstraint("employee_id", "year", "month", name="uq_attendance_summary_employee_period"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    present_days = Column(Integer, default=0)
+    half_days = Column(Integer, default=0)
+    leave_days = Column(Integer, default=0)
+    absent_days = Column(Integer, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
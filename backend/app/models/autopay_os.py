@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Numeric, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, Numeric, Enum as SQLEnum, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -41,6 +41,12 @@ class AutoPayOSStatus(str, enum.Enum):
 
 class AutoPayOSRecord(Base):
     __tablename__ = "autopay_os_records"
+    __table_args__ = (
+        # Company period runs, filings and reports filter on period and status
+        Index("ix_autopay_os_records_company_period_status", "company_id", "year", "month", "status"),
+        # An employee's record for a period (payslips, Form 16, recompute checks)
+        Index("ix_autopay_os_records_employee_period", "employee_id", "year", "month"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False)
@@ -80,3 +86,92 @@ class AutoPayOSRecord(Base):
     
     # Relationships
     employee = relationship("Employee", back_populates="autopay_os_records")
+
+
+class PayrollJobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class PayrollRunJob(Base):
+    """A payroll run executed in the background, committed chunk by chunk."""
+    __tablename__ = "payroll_run_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    created_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    task_id = Column(String, nullable=True)
+    
+    month = Column(Integer, nullable=False)
+    year = Column(Integer, nullable=False)
+    employee_ids = Column(JSON, nullable=False)
+    
+    # Progress
+    status = Column(SQLEnum(PayrollJobStatus), default=PayrollJobStatus.QUEUED)
+    total = Column(Integer, default=0)
+    processed = Column(Integer, default=0)   # Employees handled (written, skipped or failed)
+    records_written = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    errors = Column(JSON, default=list)      # [{"employee_ids": [...], "error": "..."}]
+    
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class Form16Job(Base):
+    """Company-wide Form 16 generation for a financial year, written to a ZIP archive."""
+    __tablename__ = "form16_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    created_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    task_id = Column(String, nullable=True)
+
+    financial_year = Column(String, nullable=False)  # e.g. 2025-26
+
+    # Progress
+    status = Column(SQLEnum(PayrollJobStatus), default=PayrollJobStatus.QUEUED)
+    total = Column(Integer, default=0)
+    processed = Column(Integer, default=0)   # Certificates rendered or failed
+    failed = Column(Integer, default=0)
+    errors = Column(JSON, default=list)      # [{"employee_ids": [...], "error": "..."}]
+    archive_path = Column(String, nullable=True)
+
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class EmployeeImportJob(Base):
+    """
+    Employee bulk import running in the background. Each chunk of rows is committed
+    together with the checkpoint, so a failed job resumes after the last committed chunk.
+    """
+    __tablename__ = "employee_import_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    created_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    task_id = Column(String, nullable=True)
+
+    filename = Column(String, nullable=False)   # Name of the uploaded file
+    file_path = Column(String, nullable=True)   # Spooled upload, removed once the job completes
+
+    # Progress
+    status = Column(SQLEnum(PayrollJobStatus), default=PayrollJobStatus.QUEUED)
+    total_rows = Column(Integer, default=0)      # Data rows in the file (header excluded)
+    checkpoint_row = Column(Integer, default=0)  # Data rows before this index are committed
+    imported = Column(Integer, default=0)
+    rejected = Column(Integer, default=0)
+    errors = Column(JSON, default=list)          # [{"row": 7, "employee_code": "...", "errors": [...]}]
+    error = Column(String, nullable=True)        # Why the last attempt stopped; cleared on resume
+
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
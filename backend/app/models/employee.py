@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Numeric, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Index, Numeric, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -20,6 +20,10 @@ class MaritalStatus(str, enum.Enum):
 
 class Employee(Base):
     __tablename__ = "employees"
+    __table_args__ = (
+        # Active headcount of a company (payroll runs, dashboards)
+        Index("ix_employees_company_active", "company_id", "is_active"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
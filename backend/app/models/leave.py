@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -25,6 +25,10 @@ class LeaveType(Base):
 
 class LeaveApplication(Base):
     __tablename__ = "leave_applications"
+    __table_args__ = (
+        # Approved/pending leave of an employee
+        Index("ix_leave_applications_employee_status", "employee_id", "status"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False)
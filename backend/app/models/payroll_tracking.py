@@ -0,0 +1,170 @@
+from datetime import date, datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint, event, inspect, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app.core.database import Base
+from app.models.attendance import Attendance
+from app.models.autopay_os import AutoPayOSRecord, SalaryStructure
+from app.models.company import Company
+from app.models.leave import LeaveApplication
+
+ALL_PERIODS = 0  # year/month value of marks that affect every payroll period
+
+# Dialect-native INSERT constructs that support ON CONFLICT ... DO UPDATE
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# Company fields printed on statutory filings: changing one invalidates cached filings
+FILING_COMPANY_COLUMNS = [
+    "name", "registration_number", "pan", "tan", "pf_number", "esi_number",
+    "pt_registration", "address", "city", "state", "pincode",
+]
+
+
+class PayrollDirtyMark(Base):
+    """
+    Records that an employee's payroll inputs changed. A processed record is
+    stale when a mark for its period (or for ALL_PERIODS) is newer than its
+    processed_at. Marks are appended on write and cleared by payroll runs.
+    """
+    __tablename__ = "payroll_dirty_marks"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False, index=True)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    source = Column(String, nullable=False)  # attendance, salary_structure, leave
+    marked_at = Column(DateTime(timezone=True), nullable=False)
+
+
+def mark_dirty(connection, rows) -> None:
+    """Appends marks for (employee_id, year, month, source) tuples; use for Core-level bulk writes."""
+    now = datetime.now()
+    marks = [
+        {"employee_id": emp_id, "year": year, "month": month, "source": source, "marked_at": now}
+        for emp_id, year, month, source in set(rows) if emp_id is not None
+    ]
+    if not marks:
+        return
+    # Only the newest ALL_PERIODS mark of an employee matters: keep one per employee
+    superseded = {m["employee_id"] for m in marks if m["year"] == ALL_PERIODS}
+    if superseded:
+        table = PayrollDirtyMark.__table__
+        connection.execute(table.delete().where(
+            table.c.employee_id.in_(superseded), table.c.year == ALL_PERIODS
+        ))
+    connection.execute(PayrollDirtyMark.__table__.insert(), marks)
+
+
+class PayrollPeriodVersion(Base):
+    """
+    Monotonic data version of a company's payroll period. Bumped whenever an
+    AutoPayOSRecord of the period is written, so derived artefacts (filings,
+    exports) can be cached under (company, period, version).
+    """
+    __tablename__ = "payroll_period_versions"
+    __table_args__ = (
+        UniqueConstraint("company_id", "year", "month", name="uq_payroll_period_version"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+
+def bump_period_versions(connection, periods) -> None:
+    """Increments the version of each (company_id, year, month); use for Core-level bulk writes."""
+    now = datetime.now()
+    table = PayrollPeriodVersion.__table__
+    # Sorted so concurrent writers lock period rows in the same order
+    periods = sorted({p for p in periods if p[0] is not None})
+    if not periods:
+        return
+    dialect = connection.dialect.name
+    if dialect in UPSERT_INSERTS:
+        # One atomic upsert: concurrent first writers of a period cannot both insert
+        stmt = UPSERT_INSERTS[dialect](table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["company_id", "year", "month"],
+            set_={"version": table.c.version + 1, "updated_at": stmt.excluded.updated_at}
+        )
+        connection.execute(stmt, [
+            {"company_id": company_id, "year": year, "month": month, "version": 1, "updated_at": now}
+            for company_id, year, month in periods
+        ])
+        return
+    for company_id, year, month in periods:
+        result = connection.execute(
+            update(table).where(
+                table.c.company_id == company_id, table.c.year == year, table.c.month == month
+            ).values(version=table.c.version + 1, updated_at=now)
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(
+                company_id=company_id, year=year, month=month, version=1, updated_at=now
+            ))
+
+
+def _months_between(start: date, end: date):
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def _changed_values(target, attr: str):
+    """Current value plus any value replaced in this flush (dates or plain period columns)."""
+    history = inspect(target).attrs[attr].history
+    return [d for d in [getattr(target, attr), *(history.deleted or ())] if d is not None]
+
+
+@event.listens_for(Attendance, "after_insert")
+@event.listens_for(Attendance, "after_update")
+@event.listens_for(Attendance, "after_delete")
+def _attendance_changed(mapper, connection, target):
+    mark_dirty(connection, [
+        (target.employee_id, d.year, d.month, "attendance") for d in _changed_values(target, "date")
+    ])
+
+
+@event.listens_for(SalaryStructure, "after_insert")
+@event.listens_for(SalaryStructure, "after_update")
+@event.listens_for(SalaryStructure, "after_delete")
+def _salary_structure_changed(mapper, connection, target):
+    mark_dirty(connection, [(target.employee_id, ALL_PERIODS, ALL_PERIODS, "salary_structure")])
+
+
+@event.listens_for(LeaveApplication, "after_insert")
+@event.listens_for(LeaveApplication, "after_update")
+@event.listens_for(LeaveApplication, "after_delete")
+def _leave_changed(mapper, connection, target):
+    if not target.start_date or not target.end_date:
+        return
+    mark_dirty(connection, [
+        (target.employee_id, year, month, "leave")
+        for year, month in _months_between(target.start_date, target.end_date)
+    ])
+
+
+@event.listens_for(AutoPayOSRecord, "after_insert")
+@event.listens_for(AutoPayOSRecord, "after_update")
+@event.listens_for(AutoPayOSRecord, "after_delete")
+def _autopay_os_record_changed(mapper, connection, target):
+    # A record moved to another period invalidates the one it left as well
+    years = _changed_values(target, "year")
+    months = _changed_values(target, "month")
+    bump_period_versions(connection, [(target.company_id, y, m) for y in years for m in months])
+
+
+@event.listens_for(Company, "after_update")
+def _company_changed(mapper, connection, target):
+    # Filings print company details: bump every period so their cached copies go stale
+    state = inspect(target)
+    if any(state.attrs[col].history.has_changes() for col in FILING_COMPANY_COLUMNS):
+        table = PayrollPeriodVersion.__table__
+        connection.execute(
+            update(table).where(table.c.company_id == target.id).values(
+                version=table.c.version + 1, updated_at=datetime.now()
+            )
+        )
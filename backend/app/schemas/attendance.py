@@ -34,3 +34,8 @@ class AttendanceBulkItem(BaseModel):
     check_in: Optional[time] = None
     check_out: Optional[time] = None
     status: str = "Present"
+
+class AttendanceCheckIn(BaseModel):
+    employee_id: int
+    check_in: Optional[time] = None  # Defaults to the time the check-in is received
+    work_location: str = "Office"
@@ -1,8 +1,8 @@
 from pydantic import BaseModel, ConfigDict
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 from decimal import Decimal
-from app.models.autopay_os import AutoPayOSStatus
+from app.models.autopay_os import AutoPayOSStatus, PayrollJobStatus
 
 class SalaryStructureBase(BaseModel):
     basic: Decimal
@@ -58,7 +58,7 @@ class AutoPayOSRecordBase(BaseModel):
     pf_deduction: Decimal
     esi_deduction: Decimal
     pt_deduction: Decimal
-    income_tax_deduction: Decimal
+    income_tax_deduction: Optional[Decimal] = None
     employer_pf_contribution: Decimal = Decimal("0.0")
     employer_esi_contribution: Decimal = Decimal("0.0")
     status: AutoPayOSStatus = AutoPayOSStatus.DRAFT
@@ -81,9 +81,35 @@ class AutoPayOSRecord(AutoPayOSRecordBase):
     model_config = ConfigDict(from_attributes=True)
 
 class AutoPayOSProcessRequest(BaseModel):
-    employee_ids: List[int]
+    employee_ids: Optional[List[int]] = None  # None: all active employees of the company
     month: int
     year: int
+    run_in_background: bool = False  # Enqueue as a PayrollRunJob and return its status
+    sharded: bool = False  # Compute shards on a PAYROLL_WORKERS process pool
+    incremental: bool = False  # Only recompute employees whose inputs changed since processed_at
+
+class PayrollJob(BaseModel):
+    id: int
+    status: PayrollJobStatus
+    month: int
+    year: int
+    total: int
+    processed: int
+    records_written: int
+    failed: int
+    errors: List[Dict[str, Any]] = []
+    progress_percent: float
+    eta_seconds: Optional[float] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    created_at: datetime
+
+class AutoPayOSIncrementalResult(BaseModel):
+    """Response of an incremental /process run: the dirty split plus the run's output."""
+    recomputed: int
+    skipped: int
+    records: Optional[List[AutoPayOSRecord]] = None  # Synchronous runs
+    job: Optional[PayrollJob] = None  # run_in_background
 
 class AutoPayOSSummary(BaseModel):
     total_employees: int
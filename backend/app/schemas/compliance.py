@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import Optional, List, Dict, Any
+from datetime import datetime
+from app.models.autopay_os import PayrollJobStatus
+
+class Form16JobCreate(BaseModel):
+    financial_year: Optional[str] = None  # e.g. 2025-26, defaults to CURRENT_FY
+
+class Form16Job(BaseModel):
+    id: int
+    status: PayrollJobStatus
+    financial_year: str
+    total: int
+    processed: int
+    failed: int
+    errors: List[Dict[str, Any]] = []
+    progress_percent: float
+    pdfs_per_second: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    download_ready: bool = False
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    created_at: datetime
@@ -1,6 +1,7 @@
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from pydantic import BaseModel, EmailStr, ConfigDict
 from datetime import date, datetime
+from app.models.autopay_os import PayrollJobStatus
 
 class EmployeeBase(BaseModel):
     full_name: str
@@ -50,3 +51,21 @@ class Employee(EmployeeBase):
     updated_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
+
+class EmployeeImportJob(BaseModel):
+    id: int
+    status: PayrollJobStatus
+    filename: str
+    total_rows: int
+    checkpoint_row: int
+    imported: int
+    rejected: int
+    errors: List[Dict[str, Any]] = []
+    error: Optional[str] = None
+    progress_percent: float
+    rows_per_second: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    can_resume: bool = False
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    created_at: datetime
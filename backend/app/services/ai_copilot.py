@@ -10,11 +10,12 @@ import re
 from datetime import datetime, timedelta
 
 from app.models.employee import Employee
-from app.models.autopay_os import AutoPayOSRecord, AutoPayOSStatus
+from app.models.autopay_os import AutoPayOSRecord, AutoPayOSStatus, SalaryStructure
 from app.models.company import Department
-from app.models.attendance import Attendance
 from app.models.leave import LeaveApplication, LeaveStatus
 from app.models.performance import OKRGoal, FeedbackReview
+from app.services.payroll_calculator import PayrollCalculator
+from app.services.attendance_summary import AttendanceSummaryService
 
 
 class AICopilotService:
@@ -187,19 +188,28 @@ class AICopilotService:
 
     @staticmethod
     def _simulate_hike(db: Session, company_id: int, percent: int, dept_name: Optional[str]) -> Dict[str, Any]:
-        query = db.query(func.sum(AutoPayOSRecord.net_pay)).filter(
-            AutoPayOSRecord.company_id == company_id,
-            AutoPayOSRecord.status == AutoPayOSStatus.PAID
+        """Re-runs a full-month payroll on hiked salary structures (CTC = gross + employer PF/ESI)."""
+        query = db.query(SalaryStructure).join(Employee, SalaryStructure.employee_id == Employee.id).filter(
+            Employee.company_id == company_id,
+            Employee.is_active == True
         )
         if dept_name:
-            query = query.join(Employee).join(Department).filter(Department.name == dept_name)
-        current_cost = float(query.scalar() or 0)
-        new_cost = current_cost * (1 + percent / 100)
-        diff = new_cost - current_cost
+            query = query.join(Department, Employee.department_id == Department.id).filter(Department.name == dept_name)
+        structures = query.all()
+
+        def monthly_cost_paise(hike_percent: float) -> int:
+            cols = PayrollCalculator.compute_structures(structures, [30] * len(structures), 30, hike_percent)
+            return int(cols["gross_earnings"].sum() + cols["employer_pf_contribution"].sum() + cols["employer_esi_contribution"].sum())
+
+        current_paise = monthly_cost_paise(0)
+        new_paise = monthly_cost_paise(percent)
+        current_cost = current_paise / 100
+        new_cost = new_paise / 100
+        diff = (new_paise - current_paise) / 100
         target = dept_name if dept_name else "entire company"
         return {
             "answer": f"💡 A **{percent}% hike** for {target} increases monthly cost by **₹{diff:,.2f}** → total: **₹{new_cost:,.2f}**",
-            "data": {"increase": diff, "new_total": new_cost}, "type": "insight"
+            "data": {"increase": diff, "new_total": new_cost, "current_total": current_cost, "employees": len(structures)}, "type": "insight"
         }
 
     @staticmethod
@@ -252,6 +262,11 @@ class AICopilotService:
             Employee.company_id == company_id, Employee.is_active == True
         ).all()
 
+        # Summary windows are whole months: this one and the two before
+        absences = AttendanceSummaryService.get_window_counts(
+            db, *AttendanceSummaryService.month_window(datetime.now().date(), 3), company_id=company_id
+        )
+
         risk_report = []
         for emp in employees:
             score = 0
@@ -271,11 +286,7 @@ class AICopilotService:
                 signals.append(f"Above-avg leave ({int(leave_days)} days)")
 
             # Signal 2: Low attendance
-            absent_count = db.query(func.count(Attendance.id)).filter(
-                Attendance.employee_id == emp.id,
-                Attendance.status == "absent",
-                Attendance.date >= three_months_ago.date()
-            ).scalar() or 0
+            absent_count = absences.get(emp.id, {}).get("absent", 0)
             if absent_count > 8:
                 score += 25
                 signals.append(f"Frequent absences ({absent_count} days)")
@@ -392,17 +403,10 @@ class AICopilotService:
 
     @staticmethod
     def _attendance_summary(db: Session, company_id: int) -> Dict[str, Any]:
-        this_month = datetime.now().replace(day=1).date()
-        absent = db.query(func.count(Attendance.id)).join(Employee).filter(
-            Employee.company_id == company_id,
-            Attendance.status == "absent",
-            Attendance.date >= this_month
-        ).scalar() or 0
-        present = db.query(func.count(Attendance.id)).join(Employee).filter(
-            Employee.company_id == company_id,
-            Attendance.status == "present",
-            Attendance.date >= this_month
-        ).scalar() or 0
+        today = datetime.now().date()
+        counts = AttendanceSummaryService.get_window_counts(db, today, today, company_id=company_id).values()
+        absent = sum(c["absent"] for c in counts)
+        present = sum(c["present"] for c in counts)
         total = absent + present
         rate = round(present / total * 100, 1) if total > 0 else 0
         return {
@@ -1,80 +1,166 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime
+from sqlalchemy import func, insert
+from datetime import date
 from decimal import Decimal
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.database import chunked
 
 from app.models.autopay_os import AutoPayOSRecord, AutoPayOSStatus
 from app.models.anomaly import Anomaly, AnomalyType, AnomalySeverity
 from app.models.employee import Employee
+from app.services.anomaly_rules import AnomalyRuleService
+from app.services.payroll_calculator import PayrollCalculator
 
 class AnomalyDetectionService:
     @staticmethod
-    def analyze_autopay_os_record(db: Session, record: AutoPayOSRecord) -> List[Anomaly]:
-        anomalies = []
-        
-        # 1. Salary Spike Detection (> 20% increase from previous month)
-        # Fix: Fetching the employee via ID since record.employee might not be loaded
-        employee = db.query(Employee).filter(Employee.id == record.employee_id).first()
-        if not employee:
-            return []
+    def _load_run(db: Session, company_id: int, month: int, year: int, employee_ids: Optional[List[int]] = None) -> List:
+        """Current-period records of a payroll run as column tuples."""
+        columns = (
+            AutoPayOSRecord.id,
+            AutoPayOSRecord.employee_id,
+            AutoPayOSRecord.gross_earnings,
+            AutoPayOSRecord.total_deductions,
+            AutoPayOSRecord.net_pay,
+            AutoPayOSRecord.pf_deduction,
+            AutoPayOSRecord.esi_deduction,
+            AutoPayOSRecord.pt_deduction,
+            AutoPayOSRecord.income_tax_deduction,
+        )
+        base = db.query(*columns).filter(
+            AutoPayOSRecord.company_id == company_id,
+            AutoPayOSRecord.month == month,
+            AutoPayOSRecord.year == year
+        )
+        if employee_ids is None:
+            return base.all()
+        rows = []
+        for chunk in chunked(employee_ids, settings.PAYROLL_BATCH_SIZE):
+            rows.extend(base.filter(AutoPayOSRecord.employee_id.in_(chunk)).all())
+        return rows
 
-        previous_record = db.query(AutoPayOSRecord).filter(
-            AutoPayOSRecord.employee_id == record.employee_id,
+    @staticmethod
+    def _load_previous_gross(db: Session, company_id: int, month: int, year: int, employee_ids: Optional[List[int]] = None) -> Dict[int, Decimal]:
+        """Gross of the latest PAID record before the period, per employee, via one ROW_NUMBER() query."""
+        query = db.query(
+            AutoPayOSRecord.employee_id,
+            AutoPayOSRecord.gross_earnings,
+            func.row_number().over(
+                partition_by=AutoPayOSRecord.employee_id,
+                order_by=(AutoPayOSRecord.year.desc(), AutoPayOSRecord.month.desc())
+            ).label("rn")
+        ).filter(
+            AutoPayOSRecord.company_id == company_id,
             AutoPayOSRecord.status == AutoPayOSStatus.PAID,
-            (AutoPayOSRecord.year * 12 + AutoPayOSRecord.month) < (record.year * 12 + record.month)
-        ).order_by(AutoPayOSRecord.year.desc(), AutoPayOSRecord.month.desc()).first()
-        
-        if previous_record and previous_record.gross_earnings > 0:
-            diff_percent = (record.gross_earnings - previous_record.gross_earnings) / previous_record.gross_earnings * 100
-            if diff_percent > 20:
-                anomalies.append(Anomaly(
-                    company_id=employee.company_id,
-                    employee_id=record.employee_id,
-                    autopay_os_record_id=record.id,
-                    type=AnomalyType.SALARY_SPIKE,
-                    severity=AnomalySeverity.HIGH,
-                    title="Significant Salary Spike Detected",
-                    description=f"Gross pay increased by {diff_percent:.2f}% compared to last pay cycle.",
-                    data={
-                        "previous_gross": float(previous_record.gross_earnings),
-                        "current_gross": float(record.gross_earnings),
-                        "diff_percent": float(diff_percent)
-                    }
-                ))
+            (AutoPayOSRecord.year * 12 + AutoPayOSRecord.month) < (year * 12 + month)
+        )
+        if employee_ids is None:
+            chunks = [query]
+        else:
+            chunks = [query.filter(AutoPayOSRecord.employee_id.in_(chunk)) for chunk in chunked(employee_ids, settings.PAYROLL_BATCH_SIZE)]
 
-        # 2. Compliance: Missing PF check (> 15k INR)
-        if record.gross_earnings > 15000 and (not record.pf_deduction or record.pf_deduction == 0):
-             anomalies.append(Anomaly(
-                company_id=employee.company_id,
-                employee_id=record.employee_id,
-                autopay_os_record_id=record.id,
-                type=AnomalyType.COMPLIANCE_MISMATCH,
-                severity=AnomalySeverity.MEDIUM,
-                title="Potential PF Compliance Issue",
-                description="Salary exceeds 15,000 INR but no PF deduction was found.",
-                data={"gross": float(record.gross_earnings)}
-            ))
+        previous = {}
+        for q in chunks:
+            ranked = q.subquery()
+            for emp_id, gross, _ in db.query(ranked).filter(ranked.c.rn == 1).all():
+                previous[emp_id] = gross
+        return previous
 
-        # 3. Income Tax Anomaly
-        if record.gross_earnings > 100000 and (not record.income_tax_deduction or record.income_tax_deduction < (record.gross_earnings * Decimal('0.05'))):
-             anomalies.append(Anomaly(
-                company_id=employee.company_id,
-                employee_id=record.employee_id,
-                autopay_os_record_id=record.id,
-                type=AnomalyType.TAX_ANOMALY,
-                severity=AnomalySeverity.HIGH,
-                title="Abnormally Low TDS Deduction",
-                description="High salary detected with less than 5% TDS.",
-                data={"gross": float(record.gross_earnings), "tds": float(record.income_tax_deduction or 0)}
-            ))
+    @staticmethod
+    def _load_employee_attributes(db: Session, company_id: int, employee_ids: List[int], month: int, year: int) -> Dict[int, tuple]:
+        """(is_active, left_before_period, shared_bank_account, department_id, designation) per employee in the run."""
+        period_start = date(year, month, 1)
+        shared_accounts = {
+            account for (account,) in db.query(Employee.bank_account_number).filter(
+                Employee.company_id == company_id,
+                Employee.bank_account_number.isnot(None),
+                Employee.bank_account_number != ""
+            ).group_by(Employee.bank_account_number).having(func.count(Employee.id) > 1).all()
+        }
+        flags = {}
+        for chunk in chunked(employee_ids, settings.PAYROLL_BATCH_SIZE):
+            rows = db.query(
+                Employee.id, Employee.is_active, Employee.date_of_leaving, Employee.bank_account_number,
+                Employee.department_id, Employee.designation
+            ).filter(Employee.id.in_(chunk)).all()
+            for emp_id, is_active, date_of_leaving, account, department_id, designation in rows:
+                flags[emp_id] = (
+                    bool(is_active),
+                    date_of_leaving is not None and date_of_leaving < period_start,
+                    account in shared_accounts,
+                    department_id,
+                    designation
+                )
+        return flags
+
+    @staticmethod
+    def build_frame(db: Session, company_id: int, month: int, year: int, employee_ids: Optional[List[int]] = None, requires: Iterable[str] = ()) -> Dict[str, np.ndarray]:
+        """Loads a payroll run as the column frame consumed by anomaly rules (money in paise)."""
+        records = AnomalyDetectionService._load_run(db, company_id, month, year, employee_ids)
+        money = PayrollCalculator.to_paise
+        cols = {
+            "record_id": np.array([r[0] for r in records], dtype=np.int64),
+            "employee_id": np.array([r[1] for r in records], dtype=np.int64),
+        }
+        for i, name in enumerate(["gross", "deductions", "net", "pf", "esi", "pt", "tds"], start=2):
+            cols[name] = money(r[i] for r in records)
 
+        requires = set(requires)
+        run_employees = cols["employee_id"].tolist()
+        if "previous" in requires:
+            previous = AnomalyDetectionService._load_previous_gross(db, company_id, month, year, employee_ids)
+            cols["has_previous"] = np.array([e in previous for e in run_employees], dtype=bool)
+            cols["previous_gross"] = money(previous.get(e) for e in run_employees)
+        if requires & {"employee", "peers"}:
+            attributes = AnomalyDetectionService._load_employee_attributes(db, company_id, run_employees, month, year)
+            missing = (False, False, False, None, None)
+            for i, name in enumerate(["is_active", "left_before_period", "shared_bank_account"]):
+                cols[name] = np.array([attributes.get(e, missing)[i] for e in run_employees], dtype=bool)
+            # Peer groups are (department, designation) pairs encoded as dense integer codes
+            codes: Dict[tuple, int] = {}
+            keys = [attributes.get(e, missing)[3:] for e in run_employees]
+            cols["peer_group"] = np.array([codes.setdefault(k, len(codes)) for k in keys], dtype=np.int64)
+            cols["peer_labels"] = np.array(list(codes), dtype=object).reshape(-1, 2) if codes else np.empty((0, 2), dtype=object)
+        return cols
+
+    @staticmethod
+    def analyze_payroll_run(db: Session, company_id: int, month: int, year: int, employee_ids: Optional[List[int]] = None) -> int:
+        """
+        Set-based anomaly detection for a payroll run (optionally limited to employee_ids).
+        The company's enabled rules are evaluated as vector predicates over one column
+        frame, so the query count does not grow with headcount or the number of rules.
+        Replaces the run's unresolved anomalies in a single transaction; returns the number raised.
+        """
+        rules = AnomalyRuleService.resolve(db, company_id)
+        requires = {group for rule, _ in rules for group in rule.requires}
+        cols = AnomalyDetectionService.build_frame(db, company_id, month, year, employee_ids, requires)
+        if not len(cols["record_id"]):
+            return 0
+        anomalies = AnomalyRuleService.evaluate(cols, rules, company_id)
+
+        # Replace the run's open findings so reprocessing does not duplicate them
+        for chunk in chunked(cols["record_id"].tolist(), settings.PAYROLL_BATCH_SIZE):
+            db.query(Anomaly).filter(
+                Anomaly.autopay_os_record_id.in_(chunk),
+                Anomaly.is_resolved == False
+            ).delete(synchronize_session=False)
         if anomalies:
-            for anomaly in anomalies:
-                db.add(anomaly)
-            db.commit()
-            
-        return anomalies
+            db.execute(insert(Anomaly), anomalies)
+        db.commit()
+        return len(anomalies)
+
+    @staticmethod
+    def safe_analyze_payroll_run(db: Session, company_id: int, month: int, year: int, employee_ids: Optional[List[int]] = None) -> int:
+        """analyze_payroll_run for use after a payroll commit; failures never block the payroll run."""
+        try:
+            return AnomalyDetectionService.analyze_payroll_run(db, company_id, month, year, employee_ids)
+        except Exception as e:
+            db.rollback()
+            print(f"Warning: Anomaly detection failed for {month}/{year} run of company {company_id}: {e}")
+            return 0
 
     @staticmethod
     def get_company_anomalies(db: Session, company_id: int, resolved: Optional[bool] = None) -> List[Anomaly]:
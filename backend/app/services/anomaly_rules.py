@@ -0,0 +1,345 @@
+import numpy as np
+from typing import Any, Dict, List, Tuple
+from sqlalchemy.orm import Session
+
+from app.models.anomaly import AnomalyRuleSetting, AnomalyType, AnomalySeverity
+
+# Column frame used by every rule: one numpy array per column, one row per payslip.
+# Money is int64 paise. Optional column groups are only loaded when a rule requires them:
+#   "previous": previous_gross, has_previous
+#   "employee": is_active, left_before_period, shared_bank_account
+#   "peers": peer_group (dense code per department/designation), peer_labels (code -> pair)
+RULES: Dict[str, "AnomalyRule"] = {}
+
+
+def register(rule):
+    """Class decorator adding a rule to the registry under its key."""
+    RULES[rule.key] = rule
+    return rule
+
+
+def paise(rupees) -> int:
+    return int(round(float(rupees) * 100))
+
+
+def rupees(value) -> float:
+    return int(value) / 100
+
+
+def grouped_median(groups: np.ndarray, values: np.ndarray, n_groups: int) -> np.ndarray:
+    """Median of values per group code in one sort (groups are dense codes 0..n_groups-1)."""
+    order = np.lexsort((values, groups))
+    ordered = values[order]
+    counts = np.bincount(groups, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    lower = ordered[np.minimum(starts + (counts - 1) // 2, len(ordered) - 1)]
+    upper = ordered[np.minimum(starts + counts // 2, len(ordered) - 1)]
+    return np.where(counts > 0, (lower + upper) / 2, np.nan)
+
+
+def robust_z(groups: np.ndarray, values: np.ndarray, n_groups: int) -> Dict[str, np.ndarray]:
+    """
+    Modified z-score (x - median) / (1.4826 * MAD) per group. Rows in groups whose MAD
+    is 0 (slab-driven columns such as PT, where most peers pay the same) score 0.
+    Returns per-row z plus per-group median/MAD for the baseline.
+    """
+    values = values.astype(np.float64)
+    median = grouped_median(groups, values, n_groups)
+    deviation = np.abs(values - median[groups])
+    mad = grouped_median(groups, deviation, n_groups)
+    counts = np.bincount(groups, minlength=n_groups)
+    row_scale = 1.4826 * mad[groups]
+    z = np.divide(values - median[groups], row_scale, out=np.zeros_like(values), where=row_scale > 0)
+    return {"z": z, "median": median, "mad": mad, "count": counts}
+
+
+class AnomalyRule:
+    """
+    A set-based anomaly check. predicate() gets the whole run as columns and
+    returns a boolean mask, so a rule costs one vector expression, not a query per payslip.
+    """
+    key: str = ""
+    type: AnomalyType = AnomalyType.COMPLIANCE_MISMATCH
+    severity: AnomalySeverity = AnomalySeverity.MEDIUM
+    title: str = ""
+    defaults: Dict[str, Any] = {}
+    requires: Tuple[str, ...] = ()
+
+    @staticmethod
+    def predicate(cols: Dict[str, np.ndarray], params: Dict[str, Any]) -> np.ndarray:
+        raise NotImplementedError
+
+    @staticmethod
+    def details(cols: Dict[str, np.ndarray], i: int, params: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """(description, data) for a flagged row."""
+        raise NotImplementedError
+
+
+@register
+class SalarySpikeRule(AnomalyRule):
+    key = "salary_spike"
+    type = AnomalyType.SALARY_SPIKE
+    severity = AnomalySeverity.HIGH
+    title = "Significant Salary Spike Detected"
+    defaults = {"max_increase_percent": 20}
+    requires = ("previous",)
+
+    @staticmethod
+    def predicate(cols, params):
+        # (gross - previous) / previous * 100 > limit, kept in integers
+        limit = paise(params["max_increase_percent"])
+        previous = cols["previous_gross"]
+        return cols["has_previous"] & (previous > 0) & ((cols["gross"] - previous) * 100_00 > limit * previous)
+
+    @staticmethod
+    def details(cols, i, params):
+        previous, current = int(cols["previous_gross"][i]), int(cols["gross"][i])
+        diff_percent = (current - previous) * 100 / previous
+        return (
+            f"Gross pay increased by {diff_percent:.2f}% compared to last pay cycle.",
+            {"previous_gross": rupees(previous), "current_gross": rupees(current), "diff_percent": diff_percent}
+        )
+
+
+@register
+class MissingPFRule(AnomalyRule):
+    key = "missing_pf"
+    type = AnomalyType.COMPLIANCE_MISMATCH
+    severity = AnomalySeverity.MEDIUM
+    title = "Potential PF Compliance Issue"
+    defaults = {"gross_above": 15000}
+
+    @staticmethod
+    def predicate(cols, params):
+        return (cols["gross"] > paise(params["gross_above"])) & (cols["pf"] == 0)
+
+    @staticmethod
+    def details(cols, i, params):
+        return (
+            f"Salary exceeds {params['gross_above']:,} INR but no PF deduction was found.",
+            {"gross": rupees(cols["gross"][i])}
+        )
+
+
+@register
+class LowTDSRule(AnomalyRule):
+    key = "low_tds"
+    type = AnomalyType.TAX_ANOMALY
+    severity = AnomalySeverity.HIGH
+    title = "Abnormally Low TDS Deduction"
+    defaults = {"gross_above": 100000, "min_tds_percent": 5}
+
+    @staticmethod
+    def predicate(cols, params):
+        minimum = paise(params["min_tds_percent"])
+        return (cols["gross"] > paise(params["gross_above"])) & (cols["tds"] * 100_00 < minimum * cols["gross"])
+
+    @staticmethod
+    def details(cols, i, params):
+        return (
+            f"High salary detected with less than {params['min_tds_percent']}% TDS.",
+            {"gross": rupees(cols["gross"][i]), "tds": rupees(cols["tds"][i])}
+        )
+
+
+@register
+class GhostEmployeeRule(AnomalyRule):
+    key = "ghost_employee"
+    type = AnomalyType.GHOST_EMPLOYEE
+    severity = AnomalySeverity.CRITICAL
+    title = "Possible Ghost Employee"
+    defaults = {"flag_shared_bank_account": True}
+    requires = ("employee",)
+
+    @staticmethod
+    def predicate(cols, params):
+        suspicious = ~cols["is_active"] | cols["left_before_period"]
+        if params["flag_shared_bank_account"]:
+            suspicious = suspicious | cols["shared_bank_account"]
+        return (cols["net"] > 0) & suspicious
+
+    @staticmethod
+    def details(cols, i, params):
+        reasons = []
+        if not cols["is_active"][i]:
+            reasons.append("employee is inactive")
+        if cols["left_before_period"][i]:
+            reasons.append("employee left before the pay period")
+        if params["flag_shared_bank_account"] and cols["shared_bank_account"][i]:
+            reasons.append("bank account is shared with another employee")
+        return (
+            f"Net pay was generated although {' and '.join(reasons)}.",
+            {"net": rupees(cols["net"][i]), "reasons": reasons}
+        )
+
+
+@register
+class DeductionErrorRule(AnomalyRule):
+    key = "deduction_error"
+    type = AnomalyType.DEDUCTION_ERROR
+    severity = AnomalySeverity.HIGH
+    title = "Deduction Totals Do Not Reconcile"
+    defaults = {"tolerance": 1}
+
+    @staticmethod
+    def _itemized(cols):
+        # The components PayrollCalculator totals; TDS is recorded separately
+        return cols["pf"] + cols["esi"] + cols["pt"]
+
+    @staticmethod
+    def predicate(cols, params):
+        tolerance = paise(params["tolerance"])
+        itemized = DeductionErrorRule._itemized(cols)
+        return (
+            (np.abs(cols["deductions"] - itemized) > tolerance)
+            | (np.abs(cols["net"] - (cols["gross"] - cols["deductions"])) > tolerance)
+            | (cols["deductions"] > cols["gross"])
+        )
+
+    @staticmethod
+    def details(cols, i, params):
+        return (
+            "Total deductions or net pay do not match the itemized deductions.",
+            {
+                "gross": rupees(cols["gross"][i]),
+                "total_deductions": rupees(cols["deductions"][i]),
+                "itemized_deductions": rupees(DeductionErrorRule._itemized(cols)[i]),
+                "net": rupees(cols["net"][i]),
+            }
+        )
+
+
+@register
+class PeerOutlierRule(AnomalyRule):
+    key = "peer_outlier"
+    type = AnomalyType.PAY_OUTLIER
+    severity = AnomalySeverity.MEDIUM
+    title = "Pay Out of Line With Peers"
+    defaults = {"z_threshold": 3.5, "min_group_size": 5}
+    requires = ("peers",)
+    columns = ["gross", "net", "pf", "esi", "pt", "tds"]
+
+    @staticmethod
+    def baselines(cols):
+        """Per-column robust z-scores over peer groups, computed once and cached on the frame."""
+        if "peer_baselines" not in cols:
+            n_groups = len(cols["peer_labels"])
+            cols["peer_baselines"] = {
+                col: robust_z(cols["peer_group"], cols[col], n_groups) for col in PeerOutlierRule.columns
+            }
+        return cols["peer_baselines"]
+
+    @staticmethod
+    def predicate(cols, params):
+        baselines = PeerOutlierRule.baselines(cols)
+        if not len(cols["peer_group"]):
+            return np.zeros(0, dtype=bool)
+        large_enough = np.bincount(cols["peer_group"])[cols["peer_group"]] >= params["min_group_size"]
+        outlier = np.zeros(len(cols["peer_group"]), dtype=bool)
+        for stats in baselines.values():
+            outlier |= np.abs(stats["z"]) > params["z_threshold"]
+        return large_enough & outlier
+
+    @staticmethod
+    def details(cols, i, params):
+        group = int(cols["peer_group"][i])
+        department_id, designation = cols["peer_labels"][group]
+        baselines = PeerOutlierRule.baselines(cols)
+        peer_count = int(baselines["gross"]["count"][group])
+        baseline = {}
+        for col, stats in baselines.items():
+            if abs(stats["z"][i]) > params["z_threshold"]:
+                baseline[col] = {
+                    "value": rupees(cols[col][i]),
+                    "median": float(stats["median"][group]) / 100,
+                    "mad": float(stats["mad"][group]) / 100,
+                    "z_score": round(float(stats["z"][i]), 2),
+                }
+        return (
+            f"{', '.join(baseline)} deviate from the median of {peer_count} peers in the same department and designation.",
+            {
+                "department_id": department_id,
+                "designation": designation,
+                "peer_count": peer_count,
+                "z_threshold": params["z_threshold"],
+                "baseline": baseline,
+            }
+        )
+
+
+class AnomalyRuleService:
+    @staticmethod
+    def resolve(db: Session, company_id: int) -> List[Tuple[AnomalyRule, Dict[str, Any]]]:
+        """Enabled rules for a company with thresholds merged over the defaults (one query)."""
+        overrides = {
+            s.rule_key: s for s in db.query(AnomalyRuleSetting).filter(AnomalyRuleSetting.company_id == company_id).all()
+        }
+        resolved = []
+        for key, rule in RULES.items():
+            setting = overrides.get(key)
+            if setting is not None and not setting.is_enabled:
+                continue
+            params = {**rule.defaults, **((setting.thresholds or {}) if setting is not None else {})}
+            resolved.append((rule, params))
+        return resolved
+
+    @staticmethod
+    def list_rules(db: Session, company_id: int) -> List[Dict[str, Any]]:
+        overrides = {
+            s.rule_key: s for s in db.query(AnomalyRuleSetting).filter(AnomalyRuleSetting.company_id == company_id).all()
+        }
+        return [
+            {
+                "key": key,
+                "type": rule.type,
+                "severity": rule.severity,
+                "title": rule.title,
+                "is_enabled": overrides[key].is_enabled if key in overrides else True,
+                "defaults": rule.defaults,
+                "thresholds": {**rule.defaults, **((overrides[key].thresholds or {}) if key in overrides else {})},
+            }
+            for key, rule in RULES.items()
+        ]
+
+    @staticmethod
+    def update_rule(db: Session, company_id: int, key: str, is_enabled: bool = None, thresholds: Dict[str, Any] = None) -> AnomalyRuleSetting:
+        rule = RULES.get(key)
+        if rule is None:
+            raise ValueError(f"Unknown anomaly rule: {key}")
+        unknown = set(thresholds or {}) - set(rule.defaults)
+        if unknown:
+            raise ValueError(f"Unknown thresholds for {key}: {', '.join(sorted(unknown))}")
+
+        setting = db.query(AnomalyRuleSetting).filter(
+            AnomalyRuleSetting.company_id == company_id,
+            AnomalyRuleSetting.rule_key == key
+        ).first()
+        if not setting:
+            setting = AnomalyRuleSetting(company_id=company_id, rule_key=key, is_enabled=True, thresholds={})
+            db.add(setting)
+        if is_enabled is not None:
+            setting.is_enabled = is_enabled
+        if thresholds is not None:
+            setting.thresholds = {**(setting.thresholds or {}), **thresholds}
+        db.commit()
+        db.refresh(setting)
+        return setting
+
+    @staticmethod
+    def evaluate(cols: Dict[str, np.ndarray], rules: List[Tuple[AnomalyRule, Dict[str, Any]]], company_id: int) -> List[Dict[str, Any]]:
+        """Applies each rule's mask to the frame and returns Anomaly insert mappings."""
+        anomalies = []
+        for rule, params in rules:
+            for i in np.flatnonzero(rule.predicate(cols, params)):
+                description, data = rule.details(cols, i, params)
+                anomalies.append({
+                    "company_id": company_id,
+                    "employee_id": int(cols["employee_id"][i]),
+                    "autopay_os_record_id": int(cols["record_id"][i]),
+                    "type": rule.type,
+                    "severity": rule.severity,
+                    "title": rule.title,
+                    "description": description,
+                    "data": {**data, "rule": rule.key},
+                })
+        return anomalies
@@ -0,0 +1,98 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, tuple_
+from datetime import date
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.core.config import settings
+from app.core.database import chunked
+from app.models.attendance import Attendance
+from app.models.employee import Employee
+from app.models.payroll_tracking import UPSERT_INSERTS, mark_dirty
+from app.services.attendance_summary import AttendanceSummaryService
+
+# Columns overwritten when an (employee_id, date) row already exists
+UPSERT_COLUMNS = ["check_in", "check_out", "status"]
+
+
+class AttendanceIngestService:
+    """
+    Bulk attendance writes for biometric-device volumes: employee codes are resolved
+    with one prefetch and rows are upserted in batches with INSERT ... ON CONFLICT
+    (employee_id, date) DO UPDATE, instead of two queries per punch.
+    """
+
+    @staticmethod
+    def employee_ids_by_code(db: Session, company_id: int) -> Dict[str, int]:
+        """employee_code -> id for the company, in one query."""
+        return dict(db.query(Employee.employee_code, Employee.id).filter(Employee.company_id == company_id).all())
+
+    @staticmethod
+    def _upsert_statement(db: Session):
+        dialect = db.get_bind().dialect.name
+        if dialect not in UPSERT_INSERTS:
+            raise NotImplementedError(f"Attendance upsert is not supported on {dialect}")
+        stmt = UPSERT_INSERTS[dialect](Attendance.__table__)
+        return stmt.on_conflict_do_update(
+            index_elements=["employee_id", "date"],
+            set_={**{col: stmt.excluded[col] for col in UPSERT_COLUMNS}, "updated_at": func.now()}
+        )
+
+    @staticmethod
+    def upsert(db: Session, company_id: int, items: Iterable[Any], codes: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """
+        Validates and upserts attendance items (employee_code, date, check_in,
+        check_out, status) in batches of ATTENDANCE_BATCH_SIZE, marks payroll dirty
+        and refreshes the monthly summary. Later items for the same employee and date
+        overwrite earlier ones, as sequential writes would. The caller commits.
+        Returns inserted/updated/rejected counts and the rejected items by index.
+        Callers writing many batches pass codes (see employee_ids_by_code) to
+        prefetch them once.
+        """
+        if codes is None:
+            codes = AttendanceIngestService.employee_ids_by_code(db, company_id)
+
+        # 1. Resolve and validate in memory; last item per (employee, date) wins
+        rows: Dict[Tuple[int, date], Dict[str, Any]] = {}
+        superseded = 0
+        errors = []
+        for i, item in enumerate(items):
+            employee_id = codes.get(item.employee_code)
+            if employee_id is None:
+                errors.append({"index": i, "employee_code": item.employee_code, "error": "Unknown employee code"})
+                continue
+            if item.check_in and item.check_out and item.check_out < item.check_in:
+                errors.append({"index": i, "employee_code": item.employee_code, "error": "check_out is before check_in"})
+                continue
+            key = (employee_id, item.date)
+            superseded += key in rows
+            rows[key] = {
+                "employee_id": employee_id,
+                "date": item.date,
+                "check_in": item.check_in,
+                "check_out": item.check_out,
+                "status": item.status,
+            }
+
+        # 2. Batched upserts; a pre-select per batch tells inserts from updates
+        stmt = AttendanceIngestService._upsert_statement(db) if rows else None
+        inserted = updated = 0
+        for batch in chunked(list(rows.values()), settings.ATTENDANCE_BATCH_SIZE):
+            keys = [(row["employee_id"], row["date"]) for row in batch]
+            existing = db.query(func.count(Attendance.id)).filter(
+                tuple_(Attendance.employee_id, Attendance.date).in_(keys)
+            ).scalar()
+            db.execute(stmt, batch)
+            updated += existing
+            inserted += len(batch) - existing
+
+        # 3. Bulk statements skip mapper events: mark payroll dirty and refresh the rollup here
+        if rows:
+            mark_dirty(db.connection(), [(emp_id, day.year, day.month, "attendance") for emp_id, day in rows])
+            AttendanceSummaryService.refresh(db, rows.keys())
+
+        return {
+            "inserted": inserted,
+            "updated": updated + superseded,
+            "rejected": len(errors),
+            "errors": errors,
+        }
@@ -0,0 +1,110 @@
+import base64
+import csv
+import io
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.attendance import Attendance
+from app.models.employee import Employee
+
+# Fields returned by the attendance list API, in response/CSV column order
+ATTENDANCE_FIELDS = [
+    "id", "employee_id", "date", "check_in", "check_out", "status",
+    "work_location", "remarks", "created_at", "updated_at",
+]
+
+
+class AttendanceQueryService:
+    """
+    Company-scoped attendance reads ordered by (date, id) with keyset
+    pagination: a page continues after the last (date, id) seen instead of
+    using OFFSET, so every page costs the same however deep the client goes.
+    """
+
+    @staticmethod
+    def encode_cursor(day: date, attendance_id: int) -> str:
+        return base64.urlsafe_b64encode(f"{day.isoformat()}|{attendance_id}".encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[date, int]:
+        """Raises ValueError for a malformed cursor."""
+        try:
+            day, attendance_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            return date.fromisoformat(day), int(attendance_id)
+        except Exception:
+            raise ValueError("Invalid cursor")
+
+    @staticmethod
+    def _query(
+        db: Session,
+        company_id: int,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        employee_id: Optional[int] = None,
+        after: Optional[Tuple[date, int]] = None
+    ):
+        query = db.query(*[getattr(Attendance, field) for field in ATTENDANCE_FIELDS]).join(
+            Employee, Attendance.employee_id == Employee.id
+        ).filter(Employee.company_id == company_id)
+        if start_date:
+            query = query.filter(Attendance.date >= start_date)
+        if end_date:
+            query = query.filter(Attendance.date <= end_date)
+        if employee_id:
+            query = query.filter(Attendance.employee_id == employee_id)
+        if after:
+            query = query.filter(tuple_(Attendance.date, Attendance.id) > tuple_(*after))
+        return query.order_by(Attendance.date, Attendance.id)
+
+    @staticmethod
+    def page(
+        db: Session,
+        company_id: int,
+        limit: Optional[int],
+        cursor: Optional[str] = None,
+        **filters
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of rows as dicts and the cursor of the next page (None on the
+        last page). Without a limit every row after the cursor is returned.
+        """
+        after = AttendanceQueryService.decode_cursor(cursor) if cursor else None
+        query = AttendanceQueryService._query(db, company_id, after=after, **filters)
+        if limit is None:
+            return [row._asdict() for row in query.all()], None
+        rows = query.limit(limit + 1).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = AttendanceQueryService.encode_cursor(rows[-1].date, rows[-1].id)
+        return [row._asdict() for row in rows], next_cursor
+
+    @staticmethod
+    def to_columns(rows: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+        """Rows as parallel arrays per field: field names are sent once per page, not once per row."""
+        return {field: [row[field] for row in rows] for field in ATTENDANCE_FIELDS}
+
+    @staticmethod
+    def iter_csv(db: Session, company_id: int, cursor: Optional[str] = None, **filters) -> Iterator[str]:
+        """
+        Yields the filtered attendance as CSV, header first, reading the rows
+        in yield_per batches so memory stays flat for any date range.
+        """
+        after = AttendanceQueryService.decode_cursor(cursor) if cursor else None
+        rows = AttendanceQueryService._query(db, company_id, after=after, **filters).yield_per(
+            settings.ATTENDANCE_BATCH_SIZE
+        )
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(ATTENDANCE_FIELDS)
+        for i, row in enumerate(rows, start=1):
+            writer.writerow(["" if value is None else value for value in row])
+            if i % settings.ATTENDANCE_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
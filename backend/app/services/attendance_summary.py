@@ -0,0 +1,170 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case, extract
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+import calendar
+
+from app.core.config import settings
+from app.core.database import chunked
+from app.models.attendance import Attendance, AttendanceMonthlySummary
+from app.models.employee import Employee
+
+# Attendance.status value -> summary column
+TRACKED_STATUSES = {
+    "present": "present_days",
+    "half-day": "half_days",
+    "leave": "leave_days",
+    "absent": "absent_days",
+}
+
+
+class AttendanceSummaryService:
+    """
+    Maintains attendance_monthly_summary so payroll, EWA, talent risk and the
+    copilot read one row per employee-month instead of scanning attendance.
+    """
+
+    @staticmethod
+    def _status_counts(summary: AttendanceMonthlySummary) -> Dict[str, int]:
+        return {status: getattr(summary, column) or 0 for status, column in TRACKED_STATUSES.items()}
+
+    @staticmethod
+    def _aggregate(db: Session, employee_ids: List[int], year: int, month: int) -> Dict[int, Dict[str, int]]:
+        """Counts tracked statuses straight from attendance for one month."""
+        start_date = date(year, month, 1)
+        end_date = date(year, month, calendar.monthrange(year, month)[1])
+        counts: Dict[int, Dict[str, int]] = {}
+        for chunk in chunked(employee_ids, settings.PAYROLL_BATCH_SIZE):
+            rows = db.query(Attendance.employee_id, Attendance.status, func.count(Attendance.id)).filter(
+                Attendance.employee_id.in_(chunk),
+                Attendance.date >= start_date,
+                Attendance.date <= end_date,
+                Attendance.status.in_(list(TRACKED_STATUSES))
+            ).group_by(Attendance.employee_id, Attendance.status).all()
+            for emp_id, status, count in rows:
+                counts.setdefault(emp_id, {})[status] = count
+        return counts
+
+    @staticmethod
+    def refresh(db: Session, keys: Iterable[Tuple[int, date]]) -> None:
+        """
+        Recomputes the summary rows touched by attendance writes.
+        keys are (employee_id, attendance date); the caller commits.
+        """
+        # Sessions run with autoflush off: push pending attendance rows first
+        db.flush()
+        by_period: Dict[Tuple[int, int], set] = {}
+        for emp_id, day in keys:
+            by_period.setdefault((day.year, day.month), set()).add(emp_id)
+
+        for (year, month), emp_ids in by_period.items():
+            emp_ids = sorted(emp_ids)
+            counts = AttendanceSummaryService._aggregate(db, emp_ids, year, month)
+            existing = {}
+            for chunk in chunked(emp_ids, settings.PAYROLL_BATCH_SIZE):
+                for summary in db.query(AttendanceMonthlySummary).filter(
+                    AttendanceMonthlySummary.employee_id.in_(chunk),
+                    AttendanceMonthlySummary.year == year,
+                    AttendanceMonthlySummary.month == month
+                ).all():
+                    existing[summary.employee_id] = summary
+
+            for emp_id in emp_ids:
+                summary = existing.get(emp_id)
+                if summary is None:
+                    summary = AttendanceMonthlySummary(employee_id=emp_id, year=year, month=month)
+                    db.add(summary)
+                for status, column in TRACKED_STATUSES.items():
+                    setattr(summary, column, counts.get(emp_id, {}).get(status, 0))
+        db.flush()
+
+    @staticmethod
+    def get_counts(db: Session, employee_ids: Iterable[int], year: int, month: int) -> Dict[int, Dict[str, int]]:
+        """
+        Returns {employee_id: {status: count}} for a month.
+        Employees without a summary row yet (e.g. history written before the
+        rollup existed) fall back to one grouped query over attendance.
+        """
+        employee_ids = list(dict.fromkeys(employee_ids))
+        counts: Dict[int, Dict[str, int]] = {}
+        for chunk in chunked(employee_ids, settings.PAYROLL_BATCH_SIZE):
+            for summary in db.query(AttendanceMonthlySummary).filter(
+                AttendanceMonthlySummary.employee_id.in_(chunk),
+                AttendanceMonthlySummary.year == year,
+                AttendanceMonthlySummary.month == month
+            ).all():
+                counts[summary.employee_id] = AttendanceSummaryService._status_counts(summary)
+
+        missing = [emp_id for emp_id in employee_ids if emp_id not in counts]
+        if missing:
+            counts.update(AttendanceSummaryService._aggregate(db, missing, year, month))
+        return counts
+
+    @staticmethod
+    def get_employee_counts(db: Session, employee_id: int, year: int, month: int) -> Dict[str, int]:
+        return AttendanceSummaryService.get_counts(db, [employee_id], year, month).get(employee_id, {})
+
+    @staticmethod
+    def month_window(today: date, months: int) -> Tuple[date, date]:
+        """
+        The last `months` calendar months as (first day, today): whole months,
+        with the current one counted month-to-date. Use this for windows read
+        from the summary instead of day offsets such as "90 days ago".
+        """
+        index = today.year * 12 + today.month - 1 - (months - 1)
+        return date(index // 12, index % 12 + 1, 1), today
+
+    @staticmethod
+    def get_window_counts(db: Session, start_date: date, end_date: date, company_id: Optional[int] = None, employee_id: Optional[int] = None) -> Dict[int, Dict[str, int]]:
+        """
+        Sums summary rows for every month touched by [start_date, end_date].
+        Windows are month-granular: partial months count in full, so pass
+        month-aligned bounds (see month_window).
+        """
+        period = AttendanceMonthlySummary.year * 12 + AttendanceMonthlySummary.month
+        query = db.query(
+            AttendanceMonthlySummary.employee_id,
+            *[func.sum(getattr(AttendanceMonthlySummary, column)) for column in TRACKED_STATUSES.values()]
+        ).filter(period.between(start_date.year * 12 + start_date.month, end_date.year * 12 + end_date.month))
+        if company_id is not None:
+            query = query.join(Employee, Employee.id == AttendanceMonthlySummary.employee_id).filter(Employee.company_id == company_id)
+        if employee_id is not None:
+            query = query.filter(AttendanceMonthlySummary.employee_id == employee_id)
+
+        return {
+            emp_id: {status: int(count or 0) for status, count in zip(TRACKED_STATUSES, status_counts)}
+            for emp_id, *status_counts in query.group_by(AttendanceMonthlySummary.employee_id).all()
+        }
+
+    @staticmethod
+    def rebuild(db: Session, company_id: Optional[int] = None) -> int:
+        """Recreates summary rows from raw attendance (all companies when company_id is None)."""
+        summaries = db.query(AttendanceMonthlySummary)
+        if company_id is not None:
+            company_employees = db.query(Employee.id).filter(Employee.company_id == company_id)
+            summaries = summaries.filter(AttendanceMonthlySummary.employee_id.in_(company_employees))
+        summaries.delete(synchronize_session=False)
+
+        year_col = extract("year", Attendance.date)
+        month_col = extract("month", Attendance.date)
+        query = db.query(
+            Attendance.employee_id,
+            year_col,
+            month_col,
+            *[func.sum(case((Attendance.status == status, 1), else_=0)) for status in TRACKED_STATUSES]
+        )
+        if company_id is not None:
+            query = query.join(Employee, Employee.id == Attendance.employee_id).filter(Employee.company_id == company_id)
+        rows = query.group_by(Attendance.employee_id, year_col, month_col).all()
+
+        mappings = [
+            {
+                "employee_id": emp_id, "year": int(year), "month": int(month),
+                **{column: int(count or 0) for column, count in zip(TRACKED_STATUSES.values(), status_counts)}
+            }
+            for emp_id, year, month, *status_counts in rows
+        ]
+        for chunk in chunked(mappings, settings.PAYROLL_BATCH_SIZE):
+            db.bulk_insert_mappings(AttendanceMonthlySummary, chunk)
+        db.commit()
+        return len(mappings)
@@ -1,93 +1,314 @@
 import pandas as pd
-import io
-from typing import List, Dict, Any
+import csv
+import os
+import uuid
+from itertools import islice
+from typing import List, Dict, Any, Iterator, Set, Tuple
+from openpyxl import load_workbook
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import chunked
 from app.models.employee import Employee, Gender, MaritalStatus
-from app.models.company import Company
 from app.models.autopay_os import SalaryStructure
+from app.models.payroll_tracking import ALL_PERIODS, mark_dirty
 from decimal import Decimal
 import logging
 
 logger = logging.getLogger(__name__)
 
+REQUIRED_COLUMNS = ['employee_code', 'full_name', 'email', 'date_of_joining', 'designation', 'basic_salary']
+OPTIONAL_COLUMNS = ['phone', 'gender', 'marital_status', 'pan_number', 'special_allowance']
+
+# Globally unique employee columns checked against the file itself and the database
+UNIQUE_COLUMNS = {'employee_code': Employee.employee_code, 'email': Employee.email, 'pan_number': Employee.pan_number}
+
+EMAIL_PATTERN = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
+PAN_PATTERN = r"^[A-Z]{5}[0-9]{4}[A-Z]$"
+
+
 class BulkImportService:
     @staticmethod
-    def process_employee_excel(file_content: bytes, company_id: int, db: Session) -> Dict[str, Any]:
+    def spool_path(filename: str) -> str:
+        """Unique path under IMPORT_UPLOAD_DIR for an uploaded file, keeping its extension."""
+        os.makedirs(settings.IMPORT_UPLOAD_DIR, exist_ok=True)
+        return os.path.join(settings.IMPORT_UPLOAD_DIR, f"{uuid.uuid4().hex}{os.path.splitext(filename)[1].lower()}")
+
+    @staticmethod
+    def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+        """Text cells, stripped, with blanks as missing and every optional column present."""
+        df.columns = [str(col).strip().lower() for col in df.columns]
+        for col in OPTIONAL_COLUMNS:
+            if col not in df.columns:
+                df[col] = None
+        df = df.astype(object).apply(lambda col: col.str.strip())
+        return df.where(df != "", None)
+
+    @staticmethod
+    def _iter_xlsx_rows(path: str) -> Iterator[tuple]:
+        # read_only streams the sheet XML row by row instead of building the whole workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                yield tuple(None if value is None else str(value) for value in row)
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _iter_csv_rows(path: str) -> Iterator[tuple]:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            for row in csv.reader(f):
+                yield tuple(row)
+
+    @staticmethod
+    def iter_employee_chunks(path: str, filename: str, chunk_size: int) -> Iterator[pd.DataFrame]:
         """
-        Processes an Excel file containing employee data and imports them into the database.
+        Yields the sheet as normalized DataFrames of at most chunk_size rows, so
+        memory is bounded by the chunk size rather than the file size. Frames are
+        indexed by data row (sheet row - 2) so row numbers survive chunking.
+        Always yields at least one (possibly empty) frame carrying the header.
         """
+        if filename.lower().endswith('.xls'):
+            # Legacy binary workbooks have no streaming reader; load and slice
+            df = pd.read_excel(path, dtype=str)
+            rows = iter([tuple(df.columns), *df.itertuples(index=False, name=None)])
+        elif filename.lower().endswith('.csv'):
+            rows = BulkImportService._iter_csv_rows(path)
+        else:
+            rows = BulkImportService._iter_xlsx_rows(path)
+
+        header = list(next(rows, ()))
+        width = len(header)
+        # Blank rows are skipped but keep their place in the numbering
+        numbered = (
+            (i, row[:width] + (None,) * (width - len(row)))
+            for i, row in enumerate(rows) if any(value not in (None, "") for value in row)
+        )
+        first = True
+        while True:
+            block = list(islice(numbered, chunk_size))
+            if block or first:
+                yield BulkImportService._normalize(pd.DataFrame(
+                    [row for _, row in block], columns=header, index=[i for i, _ in block], dtype=object
+                ))
+            first = False
+            if len(block) < chunk_size:
+                return
+
+    @staticmethod
+    def existing_keys(db: Session) -> Dict[str, Set[str]]:
+        """Employee codes, emails (lower-cased) and PANs already in use, fetched in one query."""
+        existing = db.execute(select(*UNIQUE_COLUMNS.values())).all()
+        return {
+            col: {row[i].lower() if col == 'email' else row[i] for row in existing if row[i] is not None}
+            for i, col in enumerate(UNIQUE_COLUMNS)
+        }
+
+    @staticmethod
+    def _keys(df: pd.DataFrame) -> Dict[str, pd.Series]:
+        """Unique-column values as compared for duplicates (emails case-insensitively)."""
+        return {'employee_code': df['employee_code'], 'email': df['email'].str.lower(), 'pan_number': df['pan_number'].str.upper()}
+
+    @staticmethod
+    def replay_committed(
+        df: pd.DataFrame, rejected_rows: Set[int], taken: Dict[str, Set[str]], seen: Dict[str, Set[str]]
+    ) -> None:
+        """
+        Rebuilds duplicate tracking for rows committed by an earlier attempt of a resumed
+        import: their keys count as seen in the file, and the keys the import inserted
+        itself are not reported as pre-existing.
+        """
+        imported = ~pd.Series(df.index + 2, index=df.index).isin(rejected_rows)
+        for col, values in BulkImportService._keys(df).items():
+            seen[col].update(values.dropna())
+            taken[col].difference_update(values[imported].dropna())
+
+    @staticmethod
+    def validate_employees(
+        df: pd.DataFrame, taken: Dict[str, Set[str]], seen: Dict[str, Set[str]]
+    ) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+        """
+        Validates a chunk of rows with column-wise pandas operations and returns
+        the parsed valid rows plus a per-row error report. taken holds the keys
+        already in the database (see existing_keys); seen collects the chunk's
+        keys so duplicates are caught across chunks of the same file.
+        """
+        # Spreadsheet row numbers: header is row 1
+        row_numbers = pd.Series(df.index + 2, index=df.index)
+        problems = []
+
+        def flag(mask: pd.Series, column: str, message: str):
+            for row in row_numbers[mask.fillna(False)]:
+                problems.append((row, column, message))
+
+        # 1. Required values
+        for col in REQUIRED_COLUMNS:
+            flag(df[col].isna(), col, "is required")
+
+        # 2. Types and enums (column-wise parse; unparseable values become NaN/NaT)
+        parsed = pd.DataFrame(index=df.index)
+        parsed['date_of_joining'] = pd.to_datetime(df['date_of_joining'], errors='coerce', format='mixed')
+        flag(df['date_of_joining'].notna() & parsed['date_of_joining'].isna(), 'date_of_joining', "is not a valid date")
+
+        parsed['basic_salary'] = pd.to_numeric(df['basic_salary'], errors='coerce')
+        flag(df['basic_salary'].notna() & ~(parsed['basic_salary'] > 0), 'basic_salary', "must be a positive number")
+
+        parsed['special_allowance'] = pd.to_numeric(df['special_allowance'].fillna("0"), errors='coerce')
+        flag(~(parsed['special_allowance'] >= 0), 'special_allowance', "must be a non-negative number")
+
+        parsed['gender'] = df['gender'].fillna(Gender.MALE.value).str.lower()
+        flag(~parsed['gender'].isin([g.value for g in Gender]), 'gender', "must be one of male, female, other")
+
+        parsed['marital_status'] = df['marital_status'].fillna(MaritalStatus.SINGLE.value).str.lower()
+        flag(~parsed['marital_status'].isin([s.value for s in MaritalStatus]), 'marital_status',
+             "must be one of single, married, divorced, widowed")
+
+        flag(df['email'].notna() & ~df['email'].str.match(EMAIL_PATTERN, na=False), 'email', "is not a valid email")
+
+        parsed['pan_number'] = df['pan_number'].str.upper()
+        flag(parsed['pan_number'].notna() & ~parsed['pan_number'].str.match(PAN_PATTERN, na=False), 'pan_number',
+             "is not a valid PAN")
+
+        # 3. Duplicates inside the file (first occurrence wins) and against the database
+        for col, values in BulkImportService._keys(df).items():
+            duplicated = values.duplicated(keep='first') | values.isin(seen[col])
+            flag(values.notna() & duplicated, col, "is duplicated in the file")
+            flag(values.isin(taken[col]), col, "already exists")
+            seen[col].update(values.dropna())
+
+        errors: Dict[int, Dict[str, Any]] = {}
+        codes = df['employee_code'].astype(object).where(df['employee_code'].notna(), None)
+        for row, column, message in problems:
+            entry = errors.setdefault(row, {"row": row, "employee_code": codes[row - 2], "errors": []})
+            entry["errors"].append(f"{column} {message}")
+
+        valid = df.assign(**{col: parsed[col] for col in parsed.columns})
+        valid = valid[~row_numbers.isin(list(errors))]
+        return valid, sorted(errors.values(), key=lambda e: e["row"])
+
+    @staticmethod
+    def insert_employees(db: Session, company_id: int, valid: pd.DataFrame) -> int:
+        """
+        Inserts validated rows in chunks: per chunk one executemany INSERT for the
+        employees, one id lookup and one INSERT for their default salary structures.
+        """
+        records = valid.astype(object).where(valid.notna(), None).to_dict('records')
+        for chunk in chunked(records, settings.IMPORT_BATCH_SIZE):
+            db.execute(insert(Employee), [
+                {
+                    "company_id": company_id,
+                    "employee_code": row['employee_code'],
+                    "full_name": row['full_name'],
+                    "email": row['email'],
+                    "phone": row['phone'],
+                    "designation": row['designation'],
+                    "pan_number": row['pan_number'],
+                    "date_of_joining": row['date_of_joining'].date(),
+                    "gender": Gender(row['gender']),
+                    "marital_status": MaritalStatus(row['marital_status']),
+                    "is_active": True,
+                }
+                for row in chunk
+            ])
+            # Codes are unique, so one lookup maps the chunk to its new ids
+            # (ordered RETURNING degrades to row-at-a-time inserts on SQLite)
+            id_by_code = dict(db.execute(
+                select(Employee.employee_code, Employee.id).where(
+                    Employee.employee_code.in_([row['employee_code'] for row in chunk])
+                )
+            ).all())
+            employee_ids = [id_by_code[row['employee_code']] for row in chunk]
+
+            # Default salary structure: HRA 50% of basic, standard conveyance/medical
+            salaries = []
+            for employee_id, row in zip(employee_ids, chunk):
+                basic = Decimal(str(row['basic_salary']))
+                salaries.append({
+                    "employee_id": employee_id,
+                    "basic": basic,
+                    "hra": basic * Decimal("0.5"),
+                    "conveyance": Decimal("1600"),
+                    "medical_allowance": Decimal("1250"),
+                    "special_allowance": Decimal(str(row['special_allowance'])),
+                    "pf_enabled": True,
+                    "esi_enabled": True,
+                    "pt_enabled": True,
+                    "tds_enabled": True,
+                })
+            db.execute(insert(SalaryStructure), salaries)
+
+            # Bulk statements skip mapper events, so mark the new structures here
+            mark_dirty(db.connection(), [
+                (employee_id, ALL_PERIODS, ALL_PERIODS, "salary_structure") for employee_id in employee_ids
+            ])
+        return len(records)
+
+    @staticmethod
+    def import_chunk(
+        db: Session, company_id: int, df: pd.DataFrame, taken: Dict[str, Set[str]], seen: Dict[str, Set[str]]
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """Validates and inserts one chunk (without committing); returns (imported, per-row errors)."""
+        valid, errors = BulkImportService.validate_employees(df, taken, seen)
+        return BulkImportService.insert_employees(db, company_id, valid), errors
+
+    @staticmethod
+    def missing_columns(df: pd.DataFrame) -> List[str]:
+        return [col for col in REQUIRED_COLUMNS if col not in df.columns]
+
+    @staticmethod
+    def count_rows(path: str, filename: str) -> int:
+        """Data rows in the file (header excluded), for job progress; XLSX uses the sheet dimensions."""
+        if filename.lower().endswith('.csv'):
+            return max(sum(1 for _ in BulkImportService._iter_csv_rows(path)) - 1, 0)
+        if filename.lower().endswith('.xls'):
+            return len(pd.read_excel(path, dtype=str))
+        workbook = load_workbook(path, read_only=True)
         try:
-            df = pd.read_excel(io.BytesIO(file_content))
-            
-            # Required columns validation
-            required_cols = ['employee_code', 'full_name', 'email', 'date_of_joining', 'designation', 'basic_salary']
-            missing = [col for col in required_cols if col not in df.columns]
-            if missing:
-                return {"success": False, "error": f"Missing required columns: {', '.join(missing)}"}
-
-            imported_count = 0
-            errors = []
-
-            for index, row in df.iterrows():
-                try:
-                    # Check if employee already exists in this company
-                    existing = db.query(Employee).filter(
-                        Employee.employee_code == str(row['employee_code']),
-                        Employee.company_id == company_id
-                    ).first()
-                    
-                    if existing:
-                        errors.append(f"Row {index+2}: Employee code {row['employee_code']} already exists.")
-                        continue
-
-                    # Create Employee
-                    employee = Employee(
-                        company_id=company_id,
-                        employee_code=str(row['employee_code']),
-                        full_name=row['full_name'],
-                        email=row['email'],
-                        phone=str(row.get('phone', '')),
-                        designation=row['designation'],
-                        date_of_joining=pd.to_datetime(row['date_of_joining']).date(),
-                        gender=Gender(row.get('gender', 'male').lower()),
-                        marital_status=MaritalStatus(row.get('marital_status', 'single').lower()),
-                        is_active=True
-                    )
-                    
-                    db.add(employee)
-                    db.flush() # Get the ID
-
-                    # Create default Salary Structure
-                    # Simple rule: HRA 50%, Special Allowance remainder if provided
-                    basic = Decimal(str(row['basic_salary']))
-                    hra = basic * Decimal("0.5")
-                    
-                    salary = SalaryStructure(
-                        employee_id=employee.id,
-                        basic=basic,
-                        hra=hra,
-                        conveyance=Decimal("1600"), # Standard Default
-                        medical_allowance=Decimal("1250"), # Standard Default
-                        special_allowance=Decimal(str(row.get('special_allowance', 0))),
-                        pf_enabled=True,
-                        esi_enabled=True,
-                        pt_enabled=True,
-                        tds_enabled=True
-                    )
-                    db.add(salary)
-                    imported_count += 1
-
-                except Exception as e:
-                    logger.error(f"Error importing row {index+2}: {str(e)}")
-                    errors.append(f"Row {index+2}: {str(e)}")
+            return max((workbook.active.max_row or 1) - 1, 0)
+        finally:
+            workbook.close()
 
-            db.commit()
-            return {
-                "success": True, 
-                "imported_count": imported_count,
-                "errors": errors
-            }
+    @staticmethod
+    def process_employee_file(path: str, filename: str, company_id: int, db: Session) -> Dict[str, Any]:
+        """
+        Imports employees (with default salary structures) from an Excel or CSV file
+        on disk, IMPORT_BATCH_SIZE rows at a time, in a single transaction. Valid rows
+        are imported; invalid rows are skipped and reported per row. Large files should
+        go through an EmployeeImportJob, which commits per chunk and can resume.
+        """
+        chunks = BulkImportService.iter_employee_chunks(path, filename, settings.IMPORT_BATCH_SIZE)
+        try:
+            df = next(chunks)
+        except Exception as e:
+            logger.error(f"Bulk import failed: {str(e)}")
+            return {"success": False, "error": f"Failed to parse file: {str(e)}"}
+
+        # Required columns validation
+        missing = BulkImportService.missing_columns(df)
+        if missing:
+            return {"success": False, "error": f"Missing required columns: {', '.join(missing)}"}
 
+        taken = BulkImportService.existing_keys(db)
+        seen = {col: set() for col in UNIQUE_COLUMNS}
+        total_rows = imported_count = 0
+        errors = []
+        try:
+            while df is not None:
+                imported, chunk_errors = BulkImportService.import_chunk(db, company_id, df, taken, seen)
+                imported_count += imported
+                total_rows += len(df)
+                errors.extend(chunk_errors)
+                df = next(chunks, None)
+            db.commit()
         except Exception as e:
+            db.rollback()
             logger.error(f"Bulk import failed: {str(e)}")
-            return {"success": False, "error": f"Failed to parse Excel file: {str(e)}"}
+            return {"success": False, "error": f"Failed to import employees: {str(e)}"}
+
+        return {
+            "success": True,
+            "total_rows": total_rows,
+            "imported_count": imported_count,
+            "rejected_count": len(errors),
+            "errors": errors
+        }
@@ -0,0 +1,190 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+from datetime import date, time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, chunked
+from app.models.attendance import Attendance
+from app.models.payroll_tracking import mark_dirty
+from app.services.attendance_ingest import UPSERT_INSERTS
+from app.services.attendance_summary import AttendanceSummaryService
+
+logger = logging.getLogger(__name__)
+
+
+class CheckInBuffer:
+    """
+    Write-behind buffer for peak-hour check-ins (CHECKIN_BUFFER_ENABLED).
+
+    A check-in is acknowledged after an in-memory duplicate check and an append
+    to a local spool file; a background thread inserts everything accumulated
+    every CHECKIN_FLUSH_INTERVAL_MS with one INSERT ... ON CONFLICT DO NOTHING,
+    so rows written meanwhile by other paths (HR edits, bulk uploads, other
+    workers) win. Spool files of a crashed process are replayed on the next start.
+    """
+
+    def __init__(self, spool_dir: str, interval_ms: int):
+        self.spool_dir = spool_dir
+        self.interval = interval_ms / 1000
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pending: Dict[Tuple[int, date], Dict[str, Any]] = {}
+        self._segments: List[str] = []  # Spool files whose rows are pending
+        self._spool = None
+        self._sequence = 0
+        # Today's status per employee: the duplicate check never queries per check-in
+        self._day: Optional[date] = None
+        self._statuses: Dict[int, str] = {}
+
+    def check_in(self, db: Session, employee_id: int, day: date, at: time, work_location: str = "Office") -> Optional[str]:
+        """
+        Buffers a "present" check-in. Returns None when accepted, or the status
+        already recorded for the employee on that day.
+        """
+        self.start()
+        with self._lock:
+            if day != self._day:
+                # One query per day loads the statuses recorded before the buffer saw them
+                self._day = day
+                self._statuses = dict(
+                    db.query(Attendance.employee_id, Attendance.status).filter(Attendance.date == day).all()
+                )
+                # Check-ins still waiting for a flush (e.g. replayed from a spool) count too
+                self._statuses.update(
+                    {emp_id: row["status"] for (emp_id, d), row in self._pending.items() if d == day}
+                )
+            if employee_id in self._statuses:
+                return self._statuses[employee_id]
+
+            row = {
+                "employee_id": employee_id,
+                "date": day,
+                "check_in": at.replace(microsecond=0),
+                "status": "present",
+                "work_location": work_location,
+            }
+            self._spool_file().write(json.dumps(row, default=str) + "\n")
+            self._spool.flush()
+            self._pending[(employee_id, day)] = row
+            self._statuses[employee_id] = row["status"]
+        return None
+
+    def flush(self) -> int:
+        """Inserts the pending check-ins; returns how many were written."""
+        with self._flush_lock:
+            # 1. Take the pending rows and start a new spool segment for later check-ins
+            with self._lock:
+                rows, self._pending = self._pending, {}
+                segments, self._segments = self._segments, []
+                if self._spool:
+                    self._spool.close()
+                    self._spool = None
+            if not rows:
+                self._remove(segments)
+                return 0
+
+            # 2. One batched insert; rows that already exist are left untouched
+            db = SessionLocal()
+            try:
+                stmt = UPSERT_INSERTS[db.get_bind().dialect.name](Attendance.__table__)
+                stmt = stmt.on_conflict_do_nothing(index_elements=["employee_id", "date"])
+                for batch in chunked(list(rows.values()), settings.ATTENDANCE_BATCH_SIZE):
+                    db.execute(stmt, batch)
+                mark_dirty(db.connection(), [(emp_id, day.year, day.month, "attendance") for emp_id, day in rows])
+                AttendanceSummaryService.refresh(db, rows.keys())
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Check-in flush failed, will retry: {str(e)}")
+                # Keep the spooled segments and retry the rows on the next cycle
+                with self._lock:
+                    self._pending = {**rows, **self._pending}
+                    self._segments = segments + self._segments
+                return 0
+            finally:
+                db.close()
+
+            # 3. The rows are durable in the database now
+            self._remove(segments)
+            return len(rows)
+
+    def start(self) -> None:
+        """Replays spool files left by a crashed process and starts the flush thread."""
+        if self._thread:
+            return
+        with self._lock:
+            if self._thread:
+                return
+            os.makedirs(self.spool_dir, exist_ok=True)
+            self._recover()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="checkin-flush", daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """Stops the flush thread after a final flush."""
+        if not self._thread:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def _spool_file(self):
+        if self._spool is None:
+            self._sequence += 1
+            path = os.path.join(self.spool_dir, f"{os.getpid()}-{self._sequence:06d}.jsonl")
+            self._spool = open(path, "a", encoding="utf-8")
+            self._segments.append(path)
+        return self._spool
+
+    def _recover(self) -> None:
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, "*.jsonl"))):
+            owner = int(os.path.basename(path).split("-")[0])
+            if owner != os.getpid() and _process_alive(owner):
+                continue  # Another worker's live spool
+            with open(path, encoding="utf-8") as spool:
+                for line in spool:
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line of a crash
+                    row["date"] = date.fromisoformat(row["date"])
+                    row["check_in"] = time.fromisoformat(row["check_in"]) if row["check_in"] else None
+                    self._pending[(row["employee_id"], row["date"])] = row
+            self._segments.append(path)
+        if self._segments:
+            logger.warning(f"Recovered {len(self._pending)} spooled check-ins from {len(self._segments)} file(s)")
+
+    @staticmethod
+    def _remove(paths: List[str]) -> None:
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+checkin_buffer = CheckInBuffer(settings.CHECKIN_SPOOL_DIR, settings.CHECKIN_FLUSH_INTERVAL_MS)
@@ -1,93 +1,132 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import io
 import json
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 
+from app.core.config import settings
 from app.models.employee import Employee
 from app.models.autopay_os import AutoPayOSRecord, AutoPayOSStatus
 
+# Form 24Q quarters of an April-March financial year
+FORM24Q_QUARTER_MONTHS = {1: (4, 5, 6), 2: (7, 8, 9), 3: (10, 11, 12), 4: (1, 2, 3)}
+
 class ComplianceService:
     @staticmethod
-    def generate_pf_ecr(db: Session, company_id: int, month: int, year: int) -> str:
+    def iter_pf_ecr(db: Session, company_id: int, month: int, year: int) -> Iterator[str]:
         """
-        Generates the PF ECR (Electronic Challan-cum-Return) 2.0 text file.
+        Yields the PF ECR (Electronic Challan-cum-Return) 2.0 file line by line.
         Separator: #~#
+        Members come from one joined column query read in yield_per batches,
+        so memory stays flat regardless of the number of UANs.
         """
-        records = db.query(AutoPayOSRecord).join(Employee).filter(
+        rows = db.query(
+            Employee.uan_number,
+            Employee.full_name,
+            AutoPayOSRecord.gross_earnings,
+            AutoPayOSRecord.basic_earned,
+            AutoPayOSRecord.pf_deduction,
+            AutoPayOSRecord.absent_days
+        ).join(Employee, AutoPayOSRecord.employee_id == Employee.id).filter(
             AutoPayOSRecord.company_id == company_id,
             AutoPayOSRecord.month == month,
             AutoPayOSRecord.year == year,
             AutoPayOSRecord.status == AutoPayOSStatus.PAID,
             Employee.uan_number.isnot(None)
-        ).all()
+        ).order_by(AutoPayOSRecord.id).yield_per(settings.PAYROLL_BATCH_SIZE)
 
-        output = io.StringIO()
-        
-        for record in records:
-            emp = record.employee
+        for uan_number, full_name, gross_earnings, basic_earned, pf_deduction, absent_days in rows:
             # PF logic: 
             # EPF Wages = Basic (capped at 15000 or actual based on policy, we use earned basic)
-            epf_wages = float(record.basic_earned)
+            epf_wages = float(basic_earned)
             eps_wages = min(epf_wages, 15000.0) # EPS is usually capped at 15k
             edli_wages = eps_wages
             
             # Contributions
-            epf_contribution = float(record.pf_deduction or 0)
-            eps_contribution = float(record.employer_pf_contribution or 0) * (8.33 / 12) # Approximation of EPS portion
+            epf_contribution = float(pf_deduction or 0)
             # In real ECR, we need precise rounded values:
             eps_cont_rounded = round(eps_wages * 0.0833)
             epf_eps_diff = epf_contribution - eps_cont_rounded
             
             # Row Construction: UAN#~#MEMBER_NAME#~#GROSS#~#EPF#~#EPS#~#EDLI#~#EPF_CONT#~#EPS_CONT#~#DIFF#~#NCP#~#REFUND
             row = [
-                emp.uan_number,
-                emp.full_name,
-                f"{float(record.gross_earnings):.0f}",
+                uan_number,
+                full_name,
+                f"{float(gross_earnings):.0f}",
                 f"{epf_wages:.0f}",
                 f"{eps_wages:.0f}",
                 f"{edli_wages:.0f}",
                 f"{epf_contribution:.0f}",
                 f"{eps_cont_rounded:.0f}",
                 f"{max(0, epf_eps_diff):.0f}",
-                f"{float(record.absent_days):.0f}",
+                f"{float(absent_days):.0f}",
                 "0" # Refund of advances
             ]
-            output.write("#~#".join(row) + "\n")
-            
-        return output.getvalue()
+            yield "#~#".join(row) + "\n"
 
     @staticmethod
-    def generate_esi_json(db: Session, company_id: int, month: int, year: int) -> str:
-        """
-        Generates the ESI monthly contribution data in JSON format for the ESIC portal.
-        """
-        records = db.query(AutoPayOSRecord).join(Employee).filter(
+    def generate_pf_ecr(db: Session, company_id: int, month: int, year: int) -> str:
+        """The whole PF ECR file as one string (see iter_pf_ecr for streaming)."""
+        return "".join(ComplianceService.iter_pf_ecr(db, company_id, month, year))
+
+    @staticmethod
+    def iter_esi_contributions(db: Session, company_id: int, month: int, year: int) -> Iterator[Dict[str, Any]]:
+        """ESI monthly contribution entries, one per insured person, read from a single joined cursor."""
+        rows = db.query(
+            Employee.esi_number,
+            Employee.full_name,
+            AutoPayOSRecord.paid_days,
+            AutoPayOSRecord.gross_earnings
+        ).join(Employee, AutoPayOSRecord.employee_id == Employee.id).filter(
             AutoPayOSRecord.company_id == company_id,
             AutoPayOSRecord.month == month,
             AutoPayOSRecord.year == year,
             AutoPayOSRecord.status == AutoPayOSStatus.PAID,
             Employee.esi_number.isnot(None)
-        ).all()
+        ).order_by(AutoPayOSRecord.id).yield_per(settings.PAYROLL_BATCH_SIZE)
 
-        esi_data = []
-        for record in records:
-            emp = record.employee
-            total_days_in_month = 30 # Simplified
-            working_days = float(record.paid_days)
-            
-            esi_data.append({
-                "IpNumber": emp.esi_number,
-                "IpName": emp.full_name,
+        for esi_number, full_name, paid_days, gross_earnings in rows:
+            working_days = float(paid_days)
+            yield {
+                "IpNumber": esi_number,
+                "IpName": full_name,
                 "NoOfDaysForWhichWagesPaid": working_days,
-                "TotalMonthlyWages": float(record.gross_earnings),
+                "TotalMonthlyWages": float(gross_earnings),
                 "ReasonForZeroWorkingDays": "0" if working_days > 0 else "1", # 1=Leave without pay
                 "LastWorkingDay": ""
-            })
-            
-        return json.dumps(esi_data, indent=2)
+            }
+
+    @staticmethod
+    def iter_esi_json(db: Session, company_id: int, month: int, year: int, pretty: bool = False) -> Iterator[str]:
+        """
+        Encodes the ESIC portal JSON array element by element.
+        pretty=True reproduces json.dumps(..., indent=2) byte for byte.
+        """
+        opener, separator, closer = ("[\n", ",\n", "\n]") if pretty else ("[", ",", "]")
+        first = True
+        for entry in ComplianceService.iter_esi_contributions(db, company_id, month, year):
+            if pretty:
+                chunk = "\n".join("  " + line for line in json.dumps(entry, indent=2).splitlines())
+            else:
+                chunk = json.dumps(entry, separators=(",", ":"))
+            yield (opener if first else separator) + chunk
+            first = False
+        yield "[]" if first else closer
+
+    @staticmethod
+    def iter_esi_ndjson(db: Session, company_id: int, month: int, year: int) -> Iterator[str]:
+        """One compact JSON object per line, for line-oriented uploaders."""
+        for entry in ComplianceService.iter_esi_contributions(db, company_id, month, year):
+            yield json.dumps(entry, separators=(",", ":")) + "\n"
+
+    @staticmethod
+    def generate_esi_json(db: Session, company_id: int, month: int, year: int) -> str:
+        """
+        Generates the ESI monthly contribution data in JSON format for the ESIC portal.
+        """
+        return "".join(ComplianceService.iter_esi_json(db, company_id, month, year, pretty=True))
 
     @staticmethod
     def generate_pt_summary(db: Session, company_id: int, month: int, year: int) -> List[Dict[str, Any]]:
@@ -110,3 +149,50 @@ class ComplianceService:
             {"state": r[0], "headcount": r[1], "amount": float(r[2])}
             for r in results
         ]
+
+    @staticmethod
+    def form_24q_periods(financial_year: str, quarter: int) -> List[Tuple[int, int]]:
+        """'2025-26', Q4 -> [(2026, 1), (2026, 2), (2026, 3)]"""
+        start_year = int(financial_year.split("-")[0])
+        year = start_year + 1 if quarter == 4 else start_year
+        return [(year, month) for month in FORM24Q_QUARTER_MONTHS[quarter]]
+
+    @staticmethod
+    def form_24q_default_quarter(financial_year: str, today: Optional[date] = None) -> int:
+        """
+        The quarter of financial_year in progress today (Apr-Jun = 1 ... Jan-Mar = 4);
+        4 for a financial year that has ended and 1 for one that has not started.
+        """
+        today = today or date.today()
+        start = date(int(financial_year.split("-")[0]), 4, 1)
+        if today < start:
+            return 1
+        if today >= date(start.year + 1, 4, 1):
+            return 4
+        return next(q for q, months in FORM24Q_QUARTER_MONTHS.items() if today.month in months)
+
+    @staticmethod
+    def aggregate_form_24q(db: Session, company_id: int, financial_year: str, quarter: int) -> List[Dict[str, Any]]:
+        """
+        TDS per employee/PAN for one quarter, summed in a single grouped query,
+        so the annexure has one row per deductee regardless of payroll history.
+        """
+        periods = ComplianceService.form_24q_periods(financial_year, quarter)
+        year = periods[0][0]
+        rows = db.query(
+            Employee.id,
+            Employee.full_name,
+            Employee.pan_number,
+            func.coalesce(func.sum(AutoPayOSRecord.income_tax_deduction), 0)
+        ).join(AutoPayOSRecord, AutoPayOSRecord.employee_id == Employee.id)\
+         .filter(
+             AutoPayOSRecord.company_id == company_id,
+             AutoPayOSRecord.year == year,
+             AutoPayOSRecord.month.in_([month for _, month in periods])
+         ).group_by(Employee.id, Employee.full_name, Employee.pan_number)\
+         .order_by(Employee.id).all()
+
+        return [
+            {"employee_id": emp_id, "name": name, "pan": pan or "NA", "tds": Decimal(str(tds))}
+            for emp_id, name, pan, tds in rows
+        ]
@@ -5,9 +5,9 @@ from decimal import Decimal
 import calendar
 
 from app.models.employee import Employee
-from app.models.attendance import Attendance
 from app.models.autopay_os import SalaryStructure
 from app.models.ewa import EWAWithdrawal, EWAStatus
+from app.services.attendance_summary import AttendanceSummaryService
 
 class EWAService:
     @staticmethod
@@ -30,18 +30,13 @@ class EWAService:
         year = today.year
         _, days_in_month = calendar.monthrange(year, month)
 
-        # Get attendance so far
-        start_of_month = date(year, month, 1)
-        attendance_records = db.query(Attendance).filter(
-            Attendance.employee_id == employee_id,
-            Attendance.date >= start_of_month,
-            Attendance.date <= today
-        ).all()
+        # Get attendance so far (monthly rollup)
+        counts = AttendanceSummaryService.get_employee_counts(db, employee_id, year, month)
 
         # Calculate paid days so far (including leaves and half days)
-        present_count = sum(1 for a in attendance_records if a.status == 'present')
-        half_day_count = sum(Decimal("0.5") for a in attendance_records if a.status == 'half-day')
-        leave_count = sum(1 for a in attendance_records if a.status == 'leave')
+        present_count = counts.get('present', 0)
+        half_day_count = Decimal("0.5") * counts.get('half-day', 0)
+        leave_count = counts.get('leave', 0)
         
         paid_days_so_far = Decimal(present_count) + half_day_count + Decimal(leave_count)
         
@@ -0,0 +1,114 @@
+import os
+import re
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.employee import Employee
+from app.models.payroll_tracking import PayrollPeriodVersion
+
+
+class FilingCache:
+    """
+    Caches generated statutory filings on disk under (company, filing type, period,
+    data version). The data version combines the payroll period versions with the
+    latest employee change, so a repeat download costs two aggregate lookups and a
+    file read, and a client revalidating with If-None-Match gets a 304.
+    """
+
+    @staticmethod
+    def data_version(db: Session, company_id: int, periods: Optional[List[Tuple[int, int]]] = None) -> str:
+        """Version of the data behind a filing; periods=None covers every period of the company."""
+        query = db.query(
+            func.coalesce(func.sum(PayrollPeriodVersion.version), 0),
+            func.count(PayrollPeriodVersion.id)
+        ).filter(PayrollPeriodVersion.company_id == company_id)
+        if periods is not None:
+            query = query.filter(or_(*[
+                and_(PayrollPeriodVersion.year == year, PayrollPeriodVersion.month == month) for year, month in periods
+            ]))
+        records_version, period_count = query.one()
+
+        # Filings also print employee master data (names, UAN/ESI numbers, PAN)
+        employees_changed = db.query(
+            func.max(func.coalesce(Employee.updated_at, Employee.created_at))
+        ).filter(Employee.company_id == company_id).scalar()
+        if isinstance(employees_changed, str):  # SQLite returns coalesced datetimes as text
+            employees_changed = datetime.fromisoformat(employees_changed)
+        employees_stamp = int(employees_changed.timestamp()) if employees_changed else 0
+        return f"{records_version}.{period_count}.{employees_stamp}"
+
+    @staticmethod
+    def etag(company_id: int, filing_type: str, period: str, version: str) -> str:
+        return f'"{company_id}-{filing_type}-{period}-{version}"'
+
+    @staticmethod
+    def is_not_modified(request: Request, etag: str) -> bool:
+        header = request.headers.get("if-none-match")
+        if not header:
+            return False
+        candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+        return "*" in candidates or etag in candidates
+
+    @staticmethod
+    def _path(company_id: int, filing_type: str, period: str, version: str) -> Path:
+        safe = lambda value: re.sub(r"[^A-Za-z0-9._-]", "_", value)
+        return Path(settings.FILING_CACHE_DIR) / f"company_{company_id}" / f"{safe(filing_type)}_{safe(period)}_v{safe(version)}"
+
+    @staticmethod
+    def _write_through(chunks: Iterable[Union[str, bytes]], path: Path) -> Iterator[bytes]:
+        """Streams chunks to the client while writing them to the cache; the file appears only when complete."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        complete = False
+        try:
+            with open(tmp, "wb") as f:
+                for chunk in chunks:
+                    data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+                    f.write(data)
+                    yield data
+            os.replace(tmp, path)
+            complete = True
+            # Older versions of the same filing can never be served again
+            for stale in path.parent.glob(path.name.rsplit("_v", 1)[0] + "_v*"):
+                if stale != path and not stale.name.endswith(".tmp"):
+                    stale.unlink(missing_ok=True)
+        finally:
+            if not complete:
+                tmp.unlink(missing_ok=True)
+
+    @staticmethod
+    def respond(
+        request: Request,
+        db: Session,
+        company_id: int,
+        filing_type: str,
+        period: str,
+        periods: Optional[List[Tuple[int, int]]],
+        produce: Callable[[], Iterable[Union[str, bytes]]],
+        media_type: str,
+        filename: Optional[str] = None
+    ) -> Response:
+        """
+        Serves a filing from cache when its data version is unchanged, otherwise
+        streams produce() to the client and the cache at the same time.
+        """
+        version = FilingCache.data_version(db, company_id, periods)
+        etag = FilingCache.etag(company_id, filing_type, period, version)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if FilingCache.is_not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+
+        if filename:
+            headers["Content-Disposition"] = f"attachment; filename={filename}"
+        path = FilingCache._path(company_id, filing_type, period, version)
+        if path.exists():
+            return FileResponse(path, media_type=media_type, headers=headers)
+        return StreamingResponse(FilingCache._write_through(produce(), path), media_type=media_type, headers=headers)
@@ -0,0 +1,113 @@
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import billiard
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.autopay_os import AutoPayOSRecord
+from app.models.employee import Employee
+from app.services.pdf_service import PDFService
+
+STANDARD_DEDUCTION = Decimal("75000")
+
+
+def _render_batch(args) -> List[Tuple[str, bytes]]:
+    """Renders a batch of certificates; returns (filename, pdf bytes) pairs."""
+    rows, company_name, tan, financial_year = args
+    return [Form16Service.render(row, company_name, tan, financial_year) for row in rows]
+
+
+def _render_indexed(indexed) -> Tuple[int, Optional[List[Tuple[str, bytes]]], Optional[Exception]]:
+    """Pool entry point: renders one numbered batch; a failure is returned, not raised, so other batches go on."""
+    index, task = indexed
+    try:
+        return index, _render_batch(task), None
+    except Exception as e:
+        return index, None, e
+
+
+class Form16Service:
+    @staticmethod
+    def financial_year_bounds(financial_year: str) -> Tuple[int, int]:
+        """'2025-26' -> (first, last) period keys (year * 12 + month), April to March."""
+        start_year = int(financial_year.split("-")[0])
+        return start_year * 12 + 4, (start_year + 1) * 12 + 3
+
+    @staticmethod
+    def aggregate(db: Session, company_id: int, financial_year: str, employee_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """Annual gross and TDS per employee for the financial year, in one grouped query."""
+        first, last = Form16Service.financial_year_bounds(financial_year)
+        period = AutoPayOSRecord.year * 12 + AutoPayOSRecord.month
+        query = db.query(
+            Employee.id,
+            Employee.employee_code,
+            Employee.full_name,
+            Employee.pan_number,
+            func.coalesce(func.sum(AutoPayOSRecord.gross_earnings), 0),
+            func.coalesce(func.sum(AutoPayOSRecord.income_tax_deduction), 0)
+        ).join(AutoPayOSRecord, AutoPayOSRecord.employee_id == Employee.id).filter(
+            Employee.company_id == company_id,
+            period >= first,
+            period <= last
+        )
+        if employee_ids is not None:
+            query = query.filter(Employee.id.in_(employee_ids))
+        rows = query.group_by(Employee.id, Employee.employee_code, Employee.full_name, Employee.pan_number).order_by(Employee.id).all()
+        return [
+            {
+                "employee_id": emp_id,
+                "employee_code": code,
+                "employee_name": name,
+                "pan": pan,
+                "gross": Decimal(str(gross)),
+                "tax": Decimal(str(tax)),
+            }
+            for emp_id, code, name, pan, gross, tax in rows
+        ]
+
+    @staticmethod
+    def render(row: Dict[str, Any], company_name: str, tan: Optional[str], financial_year: str) -> Tuple[str, bytes]:
+        data = {
+            "gross": f"{float(row['gross']):,.2f}",
+            "taxable": f"{float(row['gross'] - STANDARD_DEDUCTION):,.2f}",
+            "tax": f"{float(row['tax']):,.2f}"
+        }
+        pdf_buffer = PDFService.generate_form_16(
+            employee_name=row["employee_name"],
+            pan=row["pan"] or "NOT PROVIDED",
+            company_name=company_name,
+            tan=tan or "NOT PROVIDED",
+            year=financial_year,
+            data=data
+        )
+        return f"Form16_{row['employee_code']}_{financial_year}.pdf", pdf_buffer.getvalue()
+
+    @staticmethod
+    def render_many(
+        rows: List[Dict[str, Any]],
+        company_name: str,
+        tan: Optional[str],
+        financial_year: str,
+        workers: Optional[int] = None
+    ) -> Iterator[Tuple[List[Dict[str, Any]], Optional[List[Tuple[str, bytes]]], Optional[Exception]]]:
+        """
+        Renders certificates in FORM16_RENDER_BATCH batches across a pool of
+        FORM16_WORKERS processes and yields (batch rows, files, error) as each
+        batch finishes, in completion order. The pool is billiard's (Celery's
+        fork of multiprocessing), which unlike multiprocessing may be started
+        from the daemonic child of a Celery prefork worker.
+        """
+        workers = settings.FORM16_WORKERS if workers is None else workers
+        batches = [rows[i:i + settings.FORM16_RENDER_BATCH] for i in range(0, len(rows), settings.FORM16_RENDER_BATCH)]
+        tasks = [(batch, company_name, tan, financial_year) for batch in batches]
+
+        if workers <= 1 or len(batches) <= 1:
+            for index, task in enumerate(tasks):
+                yield (task[0], *_render_indexed((index, task))[1:])
+            return
+
+        with billiard.Pool(processes=min(workers, len(batches))) as pool:
+            for index, files, error in pool.imap_unordered(_render_indexed, enumerate(tasks)):
+                yield batches[index], files, error
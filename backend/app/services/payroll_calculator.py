@@ -0,0 +1,135 @@
+import numpy as np
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+
+# Statutory rates as exact integer ratios (numerator, denominator)
+PF_RATE = (12, 100)              # 12% of earned basic (employee and employer)
+ESI_EMPLOYEE_RATE = (75, 10000)  # 0.75% of gross
+ESI_EMPLOYER_RATE = (325, 10000) # 3.25% of gross
+ESI_WAGE_CEILING = 21000_00      # paise
+RATE_DENOMINATOR = 10000         # common denominator of all rates above
+
+# TN Professional Tax (Simplified Slab): (gross above, monthly PT) in paise
+PT_SLABS = [(12500_00, 250_00), (10000_00, 150_00), (7500_00, 100_00)]
+
+EARNING_COLUMNS = ["basic", "hra", "conveyance", "medical_allowance", "special_allowance"]
+
+
+def _round_ratio(values: np.ndarray, numerator, denominator) -> np.ndarray:
+    """values * numerator / denominator rounded half-up to the nearest paisa (non-negative inputs)."""
+    return (2 * values * numerator + denominator) // (2 * denominator)
+
+
+class PayrollCalculator:
+    """
+    Columnar payroll math on fixed-point integer paise.
+    Every earning and deduction column for a whole company is computed at once,
+    with each stored amount rounded half-up to the paisa exactly once.
+    """
+
+    @staticmethod
+    def to_paise(values: Iterable) -> np.ndarray:
+        # Numeric(15, 2) amounts are exact in float64 once scaled to paise and rounded
+        return np.rint(np.fromiter((float(v or 0) for v in values), dtype=np.float64) * 100).astype(np.int64)
+
+    @staticmethod
+    def from_paise(values: np.ndarray) -> List[Decimal]:
+        return [Decimal(int(v)).scaleb(-2) for v in values]
+
+    @staticmethod
+    def scale(values: np.ndarray, percent: float) -> np.ndarray:
+        """Applies a percentage change (e.g. a hike) to a paise column."""
+        numerator = int(round((100 + percent) * 100))
+        return _round_ratio(values, numerator, 100_00)
+
+    @staticmethod
+    def compute(
+        basic: np.ndarray,
+        hra: np.ndarray,
+        conveyance: np.ndarray,
+        medical_allowance: np.ndarray,
+        special_allowance: np.ndarray,
+        paid_days: np.ndarray,
+        num_days: int,
+        pf_enabled: Optional[np.ndarray] = None,
+        esi_enabled: Optional[np.ndarray] = None,
+        pt_enabled: Optional[np.ndarray] = None,
+        employer_pf_enabled: Optional[np.ndarray] = None,
+        employer_esi_enabled: Optional[np.ndarray] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Computes payslip columns for n employees.
+        Salary components are monthly paise (int64), paid_days may contain half days.
+        Returns paise columns plus paid_days/absent_days as floats.
+        """
+        n = len(basic)
+        enabled = lambda flags: np.ones(n, dtype=bool) if flags is None else np.asarray(flags, dtype=bool)
+
+        # Paid days are counted in half-day units so pro-rating stays integral
+        paid_halves = np.rint(np.asarray(paid_days, dtype=np.float64) * 2).astype(np.int64)
+        month_halves = 2 * num_days
+
+        # Every intermediate is kept as an exact numerator over a common denominator
+        # (month halves x rate denominator) and rounded to paise only when emitted.
+        # This reproduces the unrounded Decimal arithmetic of the per-employee loop.
+        scale = RATE_DENOMINATOR
+        denominator = month_halves * scale
+        emit = lambda numerator: _round_ratio(numerator, 1, denominator)
+        at_rate = lambda prorated, rate: prorated * rate[0] * (scale // rate[1])
+
+        components = [np.asarray(c, dtype=np.int64) for c in (basic, hra, conveyance, medical_allowance, special_allowance)]
+        monthly_gross = sum(components)
+
+        # 1. Earnings (Pro-rated)
+        earned = {col: _round_ratio(amount, paid_halves, month_halves) for col, amount in zip(EARNING_COLUMNS, components)}
+        basic_prorated = components[0] * paid_halves
+        gross_prorated = monthly_gross * paid_halves
+        gross_exact = gross_prorated * scale
+        esi_eligible = gross_exact <= ESI_WAGE_CEILING * denominator
+
+        # 2. Deductions (Simplified Indian Rules)
+        pf_exact = np.where(enabled(pf_enabled), at_rate(basic_prorated, PF_RATE), 0)
+        esi_exact = np.where(enabled(esi_enabled) & esi_eligible, at_rate(gross_prorated, ESI_EMPLOYEE_RATE), 0)
+        pt = np.select([gross_exact > threshold * denominator for threshold, _ in PT_SLABS], [amount for _, amount in PT_SLABS], 0)
+        pt = np.where(enabled(pt_enabled), pt, 0)
+
+        deductions_exact = pf_exact + esi_exact + pt * denominator
+
+        # 3. Employer Contributions
+        employer_pf_exact = np.where(enabled(employer_pf_enabled), at_rate(basic_prorated, PF_RATE), 0)
+        employer_esi_exact = np.where(enabled(employer_esi_enabled) & esi_eligible, at_rate(gross_prorated, ESI_EMPLOYER_RATE), 0)
+
+        return {
+            "paid_days": paid_halves / 2,
+            "absent_days": (month_halves - paid_halves) / 2,
+            "gross_earnings": emit(gross_exact),
+            "total_deductions": emit(deductions_exact),
+            "net_pay": emit(gross_exact - deductions_exact),
+            "basic_earned": earned["basic"],
+            "hra_earned": earned["hra"],
+            "conveyance_earned": earned["conveyance"],
+            "medical_earned": earned["medical_allowance"],
+            "special_earned": earned["special_allowance"],
+            "pf_deduction": emit(pf_exact),
+            "esi_deduction": emit(esi_exact),
+            "pt_deduction": pt,
+            "employer_pf_contribution": emit(employer_pf_exact),
+            "employer_esi_contribution": emit(employer_esi_exact),
+        }
+
+    @staticmethod
+    def compute_structures(structures: List, paid_days: Iterable, num_days: int, hike_percent: float = 0) -> Dict[str, np.ndarray]:
+        """Convenience wrapper taking SalaryStructure rows (ORM objects or named tuples)."""
+        columns = {col: PayrollCalculator.to_paise(getattr(s, col) for s in structures) for col in EARNING_COLUMNS}
+        if hike_percent:
+            columns = {col: PayrollCalculator.scale(values, hike_percent) for col, values in columns.items()}
+        flags = {
+            name: np.array([bool(getattr(s, name)) for s in structures], dtype=bool)
+            for name in ["pf_enabled", "esi_enabled", "pt_enabled", "employer_pf_enabled", "employer_esi_enabled"]
+        }
+        return PayrollCalculator.compute(
+            paid_days=np.fromiter((float(d) for d in paid_days), dtype=np.float64, count=len(structures)),
+            num_days=num_days,
+            **columns,
+            **flags
+        )
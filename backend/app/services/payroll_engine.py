@@ -0,0 +1,363 @@
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy import create_engine, func, insert, update, and_, or_
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+import calendar
+import time
+
+from app.core.config import settings
+from app.core.database import chunked
+from app.models.autopay_os import SalaryStructure, AutoPayOSRecord, AutoPayOSStatus
+from app.models.employee import Employee
+from app.models.payroll_tracking import PayrollDirtyMark, ALL_PERIODS, bump_period_versions
+from app.services.attendance_summary import AttendanceSummaryService
+from app.services.payroll_calculator import PayrollCalculator
+
+
+# Per-process session factory for sharded runs, created by _init_shard_worker
+_worker_session = None
+
+
+def _init_shard_worker() -> None:
+    """Gives each pool worker its own engine instead of the connections inherited from the parent."""
+    global _worker_session
+    is_sqlite = "sqlite" in settings.DATABASE_URL
+    worker_engine = create_engine(
+        settings.DATABASE_URL,
+        connect_args={"check_same_thread": False} if is_sqlite else {},
+        pool_pre_ping=True
+    )
+    _worker_session = sessionmaker(autocommit=False, autoflush=False, bind=worker_engine)
+
+
+def _compute_shard(args) -> Dict[int, Dict[str, Any]]:
+    employee_ids, month, year = args
+    db = _worker_session()
+    try:
+        return PayrollEngine.compute(db, employee_ids, month, year)
+    finally:
+        db.close()
+
+
+class PayrollEngine:
+    """
+    Set-based payroll run: loads every input for a batch of employees in a
+    handful of queries, computes payslips in memory and bulk upserts them.
+    """
+
+    @staticmethod
+    def month_bounds(month: int, year: int):
+        _, num_days = calendar.monthrange(year, month)
+        return date(year, month, 1), date(year, month, num_days), num_days
+
+    @staticmethod
+    def load_salary_structures(db: Session, employee_ids: List[int]) -> Dict[int, Any]:
+        """Returns {employee_id: (company_id, SalaryStructure)} for employees that have a structure."""
+        structures = {}
+        for chunk in chunked(employee_ids, settings.PAYROLL_BATCH_SIZE):
+            rows = db.query(Employee.id, Employee.company_id, SalaryStructure).join(
+                SalaryStructure, SalaryStructure.employee_id == Employee.id
+            ).filter(Employee.id.in_(chunk)).all()
+            for emp_id, company_id, structure in rows:
+                structures[emp_id] = (company_id, structure)
+        return structures
+
+    @staticmethod
+    def load_attendance_counts(db: Session, employee_ids: List[int], month: int, year: int) -> Dict[int, Dict[str, int]]:
+        """Per-employee attendance status counts for the period, read from the monthly rollup."""
+        return AttendanceSummaryService.get_counts(db, employee_ids, year, month)
+
+    @staticmethod
+    def load_existing_record_ids(db: Session, employee_ids: List[int], month: int, year: int) -> Dict[int, int]:
+        """Returns {employee_id: record_id} of the record already stored for the period."""
+        existing: Dict[int, int] = {}
+        for chunk in chunked(employee_ids, settings.PAYROLL_BATCH_SIZE):
+            rows = db.query(AutoPayOSRecord.employee_id, AutoPayOSRecord.id).filter(
+                AutoPayOSRecord.employee_id.in_(chunk),
+                AutoPayOSRecord.month == month,
+                AutoPayOSRecord.year == year
+            ).order_by(AutoPayOSRecord.id).all()
+            for emp_id, record_id in rows:
+                existing.setdefault(emp_id, record_id)
+        return existing
+
+    @staticmethod
+    def paid_days(status_counts: Dict[str, int]) -> Decimal:
+        """Present and leave days count fully, half days count as 0.5."""
+        present_days = status_counts.get('present', 0)
+        half_days = Decimal("0.5") * status_counts.get('half-day', 0)
+        leave_days = status_counts.get('leave', 0)
+        return Decimal(present_days) + half_days + Decimal(leave_days)
+
+    @staticmethod
+    def calculate_payslips(structures: List[SalaryStructure], paid_days: List[Decimal], num_days: int) -> List[Dict[str, Decimal]]:
+        """Computes earnings, deductions and employer contributions for a batch of employees."""
+        columns = PayrollCalculator.compute_structures(structures, paid_days, num_days)
+        values = {
+            col: (
+                [Decimal(str(v)) for v in data]
+                if col in ("paid_days", "absent_days")
+                else PayrollCalculator.from_paise(data)
+            )
+            for col, data in columns.items()
+        }
+        return [dict(zip(values, row)) for row in zip(*values.values())]
+
+    @staticmethod
+    def bulk_upsert(db: Session, payslips: Dict[int, Dict[str, Any]], existing: Dict[int, int]) -> None:
+        """Writes computed payslips: one executemany UPDATE for existing rows, one INSERT for new ones."""
+        updates = []
+        inserts = []
+        for emp_id, values in payslips.items():
+            if emp_id in existing:
+                updates.append({"id": existing[emp_id], **values})
+            else:
+                # TDS is not computed by the payroll run; start new records at zero
+                inserts.append({"employee_id": emp_id, "income_tax_deduction": Decimal("0.0"), **values})
+
+        for chunk in chunked(updates, settings.PAYROLL_BATCH_SIZE):
+            db.execute(update(AutoPayOSRecord), chunk)
+        for chunk in chunked(inserts, settings.PAYROLL_BATCH_SIZE):
+            db.execute(insert(AutoPayOSRecord), chunk)
+
+        # Bulk statements skip mapper events, so bump the period versions here
+        bump_period_versions(db.connection(), {
+            (values["company_id"], values["year"], values["month"]) for values in payslips.values()
+        })
+
+    @staticmethod
+    def load_records(db: Session, employee_ids: List[int], month: int, year: int) -> List[AutoPayOSRecord]:
+        """Loads the period's records for the given employees, preserving request order."""
+        by_employee: Dict[int, AutoPayOSRecord] = {}
+        for chunk in chunked(employee_ids, settings.PAYROLL_BATCH_SIZE):
+            rows = db.query(AutoPayOSRecord).filter(
+                AutoPayOSRecord.employee_id.in_(chunk),
+                AutoPayOSRecord.month == month,
+                AutoPayOSRecord.year == year
+            ).order_by(AutoPayOSRecord.id).all()
+            for record in rows:
+                by_employee.setdefault(record.employee_id, record)
+        return [by_employee[emp_id] for emp_id in employee_ids if emp_id in by_employee]
+
+    @staticmethod
+    def compute(db: Session, employee_ids: Iterable[int], month: int, year: int) -> Dict[int, Dict[str, Any]]:
+        """Computes payslip column values for every employee that has a salary structure."""
+        employee_ids = list(dict.fromkeys(employee_ids))
+        _, _, num_days = PayrollEngine.month_bounds(month, year)
+
+        structures = PayrollEngine.load_salary_structures(db, employee_ids)
+        attendance = PayrollEngine.load_attendance_counts(db, list(structures), month, year)
+
+        ids = [emp_id for emp_id in employee_ids if emp_id in structures]
+        calculated = PayrollEngine.calculate_payslips(
+            [structures[emp_id][1] for emp_id in ids],
+            [PayrollEngine.paid_days(attendance.get(emp_id, {})) for emp_id in ids],
+            num_days
+        )
+
+        payslips = {}
+        for emp_id, values in zip(ids, calculated):
+            company_id = structures[emp_id][0]
+            values.update(
+                company_id=company_id,
+                month=month,
+                year=year,
+                status=AutoPayOSStatus.PROCESSED
+            )
+            payslips[emp_id] = values
+        return payslips
+
+    @staticmethod
+    def compute_sharded(db: Session, employee_ids: Iterable[int], month: int, year: int, workers: Optional[int] = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Splits employees into PAYROLL_SHARD_SIZE shards and computes them on a
+        process pool, each worker reading through its own engine and session.
+        With workers <= 1 the shards run sequentially in this session, which is
+        the deterministic reference for comparing outputs and measuring speedup.
+        Shard results are merged in shard order either way.
+        """
+        employee_ids = list(dict.fromkeys(employee_ids))
+        workers = settings.PAYROLL_WORKERS if workers is None else workers
+        shards = list(chunked(employee_ids, settings.PAYROLL_SHARD_SIZE))
+
+        payslips: Dict[int, Dict[str, Any]] = {}
+        if workers <= 1 or len(shards) <= 1:
+            for shard in shards:
+                payslips.update(PayrollEngine.compute(db, shard, month, year))
+            return payslips
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards)), initializer=_init_shard_worker) as pool:
+            for shard_payslips in pool.map(_compute_shard, [(shard, month, year) for shard in shards]):
+                payslips.update(shard_payslips)
+        return payslips
+
+    @staticmethod
+    def load_previous_paid(db: Session, employee_ids: List[int], month: int, year: int) -> Dict[int, Any]:
+        """
+        Latest PAID record before the period for each employee, fetched with one
+        ROW_NUMBER() window query per batch. Values are column tuples, not ORM objects.
+        """
+        period = year * 12 + month
+        previous: Dict[int, Any] = {}
+        for chunk in chunked(employee_ids, settings.PAYROLL_BATCH_SIZE):
+            ranked = db.query(
+                AutoPayOSRecord.employee_id,
+                AutoPayOSRecord.month,
+                AutoPayOSRecord.year,
+                AutoPayOSRecord.gross_earnings,
+                AutoPayOSRecord.total_deductions,
+                AutoPayOSRecord.net_pay,
+                AutoPayOSRecord.pf_deduction,
+                AutoPayOSRecord.income_tax_deduction,
+                func.row_number().over(
+                    partition_by=AutoPayOSRecord.employee_id,
+                    order_by=(AutoPayOSRecord.year.desc(), AutoPayOSRecord.month.desc())
+                ).label("rn")
+            ).filter(
+                AutoPayOSRecord.employee_id.in_(chunk),
+                AutoPayOSRecord.status == AutoPayOSStatus.PAID,
+                (AutoPayOSRecord.year * 12 + AutoPayOSRecord.month) < period
+            ).subquery()
+            for row in db.query(ranked).filter(ranked.c.rn == 1).all():
+                previous[row.employee_id] = row
+        return previous
+
+    @staticmethod
+    def preview(db: Session, company_id: int, employee_ids: Iterable[int], month: int, year: int) -> Iterator[Dict[str, Any]]:
+        """
+        Read-only payroll: yields one computed payslip per employee of company_id,
+        batch by batch, with deltas against the last PAID record. Employees of
+        other companies are never yielded. Nothing is written.
+        """
+        employee_ids = list(dict.fromkeys(employee_ids))
+        for chunk in chunked(employee_ids, settings.PAYROLL_BATCH_SIZE):
+            payslips = {
+                emp_id: values for emp_id, values in PayrollEngine.compute(db, chunk, month, year).items()
+                if values["company_id"] == company_id
+            }
+            previous = PayrollEngine.load_previous_paid(db, list(payslips), month, year)
+            for emp_id, values in payslips.items():
+                last_paid = previous.get(emp_id)
+                delta = None
+                if last_paid is not None:
+                    delta = {
+                        col: values[col] - (getattr(last_paid, col) or 0)
+                        for col in ("gross_earnings", "total_deductions", "net_pay")
+                    }
+                    if last_paid.gross_earnings:
+                        delta["gross_percent"] = round(delta["gross_earnings"] / last_paid.gross_earnings * 100, 2)
+                yield {
+                    "employee_id": emp_id,
+                    "payslip": values,
+                    "last_paid": None if last_paid is None else {
+                        "month": last_paid.month,
+                        "year": last_paid.year,
+                        "gross_earnings": last_paid.gross_earnings,
+                        "total_deductions": last_paid.total_deductions,
+                        "net_pay": last_paid.net_pay,
+                    },
+                    "delta": delta,
+                }
+            # Drop identity-map entries so memory stays flat across batches
+            db.expunge_all()
+
+    @staticmethod
+    def split_dirty(db: Session, employee_ids: Iterable[int], month: int, year: int) -> Tuple[List[int], List[int]]:
+        """
+        Splits employees into (to_recompute, skipped) for an incremental run.
+        An employee is recomputed when the period has no record yet, or when a
+        dirty mark for the period (or for all periods) is newer than processed_at.
+        """
+        employee_ids = list(dict.fromkeys(employee_ids))
+        processed_at: Dict[int, Any] = {}
+        latest_mark: Dict[int, Any] = {}
+        for chunk in chunked(employee_ids, settings.PAYROLL_BATCH_SIZE):
+            rows = db.query(AutoPayOSRecord.employee_id, AutoPayOSRecord.processed_at).filter(
+                AutoPayOSRecord.employee_id.in_(chunk),
+                AutoPayOSRecord.month == month,
+                AutoPayOSRecord.year == year
+            ).order_by(AutoPayOSRecord.id).all()
+            for emp_id, ts in rows:
+                processed_at.setdefault(emp_id, ts)
+
+            rows = db.query(PayrollDirtyMark.employee_id, func.max(PayrollDirtyMark.marked_at)).filter(
+                PayrollDirtyMark.employee_id.in_(chunk),
+                or_(
+                    and_(PayrollDirtyMark.year == year, PayrollDirtyMark.month == month),
+                    PayrollDirtyMark.year == ALL_PERIODS
+                )
+            ).group_by(PayrollDirtyMark.employee_id).all()
+            latest_mark.update(rows)
+
+        recompute, skipped = [], []
+        for emp_id in employee_ids:
+            last_run = processed_at.get(emp_id)
+            changed = emp_id in latest_mark and (last_run is None or latest_mark[emp_id] > last_run)
+            if emp_id not in processed_at or last_run is None or changed:
+                recompute.append(emp_id)
+            else:
+                skipped.append(emp_id)
+        return recompute, skipped
+
+    @staticmethod
+    def clear_dirty_marks(db: Session, employee_ids: List[int], month: int, year: int, before: datetime) -> None:
+        """
+        Drops the period's marks that a run has just consumed, and ALL_PERIODS
+        marks once no record of the employee was processed before them (every
+        period they apply to has been recomputed). Call after the run's records
+        are written.
+        """
+        for chunk in chunked(employee_ids, settings.PAYROLL_BATCH_SIZE):
+            db.query(PayrollDirtyMark).filter(
+                PayrollDirtyMark.employee_id.in_(chunk),
+                PayrollDirtyMark.year == year,
+                PayrollDirtyMark.month == month,
+                PayrollDirtyMark.marked_at <= before
+            ).delete(synchronize_session=False)
+
+            stale_record = db.query(AutoPayOSRecord.id).filter(
+                AutoPayOSRecord.employee_id == PayrollDirtyMark.employee_id,
+                or_(AutoPayOSRecord.processed_at.is_(None), AutoPayOSRecord.processed_at < PayrollDirtyMark.marked_at)
+            ).exists()
+            db.query(PayrollDirtyMark).filter(
+                PayrollDirtyMark.employee_id.in_(chunk),
+                PayrollDirtyMark.year == ALL_PERIODS,
+                PayrollDirtyMark.marked_at <= before,
+                ~stale_record
+            ).delete(synchronize_session=False)
+
+    @staticmethod
+    def run(db: Session, employee_ids: Iterable[int], month: int, year: int, sharded: bool = False) -> Dict[str, Any]:
+        """
+        Computes and persists payroll for the given employees.
+        Returns the stored records plus throughput stats for the run.
+        """
+        started = time.perf_counter()
+        # Inputs changed after this instant are newer than the run and stay dirty
+        now = datetime.now()
+        employee_ids = list(dict.fromkeys(employee_ids))
+
+        if sharded:
+            payslips = PayrollEngine.compute_sharded(db, employee_ids, month, year)
+        else:
+            payslips = PayrollEngine.compute(db, employee_ids, month, year)
+
+        for values in payslips.values():
+            values["processed_at"] = now
+
+        existing = PayrollEngine.load_existing_record_ids(db, list(payslips), month, year)
+        PayrollEngine.bulk_upsert(db, payslips, existing)
+        PayrollEngine.clear_dirty_marks(db, list(payslips), month, year, now)
+        db.commit()
+
+        records = PayrollEngine.load_records(db, list(payslips), month, year)
+        elapsed = time.perf_counter() - started
+        return {
+            "records": records,
+            "rows": len(records),
+            "workers": settings.PAYROLL_WORKERS if sharded else 1,
+            "elapsed_seconds": elapsed,
+            "rows_per_second": len(records) / elapsed if elapsed > 0 else float(len(records))
+        }
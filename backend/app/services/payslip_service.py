@@ -0,0 +1,122 @@
+import calendar
+import hashlib
+import os
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.security import create_access_token, decode_access_token
+from app.models.autopay_os import AutoPayOSRecord
+from app.models.company import Company
+from app.models.employee import Employee
+from app.services.pdf_service import PDFService
+
+# Bump when the payslip layout changes so cached PDFs are not served with the old look
+PAYSLIP_LAYOUT_VERSION = 1
+
+
+PRINTED_COLUMNS = [
+    "month", "year", "paid_days", "absent_days",
+    "basic_earned", "hra_earned", "conveyance_earned", "medical_earned", "special_earned",
+    "pf_deduction", "esi_deduction", "pt_deduction", "income_tax_deduction",
+    "gross_earnings", "total_deductions", "net_pay",
+]
+
+
+def _money(value) -> str:
+    return f"{float(value or 0):,.2f}"
+
+
+class PayslipService:
+    """
+    Renders payslip PDFs for AutoPayOSRecord rows into a content-addressed store.
+    The blob key is derived from the record id, its update time and the printed
+    values, so every request for an unchanged slip is a file read and a rewritten
+    record is never served stale.
+    """
+
+    @staticmethod
+    def blob_key(record: AutoPayOSRecord) -> str:
+        """
+        Record id + updated_at, plus the printed amounts: timestamps have one-second
+        resolution on some backends, so two writes within a second still get new keys.
+        """
+        identity = [PAYSLIP_LAYOUT_VERSION, record.id, record.updated_at or record.created_at, record.processed_at]
+        identity += [getattr(record, column) for column in PRINTED_COLUMNS]
+        return hashlib.sha256("|".join(str(v) for v in identity).encode()).hexdigest()
+
+    @staticmethod
+    def blob_path(key: str) -> Path:
+        return Path(settings.PAYSLIP_CACHE_DIR) / key[:2] / f"{key}.pdf"
+
+    @staticmethod
+    def render(record: AutoPayOSRecord, employee: Employee, company: Optional[Company]) -> bytes:
+        details = [
+            employee.full_name,
+            employee.employee_code,
+            employee.designation or "-",
+            employee.pan_number or "-",
+            employee.uan_number or "-",
+            f"{float(record.paid_days or 0):g}",
+            f"{float(record.absent_days or 0):g}",
+        ]
+        earnings = [_money(v) for v in (
+            record.basic_earned, record.hra_earned, record.conveyance_earned, record.medical_earned, record.special_earned
+        )]
+        deductions = [_money(v) for v in (
+            record.pf_deduction, record.esi_deduction, record.pt_deduction, record.income_tax_deduction
+        )]
+        totals = {
+            "gross": _money(record.gross_earnings),
+            "deductions": _money(record.total_deductions),
+            "net": _money(record.net_pay),
+        }
+        period = f"{calendar.month_name[record.month]} {record.year}"
+        return PDFService.generate_payslip(
+            company.name if company else "", period, details, earnings, deductions, totals
+        ).getvalue()
+
+    @staticmethod
+    def get_pdf(db: Session, record: AutoPayOSRecord) -> Path:
+        """Path of the record's payslip PDF, rendering and storing it on a cache miss."""
+        path = PayslipService.blob_path(PayslipService.blob_key(record))
+        if path.exists():
+            return path
+
+        employee = db.query(Employee).filter(Employee.id == record.employee_id).first()
+        company = db.query(Company).filter(Company.id == record.company_id).first()
+        content = PayslipService.render(record, employee, company)
+
+        # Write-then-rename: concurrent first requests race harmlessly to the same content
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp.write_bytes(content)
+        os.replace(tmp, path)
+        return path
+
+    @staticmethod
+    def create_download_token(record: AutoPayOSRecord) -> str:
+        """
+        Signed, expiring link token for one payslip. It carries no "sub" claim,
+        so it cannot be used as an API access token.
+        """
+        return create_access_token(
+            {"payslip": record.id},
+            expires_delta=timedelta(minutes=settings.PAYSLIP_LINK_EXPIRE_MINUTES)
+        )
+
+    @staticmethod
+    def resolve_download_token(db: Session, token: str) -> Optional[AutoPayOSRecord]:
+        payload = decode_access_token(token)
+        if not payload or "payslip" not in payload or "sub" in payload:
+            return None
+        return db.query(AutoPayOSRecord).filter(AutoPayOSRecord.id == payload["payslip"]).first()
+
+    @staticmethod
+    def download_url(record: AutoPayOSRecord) -> str:
+        token = PayslipService.create_download_token(record)
+        return f"{settings.API_BASE_URL.rstrip('/')}/api/me/payslips/download?token={token}"
@@ -6,68 +6,166 @@ from io import BytesIO
 from datetime import date
 from typing import Dict, Any, List
 
+from app.services.pdf_templates import PDFTemplate
+
+WIDTH, HEIGHT = A4
+# Annexure rows run from 3.4in below the top edge down to a 1in bottom margin
+FORM24Q_ROWS_PER_PAGE = int((HEIGHT - 4.4*inch) // (0.3*inch)) + 1
+FORM16_ITEMS = ["Gross Salary", "Standard Deduction", "Taxable Income", "Total Tax Payable", "Tax Deducted and Deposited"]
+
+
+def _draw_form_16_static(p: canvas.Canvas) -> None:
+    """Everything on Form 16 that does not depend on the employee."""
+    width, height = WIDTH, HEIGHT
+
+    # Header
+    p.setFont("Helvetica-Bold", 16)
+    p.drawCentredString(width/2, height - 1*inch, "FORM NO. 16")
+    p.setFont("Helvetica", 10)
+    p.drawCentredString(width/2, height - 1.25*inch, "[See rule 31(1)(a)]")
+    p.drawCentredString(width/2, height - 1.5*inch, "Certificate under section 203 of the Income-tax Act, 1961 for tax deducted at source on salary")
+    
+    # Table Borders
+    p.rect(0.5*inch, height - 7.5*inch, width - 1*inch, 5.5*inch)
+    
+    # Company/Employee Labels
+    p.setFont("Helvetica-Bold", 10)
+    p.drawString(0.7*inch, height - 2.2*inch, "Name and Address of the Employer:")
+    p.drawString(width/2 + 0.2*inch, height - 2.2*inch, "Name and Address of the Employee:")
+    
+    # Salary Details Title
+    p.setFont("Helvetica-Bold", 12)
+    p.drawString(0.7*inch, height - 3.2*inch, "Summary of Salary Paid and Tax Deducted")
+    
+    # Table Mockup
+    p.line(0.5*inch, height - 3.4*inch, width - 0.5*inch, height - 3.4*inch)
+    p.drawString(0.7*inch, height - 3.6*inch, "Item")
+    p.drawString(width - 2*inch, height - 3.6*inch, "Amount (Rs.)")
+    p.line(0.5*inch, height - 3.7*inch, width - 0.5*inch, height - 3.7*inch)
+    
+    y = height - 4.0*inch
+    for item in FORM16_ITEMS:
+        p.drawString(0.7*inch, y, item)
+        y -= 0.3*inch
+    p.drawString(width - 2*inch, height - 4.3*inch, "50,000.00")
+        
+    # Footer
+    p.setFont("Helvetica-Oblique", 8)
+    p.drawString(0.7*inch, 0.8*inch, "This is a computer generated certificate and does not require a physical signature.")
+
+
+def _draw_form_24q_static(p: canvas.Canvas) -> None:
+    """Form 24Q title block and annexure column headings."""
+    width, height = WIDTH, HEIGHT
+
+    p.setFont("Helvetica-Bold", 14)
+    p.drawCentredString(width/2, height - 1*inch, "Form No. 24Q")
+    p.setFont("Helvetica", 10)
+    p.drawCentredString(width/2, height - 1.2*inch, "Quarterly statement of deduction of tax under section 192")
+
+    y = height - 3*inch
+    p.setFont("Helvetica-Bold", 10)
+    p.drawString(1*inch, y, "Employee Name")
+    p.drawString(3*inch, y, "PAN")
+    p.drawString(5*inch, y, "TDS Deposited")
+    p.line(1*inch, y-0.1*inch, width-1*inch, y-0.1*inch)
+
+
+PAYSLIP_EARNINGS = ["Basic", "HRA", "Conveyance", "Medical Allowance", "Special Allowance"]
+PAYSLIP_DEDUCTIONS = ["Provident Fund", "ESI", "Professional Tax", "Income Tax (TDS)"]
+PAYSLIP_DETAILS = ["Employee Name", "Employee Code", "Designation", "PAN", "UAN", "Paid Days", "LOP Days"]
+
+
+def _draw_payslip_static(p: canvas.Canvas) -> None:
+    """Payslip frame: title, detail labels and earnings/deductions table headings."""
+    width, height = WIDTH, HEIGHT
+
+    p.setFont("Helvetica-Bold", 16)
+    p.drawCentredString(width/2, height - 0.9*inch, "SALARY SLIP")
+    p.rect(0.5*inch, height - 8.2*inch, width - 1*inch, 6.9*inch)
+
+    # Employee details (values are drawn per slip)
+    p.setFont("Helvetica-Bold", 10)
+    y = height - 1.7*inch
+    for label in PAYSLIP_DETAILS:
+        p.drawString(0.7*inch, y, label)
+        y -= 0.25*inch
+
+    # Earnings / Deductions table
+    top = height - 3.75*inch
+    p.line(0.5*inch, top, width - 0.5*inch, top)
+    p.drawString(0.7*inch, top - 0.2*inch, "Earnings")
+    p.drawRightString(width/2 - 0.2*inch, top - 0.2*inch, "Amount (Rs.)")
+    p.drawString(width/2 + 0.2*inch, top - 0.2*inch, "Deductions")
+    p.drawRightString(width - 0.7*inch, top - 0.2*inch, "Amount (Rs.)")
+    p.line(0.5*inch, top - 0.3*inch, width - 0.5*inch, top - 0.3*inch)
+    p.line(width/2, top, width/2, height - 6.8*inch)
+
+    p.setFont("Helvetica", 10)
+    y = top - 0.55*inch
+    for label in PAYSLIP_EARNINGS:
+        p.drawString(0.7*inch, y, label)
+        y -= 0.25*inch
+    y = top - 0.55*inch
+    for label in PAYSLIP_DEDUCTIONS:
+        p.drawString(width/2 + 0.2*inch, y, label)
+        y -= 0.25*inch
+
+    p.line(0.5*inch, height - 6.8*inch, width - 0.5*inch, height - 6.8*inch)
+    p.setFont("Helvetica-Bold", 10)
+    p.drawString(0.7*inch, height - 7.05*inch, "Gross Earnings")
+    p.drawString(width/2 + 0.2*inch, height - 7.05*inch, "Total Deductions")
+    p.line(0.5*inch, height - 7.25*inch, width - 0.5*inch, height - 7.25*inch)
+    p.setFont("Helvetica-Bold", 12)
+    p.drawString(0.7*inch, height - 7.7*inch, "NET PAY")
+
+    p.setFont("Helvetica-Oblique", 8)
+    p.drawString(0.7*inch, 0.8*inch, "This is a computer generated payslip and does not require a signature.")
+
+
+FORM16_TEMPLATE = PDFTemplate("form16", _draw_form_16_static)
+PAYSLIP_TEMPLATE = PDFTemplate("payslip", _draw_payslip_static)
+FORM24Q_TEMPLATE = PDFTemplate("form24q", _draw_form_24q_static)
+
+
+def _paint(p: canvas.Canvas, template: PDFTemplate, use_template: bool, as_form: bool = False) -> None:
+    """Static content via the template, or redrawn call by call."""
+    if use_template:
+        template.apply(p, as_form=as_form)
+    else:
+        template.draw(p)
+
+
 class PDFService:
     @staticmethod
-    def generate_form_16(employee_name: str, pan: str, company_name: str, tan: str, year: str, data: Dict[str, Any]) -> BytesIO:
+    def generate_form_16(employee_name: str, pan: str, company_name: str, tan: str, year: str, data: Dict[str, Any], use_template: bool = True) -> BytesIO:
         """
         Simulates generation of TDS Certificate Part B (Form 16).
         """
         buffer = BytesIO()
         p = canvas.Canvas(buffer, pagesize=A4)
         width, height = A4
-        
-        # Header
-        p.setFont("Helvetica-Bold", 16)
-        p.drawCentredString(width/2, height - 1*inch, "FORM NO. 16")
-        p.setFont("Helvetica", 10)
-        p.drawCentredString(width/2, height - 1.25*inch, "[See rule 31(1)(a)]")
-        p.drawCentredString(width/2, height - 1.5*inch, "Certificate under section 203 of the Income-tax Act, 1961 for tax deducted at source on salary")
-        
-        # Table Borders
-        p.rect(0.5*inch, height - 7.5*inch, width - 1*inch, 5.5*inch)
+        _paint(p, FORM16_TEMPLATE, use_template)
         
         # Company/Employee Details
-        p.setFont("Helvetica-Bold", 10)
-        p.drawString(0.7*inch, height - 2.2*inch, "Name and Address of the Employer:")
         p.setFont("Helvetica", 10)
         p.drawString(0.7*inch, height - 2.4*inch, company_name)
         p.drawString(0.7*inch, height - 2.6*inch, "TAN: " + tan)
-        
-        p.setFont("Helvetica-Bold", 10)
-        p.drawString(width/2 + 0.2*inch, height - 2.2*inch, "Name and Address of the Employee:")
-        p.setFont("Helvetica", 10)
         p.drawString(width/2 + 0.2*inch, height - 2.4*inch, employee_name)
         p.drawString(width/2 + 0.2*inch, height - 2.6*inch, "PAN: " + pan)
         
-        # Salary Details Title
+        # Amounts (Standard Deduction is part of the template)
         p.setFont("Helvetica-Bold", 12)
-        p.drawString(0.7*inch, height - 3.2*inch, "Summary of Salary Paid and Tax Deducted")
-        
-        # Table Mockup
-        p.line(0.5*inch, height - 3.4*inch, width - 0.5*inch, height - 3.4*inch)
-        cols = ["Item", "Amount (Rs.)"]
-        p.drawString(0.7*inch, height - 3.6*inch, cols[0])
-        p.drawString(width - 2*inch, height - 3.6*inch, cols[1])
-        p.line(0.5*inch, height - 3.7*inch, width - 0.5*inch, height - 3.7*inch)
-        
-        items = [
-            ("Gross Salary", data.get("gross", "0.00")),
-            ("Standard Deduction", "50,000.00"),
-            ("Taxable Income", data.get("taxable", "0.00")),
-            ("Total Tax Payable", data.get("tax", "0.00")),
-            ("Tax Deducted and Deposited", data.get("tax", "0.00")),
-        ]
-        
+        values = [data.get("gross", "0.00"), None, data.get("taxable", "0.00"), data.get("tax", "0.00"), data.get("tax", "0.00")]
         y = height - 4.0*inch
-        for item, val in items:
-            p.drawString(0.7*inch, y, item)
-            p.drawString(width - 2*inch, y, val)
+        for val in values:
+            if val is not None:
+                p.drawString(width - 2*inch, y, val)
             y -= 0.3*inch
             
         # Footer
         p.setFont("Helvetica-Oblique", 8)
         p.drawString(0.7*inch, 1*inch, f"Generated automatically by AI AutoPayOS Engine on {date.today().strftime('%Y-%m-%d')}")
-        p.drawString(0.7*inch, 0.8*inch, "This is a computer generated certificate and does not require a physical signature.")
         
         p.showPage()
         p.save()
@@ -75,42 +173,72 @@ class PDFService:
         return buffer
 
     @staticmethod
-    def generate_form_24q(company_name: str, records: List[Dict[str, Any]]) -> BytesIO:
+    def generate_payslip(company_name: str, period: str, details: List[str], earnings: List[str], deductions: List[str], totals: Dict[str, str], use_template: bool = True) -> BytesIO:
         """
-        Simulates generation of Form 24Q (Quarterly Statement of TDS).
+        Renders a monthly payslip. details/earnings/deductions are formatted values in the
+        order of PAYSLIP_DETAILS / PAYSLIP_EARNINGS / PAYSLIP_DEDUCTIONS.
         """
         buffer = BytesIO()
         p = canvas.Canvas(buffer, pagesize=A4)
         width, height = A4
-        
-        p.setFont("Helvetica-Bold", 14)
-        p.drawCentredString(width/2, height - 1*inch, "Form No. 24Q")
+        _paint(p, PAYSLIP_TEMPLATE, use_template)
+
+        p.setFont("Helvetica-Bold", 12)
+        p.drawCentredString(width/2, height - 1.15*inch, company_name)
         p.setFont("Helvetica", 10)
-        p.drawCentredString(width/2, height - 1.2*inch, "Quarterly statement of deduction of tax under section 192")
-        
-        p.drawString(1*inch, height - 2*inch, f"Employer: {company_name}")
-        p.drawString(1*inch, height - 2.2*inch, f"Financial Year: 2025-26")
-        
-        # Simple data list
-        y = height - 3*inch
+        p.drawRightString(width - 0.7*inch, height - 1.7*inch, f"Pay Period: {period}")
+
+        y = height - 1.7*inch
+        for value in details:
+            p.drawString(2.2*inch, y, value)
+            y -= 0.25*inch
+
+        top = height - 3.75*inch
+        for column, values in ((width/2 - 0.2*inch, earnings), (width - 0.7*inch, deductions)):
+            y = top - 0.55*inch
+            for value in values:
+                p.drawRightString(column, y, value)
+                y -= 0.25*inch
+
         p.setFont("Helvetica-Bold", 10)
-        p.drawString(1*inch, y, "Employee Name")
-        p.drawString(3*inch, y, "PAN")
-        p.drawString(5*inch, y, "TDS Deposited")
-        p.line(1*inch, y-0.1*inch, width-1*inch, y-0.1*inch)
-        
-        p.setFont("Helvetica", 10)
-        y -= 0.4*inch
-        for rec in records:
-            p.drawString(1*inch, y, rec['name'])
-            p.drawString(3*inch, y, rec['pan'])
-            p.drawString(5*inch, y, f"Rs. {rec['tds']}")
-            y -= 0.3*inch
-            if y < 1*inch:
-                p.showPage()
-                y = height - 1*inch
-                
+        p.drawRightString(width/2 - 0.2*inch, height - 7.05*inch, totals["gross"])
+        p.drawRightString(width - 0.7*inch, height - 7.05*inch, totals["deductions"])
+        p.setFont("Helvetica-Bold", 12)
+        p.drawRightString(width - 0.7*inch, height - 7.7*inch, f"Rs. {totals['net']}")
+
         p.showPage()
         p.save()
         buffer.seek(0)
         return buffer
+
+    @staticmethod
+    def generate_form_24q(company_name: str, records: List[Dict[str, Any]], financial_year: str, quarter: int, use_template: bool = True) -> BytesIO:
+        """
+        Simulates generation of Form 24Q (Quarterly Statement of TDS).
+        Rows are laid out in fixed chunks per page; every page repeats the title
+        block and column headings from one form XObject.
+        """
+        buffer = BytesIO()
+        p = canvas.Canvas(buffer, pagesize=A4)
+        width, height = A4
+        pages = max(1, -(-len(records) // FORM24Q_ROWS_PER_PAGE))
+
+        for page in range(pages):
+            _paint(p, FORM24Q_TEMPLATE, use_template, as_form=True)
+
+            p.setFont("Helvetica", 10)
+            p.drawString(1*inch, height - 2*inch, f"Employer: {company_name}")
+            p.drawString(1*inch, height - 2.2*inch, f"Financial Year: {financial_year}    Quarter: Q{quarter}")
+            p.drawRightString(width - 1*inch, 0.6*inch, f"Page {page + 1} of {pages}")
+
+            y = height - 3.4*inch
+            for rec in records[page * FORM24Q_ROWS_PER_PAGE:(page + 1) * FORM24Q_ROWS_PER_PAGE]:
+                p.drawString(1*inch, y, rec['name'])
+                p.drawString(3*inch, y, rec['pan'])
+                p.drawString(5*inch, y, f"Rs. {rec['tds']}")
+                y -= 0.3*inch
+            p.showPage()
+
+        p.save()
+        buffer.seek(0)
+        return buffer
@@ -0,0 +1,36 @@
+from typing import Callable
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+
+class PDFTemplate:
+    """
+    Static page content (rules, headings, labels) of a document, kept apart
+    from its variable fields. Content repeated on many pages is defined once
+    per document as a form XObject (beginForm/endForm) and painted with doForm
+    on each page; single-page documents draw it inline, where an extra XObject
+    stream would cost more than it saves. Only ReportLab's public canvas API is
+    used, so nothing is shared between canvases or documents.
+    """
+
+    def __init__(self, name: str, draw: Callable[[canvas.Canvas], None], pagesize=A4):
+        self.name = name
+        self.draw = draw
+        self.pagesize = pagesize
+
+    def apply(self, c: canvas.Canvas, as_form: bool = False) -> None:
+        """Paints the static content on the current page of c."""
+        if not as_form:
+            # Keeps the template's graphics state (fonts, colours) from leaking into the page
+            c.saveState()
+            self.draw(c)
+            c.restoreState()
+            return
+
+        form_name = f"tpl_{self.name}"
+        if not c.hasForm(form_name):
+            c.beginForm(form_name)
+            self.draw(c)
+            c.endForm()
+        c.doForm(form_name)
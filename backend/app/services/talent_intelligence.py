@@ -3,8 +3,8 @@ from sqlalchemy import func
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
 from app.models.employee import Employee
-from app.models.attendance import Attendance
 from app.models.leave import LeaveApplication, LeaveStatus
+from app.services.attendance_summary import AttendanceSummaryService
 
 class TalentIntelligenceService:
     @staticmethod
@@ -20,23 +20,21 @@ class TalentIntelligenceService:
         score = 0
         now = datetime.now()
 
-        # 1. Attendance Consistency (last 90 days)
-        ninety_days_ago = now - timedelta(days=90)
-        attendance_count = db.query(func.count(Attendance.id)).filter(
-            Attendance.employee_id == employee_id,
-            Attendance.date >= ninety_days_ago.date(),
-            Attendance.status == "Present"
-        ).scalar() or 0
+        # 1. Attendance Consistency (this month to date and the two before)
+        start, end = AttendanceSummaryService.month_window(now.date(), 3)
+        window = AttendanceSummaryService.get_window_counts(db, start, end, employee_id=employee_id)
+        attendance_count = window.get(employee_id, {}).get("present", 0)
         
-        # Assume 22 working days per month = 66 days in 90 days
-        attendance_rate = (attendance_count / 66.0) * 100
+        # Working days (Mon-Fri) in the same window the summary counts cover
+        working_days = sum(1 for d in range((end - start).days + 1) if (start + timedelta(days=d)).weekday() < 5)
+        attendance_rate = min(100.0, attendance_count / working_days * 100) if working_days else 100.0
         if attendance_rate < 80:
             risk_points = min(40, int((80 - attendance_rate) * 2))
             score += risk_points
             factors.append({
                 "name": "Attendance Drop",
                 "impact": "High",
-                "description": f"Attendance rate dropped to {attendance_rate:.1f}% in the last 90 days."
+                "description": f"Attendance rate dropped to {attendance_rate:.1f}% in the last 3 months."
             })
 
         # 2. Leave Spike (last 30 days)
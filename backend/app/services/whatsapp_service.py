@@ -1,8 +1,14 @@
 from sqlalchemy.orm import Session
 from datetime import date, datetime
+import calendar
+from app.core.config import settings
 from app.models.employee import Employee
 from app.models.attendance import Attendance
+from app.models.autopay_os import AutoPayOSRecord, AutoPayOSStatus
 from app.services.ewa_service import EWAService
+from app.services.attendance_summary import AttendanceSummaryService
+from app.services.checkin_buffer import checkin_buffer
+from app.services.payslip_service import PayslipService
 
 class WhatsAppService:
     @staticmethod
@@ -12,7 +18,7 @@ class WhatsAppService:
         Commands:
         - BALANCE: Check EWA balance.
         - ATTENDANCE: Mark present for today.
-        - PAYSLIP: Get latest payslip link.
+        - PAYSLIP: Get a download link for the latest paid payslip.
         - HELP: Show commands.
         """
         # Normalize phone (remove +91, spaces) - In mock, use exact string or email lookup
@@ -35,6 +41,14 @@ class WhatsAppService:
                     
         elif "ATTENDANCE" in command:
             today = date.today()
+            if settings.CHECKIN_BUFFER_ENABLED:
+                # Peak-hour path: acknowledged now, written by the buffer's next flush
+                now = datetime.now()
+                status = checkin_buffer.check_in(db, employee.id, today, now.time())
+                if status:
+                    return f"✅ You are already marked *{status.upper()}* for today ({today})."
+                return f"✅ Success! Marked *PRESENT* for today ({today}) at {now.strftime('%H:%M')}."
+
             existing = db.query(Attendance).filter(
                 Attendance.employee_id == employee.id,
                 Attendance.date == today
@@ -51,15 +65,24 @@ class WhatsAppService:
                 check_in=datetime.now().time()
             )
             db.add(new_attendance)
+            AttendanceSummaryService.refresh(db, [(employee.id, today)])
             db.commit()
             return f"✅ Success! Marked *PRESENT* for today ({today}) at {datetime.now().strftime('%H:%M')}."
 
         elif "PAYSLIP" in command:
-            # Mock link
-            return (f"📄 *Payslip Generated*\n\n"
-                    f"Here is your payslip for the last month:\n"
-                    f"https://autopay_os.krg.com/doc/{employee.employee_code}/last-payslip.pdf\n\n"
-                    f"(Password: Your PAN DOY)")
+            record = db.query(AutoPayOSRecord).filter(
+                AutoPayOSRecord.employee_id == employee.id,
+                AutoPayOSRecord.status == AutoPayOSStatus.PAID
+            ).order_by(AutoPayOSRecord.year.desc(), AutoPayOSRecord.month.desc()).first()
+            if not record:
+                return "📄 No paid payslip is available yet. Please check again after payday."
+
+            # Render (or reuse) the PDF now so the link opens instantly
+            PayslipService.get_pdf(db, record)
+            return (f"📄 *Payslip for {calendar.month_name[record.month]} {record.year}*\n\n"
+                    f"Net Pay: *₹{float(record.net_pay):,.2f}*\n"
+                    f"Download: {PayslipService.download_url(record)}\n\n"
+                    f"(Link valid for {settings.PAYSLIP_LINK_EXPIRE_MINUTES // 60} hours)")
 
         elif "WITHDRAW" in command:
              # Parse amount
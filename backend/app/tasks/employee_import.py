@@ -0,0 +1,77 @@
+import os
+from datetime import datetime
+from itertools import chain
+
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.autopay_os import EmployeeImportJob, PayrollJobStatus
+from app.services.bulk_import_service import BulkImportService, UNIQUE_COLUMNS
+
+
+@celery_app.task(name="employee_import.run_job")
+def run_employee_import_job(job_id: int) -> dict:
+    """
+    Imports the job's spooled file in chunks of IMPORT_BATCH_SIZE rows. Each chunk's
+    employees are committed together with the checkpoint, so when a chunk fails the
+    job stops as FAILED and a resumed run continues after the last committed chunk
+    instead of starting over.
+    """
+    db = SessionLocal()
+    try:
+        job = db.query(EmployeeImportJob).filter(EmployeeImportJob.id == job_id).first()
+        if not job:
+            return {"job_id": job_id, "status": "missing"}
+
+        job.status = PayrollJobStatus.RUNNING
+        job.error = None
+        job.finished_at = None
+        job.started_at = job.started_at or datetime.now()
+        if not job.total_rows:
+            job.total_rows = BulkImportService.count_rows(job.file_path, job.filename)
+        db.commit()
+
+        chunks = BulkImportService.iter_employee_chunks(job.file_path, job.filename, settings.IMPORT_BATCH_SIZE)
+        first = next(chunks)
+        missing = BulkImportService.missing_columns(first)
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+        taken = BulkImportService.existing_keys(db)
+        seen = {col: set() for col in UNIQUE_COLUMNS}
+        rejected_rows = {e["row"] for e in job.errors or []}
+        for df in chain([first], chunks):
+            # Rows before the checkpoint were committed by an earlier attempt
+            BulkImportService.replay_committed(df[df.index < job.checkpoint_row], rejected_rows, taken, seen)
+            todo = df[df.index >= job.checkpoint_row]
+            if todo.empty:
+                continue
+
+            imported, errors = BulkImportService.import_chunk(db, job.company_id, todo, taken, seen)
+            job.imported += imported
+            job.rejected += len(errors)
+            if errors:
+                job.errors = (job.errors or []) + errors
+            job.checkpoint_row = int(todo.index[-1]) + 1
+            db.commit()
+
+        job.checkpoint_row = max(job.checkpoint_row, job.total_rows)
+        job.status = PayrollJobStatus.COMPLETED
+        job.finished_at = datetime.now()
+        db.commit()
+
+        # The upload is only kept while the job may still need to resume
+        if job.file_path and os.path.exists(job.file_path):
+            os.remove(job.file_path)
+        job.file_path = None
+        db.commit()
+        return {"job_id": job.id, "status": job.status.value, "imported": job.imported, "rejected": job.rejected}
+    except Exception as e:
+        db.rollback()
+        db.query(EmployeeImportJob).filter(EmployeeImportJob.id == job_id).update(
+            {"status": PayrollJobStatus.FAILED, "error": str(e), "finished_at": datetime.now()}
+        )
+        db.commit()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,65 @@
+import os
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.autopay_os import Form16Job, PayrollJobStatus
+from app.models.company import Company
+from app.services.form16_service import Form16Service
+
+
+@celery_app.task(name="form16.run_job")
+def run_form16_job(job_id: int) -> dict:
+    """
+    Renders Form 16 for every employee with payroll in the job's financial year.
+    Certificates are aggregated in one grouped query, rendered across the FORM16_WORKERS
+    pool and appended to the ZIP as each batch finishes; progress is committed per batch.
+    """
+    db = SessionLocal()
+    try:
+        job = db.query(Form16Job).filter(Form16Job.id == job_id).first()
+        if not job:
+            return {"job_id": job_id, "status": "missing"}
+        company = db.query(Company).filter(Company.id == job.company_id).first()
+
+        rows = Form16Service.aggregate(db, job.company_id, job.financial_year)
+        job.status = PayrollJobStatus.RUNNING
+        job.total = len(rows)
+        job.processed = job.failed = 0
+        job.errors = []
+        job.archive_path = None
+        job.started_at = datetime.now()
+        db.commit()
+
+        archive = Path(settings.FORM16_ARCHIVE_DIR) / f"company_{job.company_id}" / f"form16_{job.financial_year}_job{job.id}.zip"
+        archive.parent.mkdir(parents=True, exist_ok=True)
+        tmp = archive.with_name(archive.name + ".tmp")
+        with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for batch, files, error in Form16Service.render_many(rows, company.name, company.tan, job.financial_year):
+                if error is not None:
+                    job.failed += len(batch)
+                    job.errors = (job.errors or []) + [{"employee_ids": [r["employee_id"] for r in batch], "error": str(error)}]
+                else:
+                    for filename, content in files:
+                        zf.writestr(filename, content)
+                job.processed += len(batch)
+                db.commit()
+        os.replace(tmp, archive)
+
+        job.archive_path = str(archive)
+        job.status = PayrollJobStatus.FAILED if job.failed == job.total and job.total else PayrollJobStatus.COMPLETED
+        job.finished_at = datetime.now()
+        db.commit()
+        return {"job_id": job.id, "status": job.status.value, "processed": job.processed, "failed": job.failed}
+    except Exception:
+        db.rollback()
+        db.query(Form16Job).filter(Form16Job.id == job_id).update(
+            {"status": PayrollJobStatus.FAILED, "finished_at": datetime.now()}
+        )
+        db.commit()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,56 @@
+from datetime import datetime
+
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.core.database import SessionLocal, chunked
+from app.models.autopay_os import PayrollRunJob, PayrollJobStatus
+from app.services.anomaly_detection import AnomalyDetectionService
+from app.services.payroll_engine import PayrollEngine
+
+
+@celery_app.task(name="payroll.run_job")
+def run_payroll_job(job_id: int) -> dict:
+    """
+    Processes a queued payroll run in chunks of PAYROLL_JOB_CHUNK_SIZE employees.
+    Each chunk is committed on its own, so a failing chunk is recorded and skipped
+    without losing the chunks that already succeeded.
+    """
+    db = SessionLocal()
+    try:
+        job = db.query(PayrollRunJob).filter(PayrollRunJob.id == job_id).first()
+        if not job:
+            return {"job_id": job_id, "status": "missing"}
+
+        employee_ids = list(job.employee_ids or [])
+        job.status = PayrollJobStatus.RUNNING
+        job.total = len(employee_ids)
+        job.processed = job.records_written = job.failed = 0
+        job.errors = []
+        job.started_at = datetime.now()
+        db.commit()
+
+        for chunk in chunked(employee_ids, settings.PAYROLL_JOB_CHUNK_SIZE):
+            try:
+                run = PayrollEngine.run(db, chunk, job.month, job.year)
+                AnomalyDetectionService.safe_analyze_payroll_run(db, job.company_id, job.month, job.year, chunk)
+                job.records_written += run["rows"]
+            except Exception as e:
+                db.rollback()
+                job.failed += len(chunk)
+                job.errors = (job.errors or []) + [{"employee_ids": chunk, "error": str(e)}]
+            job.processed += len(chunk)
+            db.commit()
+
+        job.status = PayrollJobStatus.FAILED if job.failed == job.total and job.total else PayrollJobStatus.COMPLETED
+        job.finished_at = datetime.now()
+        db.commit()
+        return {"job_id": job.id, "status": job.status.value, "processed": job.processed, "failed": job.failed}
+    except Exception:
+        db.rollback()
+        db.query(PayrollRunJob).filter(PayrollRunJob.id == job_id).update(
+            {"status": PayrollJobStatus.FAILED, "finished_at": datetime.now()}
+        )
+        db.commit()
+        raise
+    finally:
+        db.close()
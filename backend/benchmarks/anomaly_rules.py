@@ -0,0 +1,106 @@
+"""
+Measures how anomaly rule evaluation scales with the number of rules.
+
+Rules are vector predicates over a column frame that is loaded once per run
+(a fixed number of queries), so adding a rule adds one numpy expression rather
+than a query per payslip. Rule counts above the registry size reuse the
+registered rules with shifted thresholds.
+
+Before timing, payslips computed by PayrollCalculator (with TDS recorded) are
+checked against the deduction rule: a correct payslip must not be flagged, and
+the run exits with status 1 if one is.
+
+Usage (from backend/):
+    python -m benchmarks.anomaly_rules [rows]
+"""
+import sys
+import time
+
+import numpy as np
+
+from app.services.anomaly_rules import RULES, DeductionErrorRule
+from app.services.payroll_calculator import PayrollCalculator
+
+
+def synthetic_frame(rows: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    gross = rng.integers(10_000_00, 250_000_00, rows)
+    pf = np.where(rng.random(rows) > 0.1, gross * 12 // 100 // 2, 0)
+    esi = np.zeros(rows, dtype=np.int64)
+    pt = np.full(rows, 200_00)
+    tds = gross * rng.integers(0, 12, rows) // 100
+    deductions = pf + esi + pt + np.where(rng.random(rows) > 0.999, 5_00, 0)
+    return {
+        "record_id": np.arange(rows),
+        "employee_id": np.arange(rows),
+        "gross": gross,
+        "deductions": deductions,
+        "net": gross - deductions,
+        "pf": pf,
+        "esi": esi,
+        "pt": pt,
+        "tds": tds,
+        "has_previous": rng.random(rows) > 0.05,
+        "previous_gross": gross * rng.integers(70, 130, rows) // 100,
+        "is_active": rng.random(rows) > 0.001,
+        "left_before_period": rng.random(rows) > 0.999,
+        "shared_bank_account": rng.random(rows) > 0.999,
+        # 50 (department, designation) peer groups
+        "peer_group": rng.integers(0, 50, rows),
+        "peer_labels": np.array([(f"Dept {g // 5}", f"Role {g % 5}") for g in range(50)], dtype=object),
+    }
+
+
+def rule_set(count: int):
+    registered = list(RULES.values())
+    rules = []
+    for i in range(count):
+        rule = registered[i % len(registered)]
+        params = {k: (v + i if isinstance(v, (int, float)) and not isinstance(v, bool) else v) for k, v in rule.defaults.items()}
+        rules.append((rule, params))
+    return rules
+
+
+def evaluate(cols, rules):
+    return sum(int(rule.predicate(cols, params).sum()) for rule, params in rules)
+
+
+def computed_payslips_reconcile(rows: int = 1_000, seed: int = 7) -> bool:
+    """True when no PayrollCalculator payslip is flagged as a deduction error."""
+    rng = np.random.default_rng(seed)
+    basic = rng.integers(8_000_00, 150_000_00, rows)
+    payslips = PayrollCalculator.compute(
+        basic, basic // 2, np.full(rows, 1_600_00), np.full(rows, 1_250_00), basic // 4,
+        rng.integers(40, 61, rows) / 2, 30
+    )
+    gross = payslips["gross_earnings"]
+    cols = {
+        "gross": gross,
+        "deductions": payslips["total_deductions"],
+        "net": payslips["net_pay"],
+        "pf": payslips["pf_deduction"],
+        "esi": payslips["esi_deduction"],
+        "pt": payslips["pt_deduction"],
+        "tds": gross * rng.integers(0, 20, rows) // 100,  # Recorded outside the calculator
+    }
+    return not DeductionErrorRule.predicate(cols, DeductionErrorRule.defaults).any()
+
+
+def main(rows: int = 100_000):
+    if not computed_payslips_reconcile():
+        print("FAIL: deduction_error flags payslips computed by PayrollCalculator")
+        sys.exit(1)
+    cols = synthetic_frame(rows)
+    print(f"rows: {rows:,}")
+    print(f"{'rules':>6} {'total ms':>10} {'ms/rule':>9} {'flagged':>9}")
+    for count in (1, 5, 10, 20, 40, 80):
+        rules = rule_set(count)
+        evaluate(cols, rules)  # warm-up
+        started = time.perf_counter()
+        flagged = evaluate(cols, rules)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"{count:>6} {elapsed:>10.2f} {elapsed / count:>9.3f} {flagged:>9,}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,86 @@
+"""
+Employee import time and peak Python memory for a synthetic onboarding file,
+against a throwaway in-memory SQLite database. Runs once with the whole file
+as a single chunk and once with IMPORT_BATCH_SIZE chunks: peak memory of the
+chunked run is bounded by the chunk size, not the file size.
+
+Usage (from backend/):
+    python -m benchmarks.employee_import [rows] [csv|xlsx]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (registers every table on Base.metadata)
+from app.core.config import settings
+from app.core.database import Base
+from app.models.company import Company
+from app.services.bulk_import_service import BulkImportService
+
+
+def write_synthetic_file(rows: int, file_format: str) -> str:
+    df = pd.DataFrame({
+        "employee_code": [f"EMP{i:06d}" for i in range(rows)],
+        "full_name": [f"Employee {i}" for i in range(rows)],
+        "email": [f"employee{i}@example.com" for i in range(rows)],
+        "date_of_joining": "2025-04-01",
+        "designation": "Engineer",
+        "basic_salary": [str(20000 + i % 50000) for i in range(rows)],
+        "pan_number": [f"ABC{chr(65 + i // 260000 % 26)}{chr(65 + i // 10000 % 26)}{i % 10000:04d}F" for i in range(rows)],
+    })
+    fd, path = tempfile.mkstemp(suffix=f".{file_format}")
+    os.close(fd)
+    if file_format == "csv":
+        df.to_csv(path, index=False)
+    else:
+        df.to_excel(path, index=False)
+    return path
+
+
+def run(path: str, chunk_size: int, trace: bool):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    company = Company(name="Benchmark Co")
+    db.add(company)
+    db.commit()
+
+    settings.IMPORT_BATCH_SIZE = chunk_size
+    if trace:
+        tracemalloc.start()
+    started = time.perf_counter()
+    result = BulkImportService.process_employee_file(path, path, company.id, db)
+    elapsed = time.perf_counter() - started
+    peak = 0
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    db.close()
+    return result, elapsed, peak
+
+
+def main(rows: int = 30_000, file_format: str = "xlsx"):
+    path = write_synthetic_file(rows, file_format)
+    chunk_size = settings.IMPORT_BATCH_SIZE
+    try:
+        print(f"rows: {rows:,} ({file_format}, {os.path.getsize(path) / 1024:,.0f} KiB)")
+        print(f"{'chunk rows':>10} {'seconds':>8} {'rows/s':>9} {'peak MiB':>9} {'imported':>9}")
+        for size in (rows, chunk_size):
+            result, elapsed, _ = run(path, size, trace=False)
+            _, _, peak = run(path, size, trace=True)
+            print(f"{size:>10,} {elapsed:>8.2f} {rows / elapsed:>9,.0f} {peak / 1024 / 1024:>9.1f} {result['imported_count']:>9,}")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 30_000,
+        sys.argv[2] if len(sys.argv) > 2 else "xlsx"
+    )
@@ -0,0 +1,56 @@
+"""
+Form 16 bulk rendering throughput (PDFs/sec) for different pool sizes,
+including writing the certificates into a ZIP archive.
+
+Usage (from backend/):
+    python -m benchmarks.form16_bulk [certificates] [max_workers]
+"""
+import io
+import os
+import sys
+import time
+import zipfile
+from decimal import Decimal
+
+from app.services.form16_service import Form16Service
+
+
+def synthetic_rows(count: int):
+    return [
+        {
+            "employee_id": i,
+            "employee_code": f"EMP{i:06d}",
+            "employee_name": f"Employee {i}",
+            "pan": f"ABCDE{i % 10000:04d}F",
+            "gross": Decimal(600000 + i * 37),
+            "tax": Decimal(25000 + i % 5000),
+        }
+        for i in range(count)
+    ]
+
+
+def run(rows, workers: int) -> float:
+    started = time.perf_counter()
+    with zipfile.ZipFile(io.BytesIO(), "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for _, files, error in Form16Service.render_many(rows, "Acme Industries Pvt Ltd", "CHEA12345B", "2025-26", workers=workers):
+            if error is not None:
+                raise error
+            for filename, content in files:
+                zf.writestr(filename, content)
+    return len(rows) / (time.perf_counter() - started)
+
+
+def main(count: int = 2000, max_workers: int = os.cpu_count() or 1):
+    rows = synthetic_rows(count)
+    print(f"certificates: {count:,}")
+    workers = 1
+    while workers <= max_workers:
+        print(f"workers={workers:<3} {run(rows, workers):10.1f} PDFs/sec")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    )
@@ -0,0 +1,85 @@
+"""
+Compares the columnar PayrollCalculator against the scalar Decimal loop
+that process_autopay_os used to run one employee at a time.
+
+Usage (from backend/):
+    python -m benchmarks.payroll_calculator [rows]
+"""
+import sys
+import time
+import random
+from decimal import Decimal
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services.payroll_calculator import PayrollCalculator
+
+
+def synthetic_company(rows: int, seed: int = 42):
+    rnd = random.Random(seed)
+    structures = []
+    for _ in range(rows):
+        basic = Decimal(rnd.randint(500000, 9000000)).scaleb(-2)
+        structures.append(SimpleNamespace(
+            basic=basic,
+            hra=(basic / 2).quantize(Decimal("0.01")),
+            conveyance=Decimal("1600.00"),
+            medical_allowance=Decimal("1250.00"),
+            special_allowance=Decimal(rnd.randint(0, 2000000)).scaleb(-2),
+            pf_enabled=rnd.random() > 0.2,
+            esi_enabled=True,
+            pt_enabled=True,
+            employer_pf_enabled=True,
+            employer_esi_enabled=True,
+        ))
+    paid_days = [Decimal(rnd.randint(40, 60)) / 2 for _ in range(rows)]
+    return structures, paid_days
+
+
+def scalar_loop(structures, paid_days, num_days):
+    results = []
+    for s, days in zip(structures, paid_days):
+        factor = days / Decimal(num_days)
+        basic = s.basic * factor
+        gross = basic + (s.hra + s.conveyance + s.medical_allowance + s.special_allowance) * factor
+        pf = basic * Decimal("0.12") if s.pf_enabled else Decimal("0")
+        esi = gross * Decimal("0.0075") if s.esi_enabled and gross <= 21000 else Decimal("0")
+        pt = Decimal("0")
+        if s.pt_enabled:
+            if gross > 12500: pt = Decimal("250")
+            elif gross > 10000: pt = Decimal("150")
+            elif gross > 7500: pt = Decimal("100")
+        employer_pf = basic * Decimal("0.12") if s.employer_pf_enabled else Decimal("0")
+        employer_esi = gross * Decimal("0.0325") if s.employer_esi_enabled and gross <= 21000 else Decimal("0")
+        results.append((gross, gross - pf - esi - pt, employer_pf, employer_esi))
+    return results
+
+
+def main(rows: int = 100_000):
+    structures, paid_days = synthetic_company(rows)
+    num_days = 30
+
+    started = time.perf_counter()
+    scalar_loop(structures, paid_days, num_days)
+    loop_seconds = time.perf_counter() - started
+
+    # Column extraction is measured separately: the route pays it once per run
+    started = time.perf_counter()
+    columns = {col: PayrollCalculator.to_paise(getattr(s, col) for s in structures)
+               for col in ["basic", "hra", "conveyance", "medical_allowance", "special_allowance"]}
+    days = np.array([float(d) for d in paid_days])
+    load_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    PayrollCalculator.compute(paid_days=days, num_days=num_days, **columns)
+    vector_seconds = time.perf_counter() - started
+
+    print(f"rows:               {rows:,}")
+    print(f"scalar Decimal loop {loop_seconds * 1000:10.1f} ms")
+    print(f"columnar compute    {vector_seconds * 1000:10.1f} ms  ({loop_seconds / vector_seconds:,.0f}x)")
+    print(f"paise conversion    {load_seconds * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
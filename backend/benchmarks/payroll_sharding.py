@@ -0,0 +1,47 @@
+"""
+Computes one company's payroll with the sequential fallback and with the
+process pool, checks that both produce identical payslips and prints the
+speedup. Nothing is written to the database.
+
+Usage (from backend/):
+    python -m benchmarks.payroll_sharding <company_id> <month> <year> [workers]
+"""
+import sys
+import time
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.employee import Employee
+from app.services.payroll_engine import PayrollEngine
+
+
+def main(company_id: int, month: int, year: int, workers: int):
+    db = SessionLocal()
+    try:
+        employee_ids = [r[0] for r in db.query(Employee.id).filter(
+            Employee.company_id == company_id,
+            Employee.is_active == True
+        ).order_by(Employee.id).all()]
+
+        started = time.perf_counter()
+        sequential = PayrollEngine.compute_sharded(db, employee_ids, month, year, workers=1)
+        sequential_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        pooled = PayrollEngine.compute_sharded(db, employee_ids, month, year, workers=workers)
+        pooled_seconds = time.perf_counter() - started
+    finally:
+        db.close()
+
+    print(f"employees:   {len(employee_ids):,} ({len(sequential):,} with salary structures)")
+    print(f"shard size:  {settings.PAYROLL_SHARD_SIZE:,}")
+    print(f"sequential   {sequential_seconds:8.2f} s  {len(sequential) / sequential_seconds:10,.0f} rows/s")
+    print(f"{workers:>2} workers   {pooled_seconds:8.2f} s  {len(pooled) / pooled_seconds:10,.0f} rows/s  ({sequential_seconds / pooled_seconds:.1f}x)")
+    print(f"identical:   {sequential == pooled}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        sys.exit(__doc__)
+    main(int(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3]),
+         int(sys.argv[4]) if len(sys.argv) > 4 else max(settings.PAYROLL_WORKERS, 2))
@@ -0,0 +1,63 @@
+"""
+Per-document latency and peak memory of the PDF renderers, with static content
+redrawn call by call (use_template=False) versus painted from the template
+(use_template=True; a form XObject reused on every page of multi-page documents).
+
+Usage (from backend/):
+    python -m benchmarks.pdf_templates [documents]
+"""
+import sys
+import time
+import tracemalloc
+
+from app.services.pdf_service import PDFService
+
+FORM16_DATA = {"gross": "12,45,000.00", "taxable": "11,70,000.00", "tax": "1,12,500.00"}
+PAYSLIP_ARGS = (
+    "Acme Industries Pvt Ltd", "March 2026",
+    ["Asha Krishnan", "EMP0001", "Engineer", "ABCDE1234F", "100200300400", "31", "0"],
+    ["25,000.00", "12,500.00", "1,600.00", "1,250.00", "9,650.00"],
+    ["1,800.00", "0.00", "208.00", "2,350.00"],
+    {"gross": "50,000.00", "deductions": "4,358.00", "net": "45,642.00"},
+)
+FORM24Q_RECORDS = [{"name": f"Employee {i}", "pan": f"ABCDE{i:04d}F", "tds": "9,375.00"} for i in range(200)]
+
+CASES = {
+    "form16": lambda use_template: PDFService.generate_form_16(
+        "Asha Krishnan", "ABCDE1234F", "Acme Industries Pvt Ltd", "CHEA12345B", "2025-26", FORM16_DATA,
+        use_template=use_template
+    ),
+    "payslip": lambda use_template: PDFService.generate_payslip(*PAYSLIP_ARGS, use_template=use_template),
+    "form24q (200 rows)": lambda use_template: PDFService.generate_form_24q(
+        "Acme Industries Pvt Ltd", FORM24Q_RECORDS, "2025-26", 4, use_template=use_template
+    ),
+}
+
+
+def measure(render, use_template: bool, documents: int):
+    render(use_template)  # warm-up
+    started = time.perf_counter()
+    for _ in range(documents):
+        render(use_template)
+    latency = (time.perf_counter() - started) / documents
+
+    tracemalloc.start()
+    render(use_template)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return latency, peak
+
+
+def main(documents: int = 500):
+    print(f"documents per case: {documents:,}")
+    print(f"{'case':<20} {'mode':<9} {'ms/pdf':>8} {'peak KiB':>9}")
+    for name, render in CASES.items():
+        runs = max(1, documents // 20) if "24q" in name else documents
+        for use_template in (False, True):
+            latency, peak = measure(render, use_template, runs)
+            mode = "template" if use_template else "canvas"
+            print(f"{name:<20} {mode:<9} {latency * 1000:>8.3f} {peak / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,175 @@
+"""
+Plan check for the hot payroll and attendance queries: seeds a synthetic
+company into a scratch database, runs EXPLAIN on each query and fails (exit
+status 1) when one of them reads its table without the index it relies on.
+
+SQLite (default, in-memory) is checked with EXPLAIN QUERY PLAN. With a
+PostgreSQL URL the tables are created and seeded in that database (use a
+throwaway one) and checked with EXPLAIN under enable_seqscan=off: the check
+asserts the index is usable for the query, since on a small sample the
+planner may legitimately prefer a sequential scan.
+
+Usage (from backend/):
+    python -m benchmarks.query_plans [employees] [database_url]
+"""
+import importlib
+import pkgutil
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, select, text
+
+import app.models
+from app.core.database import Base
+from app.models.anomaly import Anomaly, AnomalyType
+from app.models.attendance import Attendance
+from app.models.autopay_os import AutoPayOSRecord, AutoPayOSStatus
+from app.models.company import Company
+from app.models.employee import Employee
+from app.models.leave import LeaveApplication, LeaveStatus, LeaveType
+
+DAYS = 60
+MONTHS = 6
+
+
+def hot_queries():
+    """(name, table, expected index or None for "any index", statement)."""
+    return [
+        ("attendance of an employee-month", "attendance", None, select(Attendance).where(
+            Attendance.employee_id == 7,
+            Attendance.date.between(date(2026, 1, 1), date(2026, 1, 31))
+        )),
+        ("attendance date range, keyset order", "attendance", "ix_attendance_date_id", select(Attendance).where(
+            Attendance.date.between(date(2026, 1, 1), date(2026, 1, 7))
+        ).order_by(Attendance.date, Attendance.id).limit(500)),
+        ("paid records of a company period", "autopay_os_records", "ix_autopay_os_records_company_period_status",
+         select(AutoPayOSRecord).where(
+            AutoPayOSRecord.company_id == 1,
+            AutoPayOSRecord.year == 2026,
+            AutoPayOSRecord.month == 1,
+            AutoPayOSRecord.status == AutoPayOSStatus.PAID
+        )),
+        ("record of an employee period", "autopay_os_records", "ix_autopay_os_records_employee_period",
+         select(AutoPayOSRecord).where(
+            AutoPayOSRecord.employee_id == 7,
+            AutoPayOSRecord.year == 2026,
+            AutoPayOSRecord.month == 1
+        )),
+        ("approved leave of an employee", "leave_applications", "ix_leave_applications_employee_status",
+         select(LeaveApplication).where(
+            LeaveApplication.employee_id == 7,
+            LeaveApplication.status == LeaveStatus.APPROVED
+        )),
+        ("open anomalies of a company", "anomalies", "ix_anomalies_company_resolved_created", select(Anomaly).where(
+            Anomaly.company_id == 1,
+            Anomaly.is_resolved == False  # noqa: E712
+        ).order_by(Anomaly.created_at.desc())),
+        ("active employees of a company", "employees", "ix_employees_company_active", select(Employee).where(
+            Employee.company_id == 1,
+            Employee.is_active == True  # noqa: E712
+        )),
+    ]
+
+
+def seed(engine, employees: int) -> None:
+    rng = random.Random(42)
+    companies = 5
+    with engine.begin() as conn:
+        conn.execute(Company.__table__.insert(), [{"id": i + 1, "name": f"Company {i + 1}"} for i in range(companies)])
+        conn.execute(Employee.__table__.insert(), [{
+            "id": i + 1,
+            "company_id": i % companies + 1,
+            "employee_code": f"EMP{i:06d}",
+            "full_name": f"Employee {i}",
+            "email": f"employee{i}@example.com",
+            "date_of_joining": date(2024, 4, 1),
+            "is_active": rng.random() > 0.05,
+        } for i in range(employees)])
+        conn.execute(LeaveType.__table__.insert(), [{"id": 1, "name": "Casual", "code": "CL"}])
+
+        start = date(2026, 1, 1)
+        conn.execute(Attendance.__table__.insert(), [{
+            "employee_id": emp_id,
+            "date": start + timedelta(days=day),
+            "status": rng.choice(["present", "present", "present", "leave", "absent"]),
+        } for day in range(DAYS) for emp_id in range(1, employees + 1)])
+        conn.execute(AutoPayOSRecord.__table__.insert(), [{
+            "employee_id": emp_id,
+            "company_id": (emp_id - 1) % companies + 1,
+            "year": 2026 if month <= 6 else 2025,
+            "month": month,
+            "gross_earnings": 50000,
+            "total_deductions": 5000,
+            "net_pay": 45000,
+            "status": rng.choice(list(AutoPayOSStatus)).name,
+        } for month in range(1, MONTHS + 1) for emp_id in range(1, employees + 1)])
+        conn.execute(LeaveApplication.__table__.insert(), [{
+            "employee_id": rng.randint(1, employees),
+            "leave_type_id": 1,
+            "start_date": start,
+            "end_date": start,
+            "total_days": 1,
+            "reason": "Personal",
+            "status": rng.choice(list(LeaveStatus)).name,
+        } for _ in range(employees * 3)])
+        conn.execute(Anomaly.__table__.insert(), [{
+            "company_id": rng.randint(1, companies),
+            "type": AnomalyType.SALARY_SPIKE.name,
+            "title": "Salary spike",
+            "is_resolved": rng.random() > 0.2,
+        } for _ in range(employees)])
+        conn.execute(text("ANALYZE"))
+
+
+def explain(conn, statement):
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    if conn.dialect.name == "sqlite":
+        return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}")]
+    return [row[0] for row in conn.exec_driver_sql(f"EXPLAIN {compiled}")]
+
+
+def uses_index(plan, table: str, index) -> bool:
+    if index:
+        return any(index in line for line in plan)
+    # SQLite: "SEARCH attendance USING INDEX ..."; PostgreSQL: "Index Scan using ... on attendance"
+    return any(
+        (f"SEARCH {table} " in line and "INDEX" in line) or ("Index" in line and f" on {table}" in line)
+        for line in plan
+    )
+
+
+def main(employees: int = 2_000, url: str = "sqlite://") -> int:
+    # app.models does not import every model module; register all tables
+    for module in pkgutil.iter_modules(app.models.__path__):
+        importlib.import_module(f"app.models.{module.name}")
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    started = time.perf_counter()
+    seed(engine, employees)
+    print(f"{engine.dialect.name}: seeded {employees:,} employees x {DAYS} days in {time.perf_counter() - started:.1f}s")
+
+    failures = 0
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql("SET enable_seqscan = off")
+        for name, table, index, statement in hot_queries():
+            plan = explain(conn, statement)
+            started = time.perf_counter()
+            conn.execute(statement).all()
+            elapsed = (time.perf_counter() - started) * 1000
+            ok = uses_index(plan, table, index)
+            failures += not ok
+            print(f"{'ok' if ok else 'FAIL':>4} {elapsed:>8.2f} ms  {name}")
+            for line in plan:
+                print(f"{'':>18}{line}")
+    print(f"{failures} plan regression(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2_000,
+        sys.argv[2] if len(sys.argv) > 2 else "sqlite://"
+    ))
@@ -0,0 +1,38 @@
+"""
+Creates the model indexes missing from an existing database. create_all only
+adds indexes together with new tables, so composite indexes declared later in
+__table_args__ (hot payroll, attendance, leave, anomaly and employee filters)
+need this once per existing database. Safe to re-run.
+
+Usage (from backend/):
+    python -m scripts.create_indexes
+"""
+import importlib
+import pkgutil
+
+from sqlalchemy import inspect
+
+from app.core.database import Base, engine
+import app.models
+
+
+def main():
+    # app.models does not import every model module; register all tables
+    for module in pkgutil.iter_modules(app.models.__path__):
+        importlib.import_module(f"app.models.{module.name}")
+    Base.metadata.create_all(bind=engine)
+    inspector = inspect(engine)
+    created = []
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=engine)
+                created.append(index.name)
+    for name in created:
+        print(f"Created {name}")
+    print(f"{len(created)} index(es) created")
+
+
+if __name__ == "__main__":
+    main()
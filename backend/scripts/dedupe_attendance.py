@@ -0,0 +1,35 @@
+"""
+Prepares an existing database for the (employee_id, date) unique constraint on
+attendance, which create_all does not add to tables that already exist: keeps
+the newest row of each duplicated employee-day, creates the unique index and
+rebuilds the monthly attendance summary.
+
+Usage (from backend/):
+    python -m scripts.dedupe_attendance
+"""
+from sqlalchemy import func, text
+
+from app.core.database import SessionLocal, Base, engine
+import app.models  # noqa: F401  (register all tables)
+from app.models.attendance import Attendance
+from app.services.attendance_summary import AttendanceSummaryService
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        keep = db.query(func.max(Attendance.id)).group_by(Attendance.employee_id, Attendance.date)
+        removed = db.query(Attendance).filter(Attendance.id.notin_(keep)).delete(synchronize_session=False)
+        db.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_attendance_employee_date ON attendance (employee_id, date)"
+        ))
+        db.commit()
+        rows = AttendanceSummaryService.rebuild(db)
+    finally:
+        db.close()
+    print(f"Removed {removed} duplicate attendance rows; rebuilt {rows} summary rows")
+
+
+if __name__ == "__main__":
+    main()
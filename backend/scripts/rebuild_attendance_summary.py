@@ -0,0 +1,26 @@
+"""
+Rebuilds attendance_monthly_summary from raw attendance rows.
+
+Usage (from backend/):
+    python -m scripts.rebuild_attendance_summary [company_id]
+"""
+import sys
+
+from app.core.database import SessionLocal, Base, engine
+import app.models  # noqa: F401  (register all tables)
+from app.services.attendance_summary import AttendanceSummaryService
+
+
+def main(company_id=None):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        rows = AttendanceSummaryService.rebuild(db, company_id)
+    finally:
+        db.close()
+    scope = f"company {company_id}" if company_id is not None else "all companies"
+    print(f"Rebuilt {rows} attendance summary rows for {scope}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,29 @@
+"""
+Adds enum values declared on the models but missing from an existing
+PostgreSQL database (create_all never alters an enum type, so e.g. a new
+AnomalyType value would fail every insert that uses it). The API runs the
+same step at startup; use this for databases that workers or jobs reach
+before the API has started. No-op on SQLite.
+
+Usage (from backend/):
+    python -m scripts.sync_enum_types
+"""
+import importlib
+import pkgutil
+
+from app.core.database import engine, sync_enum_types
+import app.models
+
+
+def main():
+    # app.models does not import every model module; register all enum columns
+    for module in pkgutil.iter_modules(app.models.__path__):
+        importlib.import_module(f"app.models.{module.name}")
+    added = sync_enum_types(engine)
+    for label in added:
+        print(f"Added {label}")
+    print(f"{len(added)} enum value(s) added")
+
+
+if __name__ == "__main__":
+    main()